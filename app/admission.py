@@ -0,0 +1,200 @@
+"""Adaptive admission control (concurrency limiting and load shedding).
+
+``/db/*`` and ``/s3/*`` requests each draw from their own concurrency budget.
+When a budget is used up, requests wait in a bounded queue for a bounded
+time; beyond that they are rejected immediately with ``503`` and
+``Retry-After`` instead of piling up until the proxy times out.
+
+Each budget adapts its limit with a gradient rule: while observed latency
+stays near the no-load baseline the limit grows, and as latency rises
+(queueing in RDS/S3 or in the thread pool) it shrinks. The baseline follows a
+new best latency at once but moves up only slowly, so sustained overload is
+not mistaken for the new normal.
+
+Uploads (``/s3/upload*``) hold a slot for the whole transfer, so their latency
+says nothing about backend load. They get a fixed budget of their own and feed
+no latency samples, so a few large uploads cannot shrink the ``/s3/*`` limit
+and get downloads and listings shed.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Optional
+
+from app.config import settings
+
+
+class AdaptiveLimiter:
+    """Concurrency limit with a bounded wait queue and latency-driven limit."""
+
+    def __init__(
+        self,
+        name: str,
+        max_limit: int,
+        min_limit: int = 1,
+        max_queue: int = 50,
+        queue_timeout: float = 5.0,
+        smoothing: float = 0.2,
+        tolerance: float = 2.0,
+        min_latency_window: float = 30.0,
+        min_latency_decay: float = 0.02,
+        adaptive: bool = True,
+    ):
+        self.name = name
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.smoothing = smoothing
+        self.tolerance = tolerance
+        self.min_latency_window = min_latency_window
+        self.min_latency_decay = min_latency_decay
+        self.adaptive = adaptive  # False keeps the limit fixed at max_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.rejected = 0
+        self._waiters = deque()
+        self._min_latency: Optional[float] = None
+        self._window_min: Optional[float] = None
+        self._window_started = time.monotonic()
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting in the queue if needed. False means shed the request."""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was handed over just as the wait expired; give it back
+                self.release()
+            else:
+                waiter.cancel()
+            self.rejected += 1
+            return False
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+
+    def release(self, latency: Optional[float] = None) -> None:
+        """Return a slot, feed the latency sample and admit queued requests."""
+        self.in_flight -= 1
+        if latency is not None and self.adaptive:
+            self._update_limit(latency)
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(True)
+
+    def _update_limit(self, latency: float) -> None:
+        if self._min_latency is None or latency < self._min_latency:
+            self._min_latency = latency
+        self._window_min = latency if self._window_min is None else min(self._window_min, latency)
+        now = time.monotonic()
+        if now - self._window_started > self.min_latency_window:
+            # Step part of the way toward this window's best latency, so a lasting
+            # change (a slower backend) is followed without overload becoming the baseline
+            self._min_latency += self.min_latency_decay * (self._window_min - self._min_latency)
+            self._window_min = None
+            self._window_started = now
+        gradient = max(0.5, min(1.0, self.tolerance * self._min_latency / max(latency, 1e-6)))
+        target = self.limit * gradient + math.sqrt(self.limit)
+        limit = (1 - self.smoothing) * self.limit + self.smoothing * target
+        self.limit = max(float(self.min_limit), min(float(self.max_limit), limit))
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "rejected": self.rejected,
+        }
+
+
+def build_limiters() -> dict:
+    """Create the per-route-group limiters from settings."""
+    common = {
+        "min_limit": settings.admission_min_concurrency,
+        "max_queue": settings.admission_max_queue,
+        "queue_timeout": settings.admission_queue_timeout,
+    }
+    # Matched in order, so the upload prefix must come before /s3/
+    return {
+        "/s3/upload": AdaptiveLimiter("transfer", settings.admission_transfer_max_concurrency,
+                                      adaptive=False, **common),
+        "/db/": AdaptiveLimiter("db", settings.admission_db_max_concurrency, **common),
+        "/s3/": AdaptiveLimiter("s3", settings.admission_s3_max_concurrency, **common),
+    }
+
+
+class AdmissionControlMiddleware:
+    """ASGI middleware applying separate budgets to /db/*, /s3/* and uploads."""
+
+    def __init__(self, app):
+        self.app = app
+        self.limiters = build_limiters()
+
+    def _limiter_for(self, path: str) -> Optional[AdaptiveLimiter]:
+        for prefix, limiter in self.limiters.items():
+            if path.startswith(prefix):
+                return limiter
+        return None
+
+    async def __call__(self, scope, receive, send):
+        limiter = self._limiter_for(scope["path"]) if scope["type"] == "http" else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await limiter.acquire():
+            await self._reject(send, limiter)
+            return
+
+        started = time.perf_counter()
+        latency = None
+
+        async def send_wrapper(message):
+            nonlocal latency
+            # Time to first byte drives the limit; long streaming bodies would skew it
+            if message["type"] == "http.response.start" and latency is None:
+                latency = time.perf_counter() - started
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            limiter.release(latency)
+
+    async def _reject(self, send, limiter: AdaptiveLimiter):
+        body = (
+            b'{"detail":"Server is overloaded, retry later","budget":"'
+            + limiter.name.encode() + b'"}'
+        )
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(settings.admission_retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,116 @@
+"""Serialization cost per endpoint: FastAPI's default path vs direct serializers.
+
+Run with ``python -m app.benchmarks.serialization [--repeat N]``. Payloads are
+shaped like ``/db/read?limit=1000`` and a large ``/s3/list`` response.
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.main import ItemResponse
+from app.serialization import get_response_class, SERIALIZERS
+
+
+def db_read_payload(count: int = 1000) -> List[dict]:
+    """Rows as returned by db_operations.get_items."""
+    created = datetime(2024, 1, 1)
+    return [
+        {
+            "id": i,
+            "name": f"item-{i}",
+            "description": f"Description for item {i}" if i % 3 else None,
+            "created_at": (created + timedelta(seconds=i)).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+def s3_list_payload(count: int = 5000) -> dict:
+    """Listing as returned by the /s3/list handler."""
+    modified = datetime(2024, 1, 1)
+    objects = [
+        {
+            "key": f"datasets/2024/01/part-{i:05d}.json",
+            "size": 1024 * (i % 97 + 1),
+            "last_modified": (modified + timedelta(minutes=i)).isoformat(),
+        }
+        for i in range(count)
+    ]
+    return {"bucket": "benchmark-bucket", "count": len(objects), "objects": objects}
+
+
+def fastapi_model_path(rows: List[dict]) -> bytes:
+    """What FastAPI did before: validate into response models, dump, then json.dumps."""
+    adapter = TypeAdapter(List[ItemResponse])
+    models = [ItemResponse(**row) for row in rows]
+    value = adapter.validate_python(models)
+    return JSONResponse(content=adapter.dump_python(value, mode="json")).body
+
+
+def fastapi_encoder_path(content: dict) -> bytes:
+    """What FastAPI does for a returned dict without a response model."""
+    return JSONResponse(content=jsonable_encoder(content)).body
+
+
+def run(repeat: int = 20) -> List[dict]:
+    """Time each serialization path per endpoint payload. Returns result rows."""
+    rows = db_read_payload()
+    listing = s3_list_payload()
+    cases = {
+        "/db/read?limit=1000": {
+            "fastapi-default": lambda: fastapi_model_path(rows),
+        },
+        "/s3/list (5000 objects)": {
+            "fastapi-default": lambda: fastapi_encoder_path(listing),
+        },
+    }
+    for serializer in SERIALIZERS:
+        response_class = get_response_class(serializer)
+        cases["/db/read?limit=1000"][serializer] = (
+            lambda cls=response_class: cls(rows).body
+        )
+        cases["/s3/list (5000 objects)"][serializer] = (
+            lambda cls=response_class: cls(listing).body
+        )
+
+    results = []
+    for endpoint, paths in cases.items():
+        # All paths must produce the same document
+        documents = {json.dumps(json.loads(fn()), sort_keys=True) for fn in paths.values()}
+        assert len(documents) == 1, f"Serializers disagree for {endpoint}"
+        baseline = None
+        for name, fn in paths.items():
+            best = min(timeit.repeat(fn, number=1, repeat=repeat))
+            baseline = baseline or best
+            results.append({
+                "endpoint": endpoint,
+                "path": name,
+                "best_ms": round(best * 1000, 3),
+                "speedup": round(baseline / best, 2),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = run(repeat=args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'endpoint':<26} {'path':<16} {'best ms':>10} {'speedup':>8}")
+    for row in results:
+        print(f"{row['endpoint']:<26} {row['path']:<16} {row['best_ms']:>10.3f} {row['speedup']:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
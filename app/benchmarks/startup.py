@@ -0,0 +1,123 @@
+"""Import-time profile and budget check for ``app.main``.
+
+Runs ``python -X importtime -c "import app.main"`` in fresh interpreters and
+reports the slowest imports by cumulative time::
+
+    python -m app.benchmarks.startup
+    python -m app.benchmarks.startup --check   # exits 1 over budget
+
+Most of the import is FastAPI itself (``fastapi.openapi.models`` alone builds
+hundreds of pydantic models), which the app cannot change. ``--check`` therefore
+budgets the app's own share, the median time above a bare ``import fastapi``,
+tightly, and the total only loosely. It also fails if importing the app pulled
+in a backend library that should only be loaded on first use (boto3, botocore,
+SQLAlchemy).
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import List, Tuple
+
+DEFAULT_BUDGET_MS = 1500  # Total, FastAPI included (about 700-900 ms on a CI runner)
+DEFAULT_APP_BUDGET_MS = 250  # Above bare FastAPI (usually under 150 ms)
+LAZY_MODULES = ("boto3", "botocore", "sqlalchemy")
+IMPORTTIME_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+# Prints how long the import took and which lazy backends ended up in sys.modules
+PROBE = (
+    "import sys, time\n"
+    "started = time.perf_counter()\n"
+    "import app.main\n"
+    "elapsed = (time.perf_counter() - started) * 1000\n"
+    "loaded = [name for name in {modules!r} if name in sys.modules]\n"
+    "print(elapsed, ','.join(loaded))\n"
+)
+FRAMEWORK_PROBE = (
+    "import time\n"
+    "started = time.perf_counter()\n"
+    "import fastapi\n"
+    "print((time.perf_counter() - started) * 1000)\n"
+)
+
+
+def _run(args: List[str]) -> subprocess.CompletedProcess:
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    result = subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, env=env
+    )
+    if result.returncode != 0:
+        raise Exception(f"Importing app.main failed:\n{result.stderr}")
+    return result
+
+
+def profile_imports() -> List[Tuple[str, int, int, int]]:
+    """Return (module, self_us, cumulative_us, depth) for every import."""
+    result = _run(["-X", "importtime", "-c", "import app.main"])
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def measure(runs: int) -> Tuple[List[float], List[float], List[str]]:
+    """Time ``import app.main`` and a bare ``import fastapi`` in `runs` fresh interpreters each."""
+    timings = []
+    framework_timings = []
+    loaded = set()
+    for _ in range(runs):
+        output = _run(["-c", PROBE.format(modules=LAZY_MODULES)]).stdout.split()
+        timings.append(float(output[0]))
+        if len(output) > 1:
+            loaded.update(output[1].split(","))
+        framework_timings.append(float(_run(["-c", FRAMEWORK_PROBE]).stdout))
+    return timings, framework_timings, sorted(loaded)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=25, help="Imports to list")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="Median import time allowed with --check")
+    parser.add_argument("--app-budget-ms", type=float, default=DEFAULT_APP_BUDGET_MS,
+                        help="Median import time above bare FastAPI allowed with --check")
+    parser.add_argument("--check", action="store_true",
+                        help="Exit 1 if over budget or a lazy backend was imported")
+    args = parser.parse_args()
+
+    rows = profile_imports()
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for module, self_us, cumulative_us, depth in sorted(rows, key=lambda r: -r[2])[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {'  ' * depth}{module}")
+
+    timings, framework_timings, loaded = measure(args.runs)
+    median = statistics.median(timings)
+    app_median = median - statistics.median(framework_timings)
+    print(f"\nimport app.main: median {median:.1f} ms, min {min(timings):.1f} ms, "
+          f"max {max(timings):.1f} ms over {args.runs} runs (budget {args.budget_ms:g} ms)")
+    print(f"Above bare FastAPI: median {app_median:.1f} ms (budget {args.app_budget_ms:g} ms)")
+    print(f"Lazy backends loaded at import: {', '.join(loaded) or 'none'}")
+
+    if args.check:
+        failures = []
+        if median > args.budget_ms:
+            failures.append(f"median import time {median:.1f} ms exceeds {args.budget_ms:g} ms")
+        if app_median > args.app_budget_ms:
+            failures.append(f"median import time above FastAPI {app_median:.1f} ms "
+                            f"exceeds {args.app_budget_ms:g} ms")
+        if loaded:
+            failures.append(f"imported eagerly: {', '.join(loaded)}")
+        if failures:
+            for failure in failures:
+                print(f"FAIL: {failure}")
+            sys.exit(1)
+        print("Startup import budget OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""Endpoint benchmark suite that runs without network access.
+
+S3 is served by moto and the database by a temporary SQLite file; requests go
+through the ASGI app with httpx's ``ASGITransport``. Each scenario reports
+throughput and p50/p99 latency. Results can be saved as a baseline and later
+runs compared against it::
+
+    python -m app.benchmarks.suite --baseline endpoints.json --save-baseline
+    python -m app.benchmarks.suite --baseline endpoints.json --compare   # exits 1 on regression
+
+Any failed request (status >= 400) fails the run, since its latency says
+nothing about the endpoint's speed. Baselines are machine-specific, so none is
+committed; record one on the machine that runs the comparison.
+
+Needs the ``bench`` extra (moto, httpx).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+BENCH_BUCKET = "benchmark-bucket"
+SEED_ITEMS = 1000
+SEED_OBJECTS = 500
+SMALL_OBJECT = b"x" * 4096
+
+
+def configure_environment(db_path: str, response_cache: bool) -> None:
+    """Point the app at local stand-ins. Must run before the app is imported."""
+    os.environ.update({
+        "AWS_ACCESS_KEY_ID": "benchmark",
+        "AWS_SECRET_ACCESS_KEY": "benchmark",
+        "AWS_DEFAULT_REGION": "us-east-1",
+        "AWS_REGION": "us-east-1",
+        "S3_BUCKET_NAME": BENCH_BUCKET,
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "RESPONSE_CACHE_ENABLED": "true" if response_cache else "false",
+        "TRACING_EXPORTER": "none",
+    })
+    os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+
+def mock_s3():
+    """Return moto's S3 mock context manager (moto 5 and 4 APIs)."""
+    try:
+        from moto import mock_aws
+        return mock_aws()
+    except ImportError:
+        from moto import mock_s3 as moto_mock_s3
+        return moto_mock_s3()
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_scenario(client, name: str, make_request: Callable, requests: int,
+                       concurrency: int) -> dict:
+    """Issue `requests` calls with bounded concurrency and summarize latencies."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+    first_error = None
+
+    async def one(i: int):
+        nonlocal errors, first_error
+        async with semaphore:
+            started = time.perf_counter()
+            response = await make_request(client, i)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+                first_error = first_error or f"{response.status_code} {response.text[:200]}"
+
+    # Warm up code paths and connection setup before measuring
+    for i in range(min(5, requests)):
+        await make_request(client, i)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        "scenario": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "first_error": first_error,
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+    }
+
+
+def scenarios() -> Dict[str, Callable]:
+    """Endpoint scenarios: name -> async request function(client, i)."""
+    files = {"file": ("bench.bin", SMALL_OBJECT, "application/octet-stream")}
+    return {
+        "health": lambda c, i: c.get("/health"),
+        "db_create": lambda c, i: c.post("/db/create", json={"name": f"bench-{i}", "description": "benchmark"}),
+        "db_read_100": lambda c, i: c.get("/db/read", params={"limit": 100, "offset": i % 10}),
+        "db_read_1000": lambda c, i: c.get("/db/read", params={"limit": 1000}),
+        "db_read_item": lambda c, i: c.get(f"/db/read/{i % SEED_ITEMS + 1}"),
+        "s3_upload_4k": lambda c, i: c.post("/s3/upload", params={"key": f"bench/upload-{i}.bin"}, files=files),
+        "s3_list": lambda c, i: c.get("/s3/list", params={"prefix": "seed/"}),
+        "s3_download_4k": lambda c, i: c.get(f"/s3/download/seed/object-{i % SEED_OBJECTS:04d}.bin"),
+        "s3_metadata": lambda c, i: c.get(f"/s3/metadata/seed/object-{i % SEED_OBJECTS:04d}.bin"),
+    }
+
+
+def seed(app_modules) -> None:
+    """Create the bucket, table and fixture data."""
+    s3_operations, models = app_modules
+    client = s3_operations.get_s3_client()
+    client.create_bucket(Bucket=BENCH_BUCKET)
+    for i in range(SEED_OBJECTS):
+        client.put_object(Bucket=BENCH_BUCKET, Key=f"seed/object-{i:04d}.bin", Body=SMALL_OBJECT)
+
+    models.init_db()
+    session = models.get_db_session()
+    try:
+        session.add_all(models.Item(name=f"seed-{i}", description="seed row") for i in range(SEED_ITEMS))
+        session.commit()
+    finally:
+        session.close()
+
+
+async def run_suite(requests: int, concurrency: int, only: List[str]) -> List[dict]:
+    import httpx
+    from app import models, s3_operations
+    from app.main import app
+
+    seed((s3_operations, models))
+    transport = httpx.ASGITransport(app=app)
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for name, make_request in scenarios().items():
+            if only and name not in only:
+                continue
+            results.append(await run_scenario(client, name, make_request, requests, concurrency))
+    return results
+
+
+def failures(results: List[dict]) -> List[str]:
+    """Return one line per scenario that had failed requests."""
+    return [
+        f"{row['scenario']}: {row['errors']}/{row['requests']} requests failed "
+        f"(first: {row['first_error']})"
+        for row in results if row["errors"]
+    ]
+
+
+def compare(results: List[dict], baseline: dict, threshold: float) -> List[str]:
+    """Return regressions: failed requests, or p50/p99 slower or throughput lower
+    by more than threshold."""
+    previous = {row["scenario"]: row for row in baseline.get("results", [])}
+    regressions = failures(results)
+    for row in results:
+        if row["errors"]:
+            continue
+        base = previous.get(row["scenario"])
+        if not base:
+            continue
+        for metric in ("p50_ms", "p99_ms"):
+            if base[metric] and row[metric] > base[metric] * (1 + threshold):
+                regressions.append(
+                    f"{row['scenario']}: {metric} {base[metric]} -> {row[metric]}"
+                )
+        if row["throughput_rps"] < base["throughput_rps"] * (1 - threshold):
+            regressions.append(
+                f"{row['scenario']}: throughput_rps {base['throughput_rps']} -> {row['throughput_rps']}"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--scenario", action="append", default=[], help="Run only these scenarios")
+    parser.add_argument("--response-cache", action="store_true", help="Benchmark with the response cache on")
+    parser.add_argument("--baseline", type=Path,
+                        help="Baseline JSON (required with --save-baseline/--compare)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true", help="Fail on regressions against the baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative slowdown")
+    parser.add_argument("--output", type=Path, help="Write results JSON here")
+    args = parser.parse_args()
+    if (args.save_baseline or args.compare) and not args.baseline:
+        parser.error("--save-baseline and --compare need --baseline PATH")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_environment(os.path.join(tmp, "benchmark.db"), args.response_cache)
+        with mock_s3():
+            results = asyncio.run(run_suite(args.requests, args.concurrency, args.scenario))
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "results": results,
+    }
+    print(f"{'scenario':<16} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for row in results:
+        print(f"{row['scenario']:<16} {row['throughput_rps']:>9.1f} {row['p50_ms']:>9.3f} "
+              f"{row['p99_ms']:>9.3f} {row['errors']:>7}")
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+    failed = failures(results)
+    if failed:
+        # Never record or compare timings of requests that did not succeed
+        print("Failed scenarios:")
+        for line in failed:
+            print(f"  {line}")
+        sys.exit(1)
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Baseline saved to {args.baseline}")
+    if args.compare:
+        if not args.baseline.exists():
+            sys.exit(f"No baseline at {args.baseline}; run with --save-baseline first")
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.threshold)
+        if regressions:
+            print("Regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
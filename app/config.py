@@ -9,6 +9,23 @@ class Settings(BaseSettings):
     # AWS Configuration
     aws_region: str = "us-east-1"
     s3_bucket_name: Optional[str] = None
+    s3_max_concurrency: int = 8  # Parallel S3 requests for bulk operations
+    s3_copy_part_size: int = 512 * 1024 * 1024  # Part size for multipart server-side copies
+    s3_upload_part_size: int = 8 * 1024 * 1024  # Part size for streamed (multipart) uploads
+    s3_select_enabled: bool = True  # Push /s3/query filters down to S3 Select when available
+    s3_dedupe_enabled: bool = False  # Default for content-addressed upload deduplication
+    s3_dedupe_index_size: int = 10000  # Entries kept in the local hash -> key index
+    # Hand /s3/download bodies to nginx (X-Accel-Redirect to a presigned URL)
+    download_offload_enabled: bool = False
+    download_offload_location: str = "/_s3_offload"  # Internal nginx location
+    download_offload_url_ttl: int = 60  # Seconds; nginx uses the URL immediately
+    
+    # S3 object compression (opt-in): "gzip" or "zstd", None stores bytes as-is
+    s3_compression: Optional[str] = None
+    s3_compression_level: Optional[int] = None
+    # Comma-separated content types and key glob patterns that get compressed
+    s3_compression_content_types: str = "application/json,application/x-ndjson,text/csv,text/plain"
+    s3_compression_key_patterns: str = "*.json,*.ndjson,*.jsonl,*.csv,*.txt"
     
     # Database Configuration
     db_host: Optional[str] = None
@@ -16,11 +33,69 @@ class Settings(BaseSettings):
     db_name: Optional[str] = None
     db_user: str = "admin"
     db_password: Optional[str] = None
+    database_url: Optional[str] = None  # Overrides the DB_* settings (e.g. SQLite for benchmarks)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    # Connections one container may hold in total; gunicorn splits it across workers
+    # (db.t3.micro Postgres allows about 80). 0 leaves each worker's pool as configured
+    db_max_connections: int = 40
+    db_warm_connections: int = 2  # Pool connections opened during startup warmup
+    warmup_retry_interval: float = 5.0  # Seconds between retries of failed warmup checks
     
     # Application Configuration
     app_name: str = "Pulumi Provisioning API"
     app_version: str = "1.0.0"
     debug: bool = False
+    metrics_enabled: bool = True  # Record request metrics and expose /metrics
+    json_serializer: str = "orjson"  # "orjson" or "stdlib"
+    
+    # Tracing: exporter is "none", "memory", "file", "log" or "package.module:Class"
+    tracing_exporter: str = "none"
+    tracing_sample_rate: float = 0.05  # Share of requests without an upstream decision
+    tracing_file: str = "/tmp/traces.jsonl"
+    
+    # Admission control: per-worker concurrency budgets for /db/* and /s3/*
+    admission_enabled: bool = True
+    admission_db_max_concurrency: int = 15  # Matches db_pool_size + db_max_overflow
+    admission_s3_max_concurrency: int = 32
+    admission_transfer_max_concurrency: int = 8  # Fixed budget for /s3/upload* transfers
+    admission_min_concurrency: int = 2  # Floor for the adaptive limit
+    admission_max_queue: int = 50  # Requests allowed to wait for a slot
+    admission_queue_timeout: float = 5.0  # Seconds a request may wait before a 503
+    admission_retry_after: int = 1  # Retry-After seconds on 503
+    
+    # Response cache for read endpoints: comma-separated "path-prefix=ttl-seconds"
+    response_cache_enabled: bool = True
+    response_cache_routes: str = "/db/read=5,/s3/list=5"
+    response_cache_max_entries: int = 1024
+    # Shared directory so invalidations reach every worker process
+    response_cache_invalidation_dir: Optional[str] = None
+    
+    # Background jobs: "memory" (this process only), "database" (shared and durable)
+    # or "auto" (the database whenever one is configured)
+    jobs_enabled: bool = True
+    jobs_backend: str = "auto"
+    jobs_workers: int = 2  # Job threads per process, apart from request handling
+    jobs_poll_interval: float = 1.0  # Seconds between polls of an empty queue
+    jobs_lease_seconds: int = 300  # A running job not renewed for this long is retried
+    jobs_max_attempts: int = 3
+    jobs_retention_seconds: int = 86400  # Finished jobs kept by the memory backend
+    
+    # Server Configuration
+    server_mode: str = "uvicorn"  # "uvicorn" (single process) or "gunicorn" (worker manager)
+    server_reload: bool = False  # uvicorn mode only
+    host: str = "0.0.0.0"
+    port: int = 8000
+    # Also listen on this Unix socket (shared with nginx through a bind mount)
+    unix_socket: Optional[str] = None
+    web_workers: int = 0  # 0 = derive from CPU count
+    web_worker_class: str = "uvicorn.workers.UvicornWorker"
+    web_max_requests: int = 10000  # Recycle workers after N requests (0 disables)
+    web_max_requests_jitter: int = 1000  # Spread recycling so workers don't restart together
+    web_timeout: int = 60
+    web_graceful_timeout: int = 30
+    web_keepalive: int = 30
+    web_preload_app: bool = True
     
     class Config:
         env_file = ".env"
@@ -1,9 +1,13 @@
 """Database operations."""
-from typing import List, Optional, Dict
-from app.models import get_db_session, Item, init_db
+from typing import Iterator, List, Optional, Dict
+from app.models import get_db_session, Item, init_db, checkout_connection
+from app.response_cache import invalidate
+from app.tracing import traced
+from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 
 
+@traced()
 def check_db_connection() -> dict:
     """Check database connection status."""
     session = get_db_session()
@@ -15,7 +19,8 @@ def check_db_connection() -> dict:
     
     try:
         # Try to execute a simple query
-        session.execute("SELECT 1")
+        checkout_connection(session)
+        session.execute(text("SELECT 1"))
         session.close()
         return {
             "status": "connected",
@@ -28,6 +33,7 @@ def check_db_connection() -> dict:
         }
 
 
+@traced()
 def create_item(name: str, description: Optional[str] = None) -> dict:
     """Create a new item in the database."""
     session = get_db_session()
@@ -38,10 +44,12 @@ def create_item(name: str, description: Optional[str] = None) -> dict:
         # Initialize database if needed
         init_db()
         
+        checkout_connection(session)
         item = Item(name=name, description=description)
         session.add(item)
         session.commit()
         session.refresh(item)
+        invalidate("db")
         
         return {
             "id": item.id,
@@ -56,6 +64,7 @@ def create_item(name: str, description: Optional[str] = None) -> dict:
         session.close()
 
 
+@traced()
 def get_items(limit: int = 100, offset: int = 0) -> List[dict]:
     """Get items from database."""
     session = get_db_session()
@@ -63,6 +72,7 @@ def get_items(limit: int = 100, offset: int = 0) -> List[dict]:
         return []
     
     try:
+        checkout_connection(session)
         items = session.query(Item).offset(offset).limit(limit).all()
         return [
             {
@@ -79,6 +89,7 @@ def get_items(limit: int = 100, offset: int = 0) -> List[dict]:
         session.close()
 
 
+@traced()
 def get_item(item_id: int) -> Optional[dict]:
     """Get a single item by ID."""
     session = get_db_session()
@@ -86,6 +97,7 @@ def get_item(item_id: int) -> Optional[dict]:
         return None
     
     try:
+        checkout_connection(session)
         item = session.query(Item).filter(Item.id == item_id).first()
         if item:
             return {
@@ -100,3 +112,37 @@ def get_item(item_id: int) -> Optional[dict]:
     finally:
         session.close()
 
+
+def iter_items(batch_size: int = 1000) -> Iterator[dict]:
+    """Yield every item in id order, reading it in keyset-paginated batches."""
+    session = get_db_session()
+    if not session:
+        raise Exception("Database not configured")
+    
+    try:
+        checkout_connection(session)
+        last_id = 0
+        while True:
+            batch = (
+                session.query(Item)
+                .filter(Item.id > last_id)
+                .order_by(Item.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                return
+            for item in batch:
+                yield {
+                    "id": item.id,
+                    "name": item.name,
+                    "description": item.description,
+                    "created_at": item.created_at.isoformat()
+                }
+            last_id = batch[-1].id
+            # Drop the batch from the identity map so memory stays flat
+            session.expunge_all()
+    except SQLAlchemyError as e:
+        raise Exception(f"Error exporting items: {str(e)}")
+    finally:
+        session.close()
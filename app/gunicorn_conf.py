@@ -0,0 +1,79 @@
+"""Gunicorn configuration for the production serving mode.
+
+Used as ``gunicorn -c python:app.gunicorn_conf app.main:app``; every value
+comes from ``Settings`` so it can be tuned through environment variables.
+"""
+import logging
+import os
+
+from app import jobs
+from app.config import settings
+from app.metrics import mark_process_dead
+from app.startup import import_backends
+
+logger = logging.getLogger(__name__)
+
+
+def default_worker_count() -> int:
+    """Derive the worker count from the CPUs available to this process."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    # Handlers block in boto3/SQLAlchemy calls, so run more workers than cores
+    return 2 * cpus + 1
+
+
+def limit_db_pools(worker_count: int) -> None:
+    """Shrink each worker's pool so all workers together stay within DB_MAX_CONNECTIONS."""
+    if not settings.db_max_connections:
+        return
+    per_worker = max(1, settings.db_max_connections // worker_count)
+    settings.db_pool_size = min(settings.db_pool_size, per_worker)
+    settings.db_max_overflow = max(0, min(settings.db_max_overflow,
+                                          per_worker - settings.db_pool_size))
+    # The /db/* admission budget assumes it can use the whole pool
+    settings.admission_db_max_concurrency = min(settings.admission_db_max_concurrency,
+                                                settings.db_pool_size + settings.db_max_overflow)
+
+
+bind = [f"{settings.host}:{settings.port}"]
+if settings.unix_socket:
+    # nginx on the same host proxies here; the TCP bind stays for health checks
+    bind.append(f"unix:{settings.unix_socket}")
+workers = settings.web_workers or default_worker_count()
+# Settings are changed here, before the app is loaded and workers fork
+limit_db_pools(workers)
+if settings.jobs_enabled and workers > 1 and jobs.backend_name() == "memory":
+    # A job accepted by one worker would be invisible (404) to all the others.
+    # Jobs are an add-on, so the API still starts, with /jobs answering 503
+    logger.warning(
+        "Background jobs disabled: with %d workers they need JOBS_BACKEND=database "
+        "(and a database); set WEB_WORKERS=1 to keep them on the memory backend", workers
+    )
+    settings.jobs_enabled = False
+worker_class = settings.web_worker_class
+max_requests = settings.web_max_requests
+max_requests_jitter = settings.web_max_requests_jitter
+timeout = settings.web_timeout
+graceful_timeout = settings.web_graceful_timeout
+keepalive = settings.web_keepalive
+# Import the app once in the master so workers fork with it already loaded
+preload_app = settings.web_preload_app
+if preload_app:
+    # The app imports boto3/SQLAlchemy lazily; load the ones this deployment uses
+    # here so forked workers share them instead of each importing them again
+    import_backends()
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    """Let the nginx user connect to the Unix socket (created by the container's root)."""
+    if settings.unix_socket:
+        os.chmod(settings.unix_socket, 0o666)
+
+
+def child_exit(server, worker):
+    """Clean up a worker's multiprocess metrics when it exits."""
+    mark_process_dead(worker.pid)
@@ -0,0 +1,401 @@
+"""Background jobs for long-running S3 and database work.
+
+``POST /jobs`` stores a job and returns ``202`` at once; a bounded set of
+worker threads in each process claims queued jobs and runs them, and
+``GET /jobs/{id}`` reports status, progress and the result. Queue backends
+(``JOBS_BACKEND``):
+
+- ``memory``: a queue inside the process. Jobs are lost on restart and only
+  visible to the process that accepted them, so use it with a single worker.
+- ``database``: the ``jobs`` table in the application database. Any worker
+  process or instance can claim and report jobs (``FOR UPDATE SKIP LOCKED``
+  on Postgres), and a job whose worker died is retried when its lease lapses.
+- ``auto`` (default): ``database`` when a database is configured, else ``memory``.
+
+The gunicorn config turns jobs off (``/jobs`` answers 503) rather than run
+several workers on the memory backend.
+"""
+import json
+import logging
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from app.config import settings
+from app.lazy import lazy_import
+
+s3_operations = lazy_import("app.s3_operations")
+db_operations = lazy_import("app.db_operations")
+models = lazy_import("app.models")
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED = (SUCCEEDED, FAILED)
+PROGRESS_INTERVAL = 1.0  # Seconds between stored progress updates
+EXPORT_SPOOL_SIZE = 64 * 1024 * 1024  # Exports larger than this spill to disk
+
+
+# Job types: name -> (handler(params, report), required params)
+
+def _delete_prefix(params: dict, report: Callable) -> dict:
+    return s3_operations.delete_prefix(
+        params["prefix"], on_progress=lambda deleted: report(deleted=deleted)
+    )
+
+
+def _copy_prefix(params: dict, report: Callable) -> dict:
+    result = s3_operations.copy_prefix(
+        params["source"],
+        params["destination"],
+        delete_source=bool(params.get("delete_source", False)),
+        on_progress=lambda processed: report(processed=processed),
+    )
+    # Keep the stored result small: per-object entries only for failures
+    result["objects"] = [entry for entry in result["objects"] if entry["status"] == "failed"]
+    return result
+
+
+def _export_items(params: dict, report: Callable) -> dict:
+    """Write every item to S3 as JSON Lines."""
+    batch_size = int(params.get("batch_size", 1000))
+    count = 0
+    with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE) as spool:
+        for item in db_operations.iter_items(batch_size=batch_size):
+            spool.write(json.dumps(item).encode() + b"\n")
+            count += 1
+            if count % batch_size == 0:
+                report(exported=count)
+        size = spool.tell()
+        spool.seek(0)
+        s3_operations.upload_fileobj(spool, params["key"], content_type="application/x-ndjson")
+    return {"key": params["key"], "count": count, "size": size}
+
+
+JOB_TYPES: Dict[str, tuple] = {
+    "s3.delete_prefix": (_delete_prefix, ("prefix",)),
+    "s3.copy_prefix": (_copy_prefix, ("source", "destination")),
+    "db.export_items": (_export_items, ("key",)),
+}
+
+
+def _new_job(job_type: str, params: dict) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "type": job_type,
+        "status": QUEUED,
+        "params": params,
+        "progress": None,
+        "result": None,
+        "error": None,
+        "attempts": 0,
+        "created_at": datetime.utcnow(),
+        "started_at": None,
+        "finished_at": None,
+    }
+
+
+def describe(job: dict) -> dict:
+    """Public view of a job, with timestamps as ISO strings."""
+    return {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in job.items()
+        if key != "lease_expires_at"
+    }
+
+
+# Queue backends
+
+class MemoryJobStore:
+    """Jobs and their queue held in this process."""
+
+    def __init__(self):
+        self._jobs: Dict[str, dict] = {}
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._lock = threading.Lock()
+
+    def add(self, job: dict) -> None:
+        with self._lock:
+            self._prune()
+            self._jobs[job["id"]] = job
+        self._queue.put(job["id"])
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def claim(self, timeout: float) -> Optional[dict]:
+        try:
+            job_id = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job.update(status=RUNNING, started_at=datetime.utcnow(), attempts=job["attempts"] + 1)
+            return dict(job)
+
+    def report(self, job_id: str, progress: dict) -> None:
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id]["progress"] = progress
+
+    def renew(self, job_ids: List[str]) -> None:
+        pass
+
+    def finish(self, job_id: str, status: str, result=None, error: Optional[str] = None) -> None:
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(
+                    status=status, result=result, error=error, finished_at=datetime.utcnow()
+                )
+
+    def _prune(self) -> None:
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.jobs_retention_seconds)
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job["status"] in FINISHED and job["finished_at"] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+class DatabaseJobStore:
+    """Jobs stored in the ``jobs`` table, shared by every process."""
+
+    def __init__(self):
+        # Wakes local workers when this process enqueues, instead of waiting a poll
+        self._wakeup = threading.Event()
+
+    def _session(self):
+        session = models.get_db_session()
+        if not session:
+            raise Exception("Database not configured")
+        models.init_db()
+        return session
+
+    @staticmethod
+    def _to_dict(row) -> dict:
+        return {column.name: getattr(row, column.name) for column in row.__table__.columns}
+
+    def add(self, job: dict) -> None:
+        session = self._session()
+        try:
+            session.add(models.Job(**job))
+            session.commit()
+        finally:
+            session.close()
+        self._wakeup.set()
+
+    def get(self, job_id: str) -> Optional[dict]:
+        session = self._session()
+        try:
+            row = session.get(models.Job, job_id)
+            return self._to_dict(row) if row else None
+        finally:
+            session.close()
+
+    def claim(self, timeout: float) -> Optional[dict]:
+        job = self._claim_next()
+        if job is None:
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+        return job
+
+    def _claim_next(self) -> Optional[dict]:
+        from sqlalchemy import and_, or_
+        Job = models.Job
+        session = self._session()
+        try:
+            while True:
+                now = datetime.utcnow()
+                row = (
+                    session.query(Job)
+                    .filter(or_(
+                        Job.status == QUEUED,
+                        and_(Job.status == RUNNING, Job.lease_expires_at < now),
+                    ))
+                    .order_by(Job.created_at)
+                    .with_for_update(skip_locked=True)
+                    .first()
+                )
+                if row is None:
+                    session.rollback()
+                    return None
+                if row.attempts >= settings.jobs_max_attempts:
+                    row.status = FAILED
+                    row.error = f"Abandoned after {row.attempts} attempts"
+                    row.finished_at = now
+                    session.commit()
+                    continue
+                row.status = RUNNING
+                row.attempts += 1
+                row.started_at = now
+                row.lease_expires_at = now + timedelta(seconds=settings.jobs_lease_seconds)
+                job = self._to_dict(row)
+                session.commit()
+                return job
+        finally:
+            session.close()
+
+    def _update(self, job_ids: List[str], values: dict) -> None:
+        session = self._session()
+        try:
+            session.query(models.Job).filter(models.Job.id.in_(job_ids)).update(
+                values, synchronize_session=False
+            )
+            session.commit()
+        finally:
+            session.close()
+
+    def _lease(self) -> datetime:
+        return datetime.utcnow() + timedelta(seconds=settings.jobs_lease_seconds)
+
+    def report(self, job_id: str, progress: dict) -> None:
+        self._update([job_id], {"progress": progress, "lease_expires_at": self._lease()})
+
+    def renew(self, job_ids: List[str]) -> None:
+        self._update(job_ids, {"lease_expires_at": self._lease()})
+
+    def finish(self, job_id: str, status: str, result=None, error: Optional[str] = None) -> None:
+        self._update([job_id], {
+            "status": status,
+            "result": result,
+            "error": error,
+            "finished_at": datetime.utcnow(),
+            "lease_expires_at": None,
+        })
+
+
+def backend_name() -> str:
+    """Resolve ``JOBS_BACKEND``, turning ``auto`` into a concrete backend."""
+    if settings.jobs_backend == "auto":
+        return "database" if (settings.database_url or settings.db_host) else "memory"
+    return settings.jobs_backend
+
+
+def build_store(name: Optional[str] = None):
+    """Create the queue backend named by settings (or by ``name``)."""
+    name = name or backend_name()
+    if name == "memory":
+        return MemoryJobStore()
+    if name == "database":
+        return DatabaseJobStore()
+    raise ValueError(f"Unknown jobs backend: {name}")
+
+
+store = build_store()
+
+
+# Workers
+
+class JobRunner:
+    """A bounded pool of threads running claimed jobs."""
+
+    def __init__(self, job_store, workers: int):
+        self.store = job_store
+        self.workers = workers
+        self._threads: List[threading.Thread] = []
+        self._stopping = threading.Event()
+        self._active = set()
+        self._active_lock = threading.Lock()
+
+    def start(self) -> None:
+        self._stopping.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop claiming jobs; running jobs finish, or are retried after their lease."""
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                job = self.store.claim(timeout=settings.jobs_poll_interval)
+            except Exception as e:
+                logger.warning("Claiming a job failed: %s", e)
+                self._stopping.wait(settings.jobs_poll_interval)
+                continue
+            if job is not None:
+                try:
+                    self.run(job)
+                except Exception:
+                    # Storing the outcome failed (e.g. the database is down); the job
+                    # is retried when its lease lapses, and this worker keeps going
+                    logger.exception("Job %s (%s) could not be completed", job["id"], job["type"])
+
+    def _heartbeat(self) -> None:
+        # Renew leases so long steps without progress reports are not retried
+        while not self._stopping.wait(settings.jobs_lease_seconds / 3):
+            with self._active_lock:
+                job_ids = list(self._active)
+            if job_ids:
+                try:
+                    self.store.renew(job_ids)
+                except Exception as e:
+                    logger.warning("Renewing job leases failed: %s", e)
+
+    def run(self, job: dict) -> None:
+        handler, _ = JOB_TYPES[job["type"]]
+        last_report = 0.0
+
+        def report(**progress):
+            nonlocal last_report
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                self.store.report(job["id"], progress)
+
+        with self._active_lock:
+            self._active.add(job["id"])
+        try:
+            result = handler(job["params"], report)
+        except Exception as e:
+            logger.warning("Job %s (%s) failed: %s", job["id"], job["type"], e)
+            self.store.finish(job["id"], FAILED, error=str(e))
+        else:
+            self.store.finish(job["id"], SUCCEEDED, result=result)
+        finally:
+            with self._active_lock:
+                self._active.discard(job["id"])
+
+
+runner = JobRunner(store, settings.jobs_workers)
+
+
+def submit(job_type: str, params: dict) -> dict:
+    """Validate and enqueue a job. Raises ValueError for bad input."""
+    if job_type not in JOB_TYPES:
+        raise ValueError(f"Unknown job type: {job_type}")
+    _, required = JOB_TYPES[job_type]
+    missing = [name for name in required if not params.get(name)]
+    if missing:
+        raise ValueError(f"Missing job parameters: {', '.join(missing)}")
+    if job_type == "s3.copy_prefix":
+        s3_operations.check_copy_prefixes(params["source"], params["destination"])
+    job = _new_job(job_type, params)
+    accepted = describe(job)
+    store.add(job)
+    return accepted
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    """Current state of a job, or None if unknown."""
+    job = store.get(job_id)
+    return describe(job) if job else None
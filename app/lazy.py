@@ -0,0 +1,41 @@
+"""Deferred module imports.
+
+``lazy_import("app.s3_operations")`` returns a proxy that imports the module on
+first attribute access, so importing the app does not pay for boto3 or
+SQLAlchemy until a request (or startup warmup) actually needs them.
+"""
+import importlib
+import sys
+import threading
+
+
+class LazyModule:
+    """Proxy that imports the named module on first attribute access."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None or self._name in sys.modules
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Return a lazy proxy for a module."""
+    return LazyModule(name)
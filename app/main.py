@@ -1,20 +1,71 @@
 """FastAPI application main file."""
-from fastapi import FastAPI, HTTPException, UploadFile, File
-from fastapi.responses import JSONResponse, StreamingResponse
+import asyncio
+import io
+import tempfile
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, UploadFile, File, Header, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from starlette.requests import ClientDisconnect
 from typing import List, Optional
+from urllib.parse import urlsplit
 from pydantic import BaseModel
-import io
 
 from app.config import settings
-from app.s3_operations import list_objects, upload_file, download_file, delete_file
-from app.db_operations import check_db_connection, create_item, get_items, get_item
+from app import jobs, startup
+from app.admission import AdmissionControlMiddleware
+from app.metrics import MetricsMiddleware, render_metrics
+from app.response_cache import ResponseCacheMiddleware
+from app.serialization import ResponseClass, json_response
+from app.tracing import TracingMiddleware
+from app.lazy import lazy_import
+
+# boto3 and SQLAlchemy are imported on first use (or during startup warmup)
+s3_operations = lazy_import("app.s3_operations")
+s3_query_ops = lazy_import("app.s3_query")
+db_operations = lazy_import("app.db_operations")
+
+# Pre-serialized /health body, frozen at startup
+HEALTH_BODY = b""
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Freeze the health payload and warm clients in the background."""
+    global HEALTH_BODY
+    HEALTH_BODY = startup.build_health_payload()
+    # Warmup runs alongside serving so /health answers immediately; /ready waits for it
+    warmup_task = asyncio.create_task(run_in_threadpool(startup.warmup))
+    if settings.jobs_enabled:
+        jobs.runner.start()
+    yield
+    startup.stop()
+    if not warmup_task.done():
+        warmup_task.cancel()
+    if settings.jobs_enabled:
+        await run_in_threadpool(jobs.runner.stop)
+
 
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
-    debug=settings.debug
+    debug=settings.debug,
+    lifespan=lifespan,
+    default_response_class=ResponseClass
 )
 
+# Middleware added last runs first: metrics wrap the cache so hits are counted too,
+# and cache hits are served before admission control spends a slot on them
+if settings.admission_enabled:
+    app.add_middleware(AdmissionControlMiddleware)
+if settings.response_cache_enabled:
+    app.add_middleware(ResponseCacheMiddleware)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+if settings.tracing_exporter != "none":
+    app.add_middleware(TracingMiddleware)
+
 
 # Pydantic models
 class ItemCreate(BaseModel):
@@ -22,6 +73,17 @@ class ItemCreate(BaseModel):
     description: Optional[str] = None
 
 
+class CopyRequest(BaseModel):
+    source: str
+    destination: str
+    prefix: bool = False  # Treat source/destination as key prefixes
+
+
+class JobCreate(BaseModel):
+    type: str  # One of jobs.JOB_TYPES
+    params: dict = {}
+
+
 class ItemResponse(BaseModel):
     id: int
     name: str
@@ -33,26 +95,21 @@ class ItemResponse(BaseModel):
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    import os
-    import socket
-    
-    # Get container/host info if available
-    hostname = socket.gethostname()
-    
-    # Try to get image info from environment (if set during deployment)
-    image_tag = os.getenv("IMAGE_TAG", "unknown")
-    container_name = os.getenv("HOSTNAME", hostname)
-    
-    return {
-        "status": "healthy",
-        "app_name": settings.app_name,
-        "version": settings.app_version,
-        "hostname": hostname,
-        "container_name": container_name,
-        "image_tag": image_tag,
-        "aws_region": os.getenv("AWS_REGION", "unknown"),
-        "s3_bucket": os.getenv("S3_BUCKET_NAME", "not configured"),
-    }
+    return Response(content=HEALTH_BODY, media_type="application/json")
+
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness endpoint: 200 once every warmup check has passed, 503 before."""
+    status = startup.readiness()
+    return json_response(status, status_code=200 if startup.state["ready"] else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics (aggregated across workers in multiprocess mode)."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 
 # S3 endpoints
@@ -60,37 +117,285 @@ async def health_check():
 async def s3_list(prefix: Optional[str] = None):
     """List objects in S3 bucket."""
     try:
-        objects = list_objects(prefix=prefix)
-        return {
+        objects = await run_in_threadpool(s3_operations.list_objects, prefix=prefix)
+        return json_response({
             "bucket": settings.s3_bucket_name,
             "count": len(objects),
             "objects": objects
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/s3/upload")
-async def s3_upload(key: str, file: UploadFile = File(...)):
-    """Upload file to S3."""
+async def s3_upload(
+    key: str,
+    dedupe: Optional[bool] = None,
+    checksum: Optional[str] = None,
+    file: UploadFile = File(...)
+):
+    """Upload file to S3.
+    
+    The whole file is read into memory; large files go through
+    ``/s3/upload-stream/{key}``, which skips deduplication and compresses
+    only bodies smaller than one part.
+    """
+    if dedupe is None:
+        dedupe = settings.s3_dedupe_enabled
     try:
         file_content = await file.read()
-        result = upload_file(file_content, key)
-        return result
+        result = await run_in_threadpool(
+            s3_operations.upload_file,
+            file_content,
+            key,
+            content_type=file.content_type,
+            dedupe=dedupe,
+            checksum=checksum
+        )
+        return json_response(result)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.put("/s3/upload-stream/{key:path}")
+async def s3_upload_stream(key: str, request: Request):
+    """Upload the raw request body to S3 while it is still being received."""
+    part_size = settings.s3_upload_part_size
+    buffer = bytearray()
+    try:
+        upload = s3_operations.StreamingUpload(key, request.headers.get("content-type"))
+        try:
+            async for chunk in request.stream():
+                buffer += chunk
+                if len(buffer) >= part_size:
+                    # Parts go to S3 from worker threads while the next one arrives
+                    await run_in_threadpool(upload.submit, bytes(buffer[:part_size]))
+                    del buffer[:part_size]
+            return json_response(await run_in_threadpool(upload.complete, bytes(buffer)))
+        except BaseException:
+            await run_in_threadpool(upload.abort)
+            raise
+    except ClientDisconnect:
+        raise HTTPException(status_code=400, detail="Client disconnected during upload")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+class _RequestBodyReader(io.RawIOBase):
+    """Blocking file object over a request body, for use off the event loop.
+    
+    Each read pulls the next chunk from the event loop, so a tar archive is
+    unpacked while it is still arriving. Any thread may read it (boto3 reads
+    streamed entries from its own transfer threads).
+    """
+    
+    def __init__(self, request: Request):
+        self._loop = asyncio.get_running_loop()
+        self._chunks = request.stream()
+        self._pending = b""
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            try:
+                self._pending = asyncio.run_coroutine_threadsafe(
+                    self._chunks.__anext__(), self._loop
+                ).result()
+            except StopAsyncIteration:
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+ZIP_CONTENT_TYPES = ("application/zip", "application/x-zip-compressed")
+
+
+@app.post("/s3/upload-archive")
+async def s3_upload_archive(
+    request: Request,
+    prefix: str = "",
+    archive_format: Optional[str] = None,
+    max_workers: Optional[int] = None
+):
+    """Unpack a tar or zip archive and upload its entries under a prefix.
+    
+    The archive is the raw request body; a multipart form with a ``file``
+    field is still accepted, but is spooled before unpacking starts.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    try:
+        if content_type == "multipart/form-data":
+            file = (await request.form()).get("file")
+            if file is None or isinstance(file, str):
+                raise ValueError("Missing archive file")
+            if not archive_format:
+                archive_format = "zip" if (file.filename or "").lower().endswith(".zip") else "tar"
+            body = file.file
+        else:
+            if not archive_format:
+                archive_format = "zip" if content_type in ZIP_CONTENT_TYPES else "tar"
+            if archive_format == "zip":
+                # Zip keeps its directory at the end, so the body is spooled first
+                body = tempfile.SpooledTemporaryFile(max_size=settings.s3_upload_part_size)
+                async for chunk in request.stream():
+                    body.write(chunk)
+                body.seek(0)
+            else:
+                body = io.BufferedReader(_RequestBodyReader(request))
+        with body:
+            # Entries are uploaded from a worker thread so the event loop stays free
+            return json_response(await run_in_threadpool(
+                s3_operations.upload_archive, body, prefix, archive_format, max_workers
+            ))
+    except ClientDisconnect:
+        raise HTTPException(status_code=400, detail="Client disconnected during upload")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _offload_headers(url: str) -> dict:
+    """Hand a presigned URL to nginx's internal offload location.
+    
+    The URL travels in a header, still percent-encoded, and nginx proxies to it
+    as is; putting it in the redirect URI would have nginx decode the key.
+    """
+    parts = urlsplit(url)
+    return {
+        "X-Accel-Redirect": settings.download_offload_location,
+        "X-S3-Offload-URL": url,
+        # The object's cache key: host and path, without the expiring signature
+        "X-S3-Offload-Cache-Key": f"{parts.netloc}{parts.path}",
+    }
+
+
+def _download_validators(download: dict) -> dict:
+    validators = {}
+    if download["etag"]:
+        validators["ETag"] = download["etag"]
+    if download["last_modified"]:
+        validators["Last-Modified"] = download["last_modified"]
+    return validators
+
+
+def _download_headers(key: str, download: dict) -> dict:
+    """Response headers for a download, shared by GET and HEAD."""
+    headers = {
+        "Content-Disposition": f"attachment; filename={key.split('/')[-1]}",
+        **_download_validators(download),
+    }
+    if download["codec"]:
+        headers["Vary"] = "Accept-Encoding"
+    if download["content_encoding"]:
+        headers["Content-Encoding"] = download["content_encoding"]
+    if download["content_length"] is not None:
+        headers["Content-Length"] = str(download["content_length"])
+    return headers
+
+
 @app.get("/s3/download/{key:path}")
-async def s3_download(key: str):
+async def s3_download(
+    key: str,
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    x_sendfile_type: Optional[str] = Header(None)
+):
     """Download file from S3."""
+    conditions = {
+        "accept_encoding": accept_encoding,
+        "if_none_match": if_none_match,
+        "if_modified_since": if_modified_since,
+    }
+    offload = None
+    try:
+        # Behind nginx (which announces X-Sendfile-Type) the app only resolves the
+        # object; nginx streams the bytes from S3 itself
+        if settings.download_offload_enabled and x_sendfile_type == "X-Accel-Redirect":
+            offload = await run_in_threadpool(s3_operations.offload_download, key, **conditions)
+        download = offload or await run_in_threadpool(
+            s3_operations.open_download, key, **conditions
+        )
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    if download["not_modified"]:
+        return Response(status_code=304, headers=_download_validators(download))
+    if offload:
+        return Response(headers=_offload_headers(offload["url"]))
+    
+    return StreamingResponse(
+        download["body"],
+        media_type=download["content_type"],
+        headers=_download_headers(key, download)
+    )
+
+
+@app.head("/s3/download/{key:path}")
+async def s3_download_head(
+    key: str,
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None)
+):
+    """Return the headers a GET of the download would send, without the body."""
+    try:
+        download = await run_in_threadpool(
+            s3_operations.head_download, key,
+            accept_encoding=accept_encoding,
+            if_none_match=if_none_match,
+            if_modified_since=if_modified_since,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    if download["not_modified"]:
+        return Response(status_code=304, headers=_download_validators(download))
+    response = Response(media_type=download["content_type"],
+                        headers=_download_headers(key, download))
+    if download["content_length"] is None:
+        # GET streams the decoded body chunked; its length is not known here
+        del response.headers["content-length"]
+    return response
+
+
+@app.get("/s3/query/{key:path}")
+async def s3_query(
+    key: str,
+    where: Optional[str] = None,
+    fields: Optional[str] = None,
+    input_format: Optional[str] = None,
+    start: Optional[int] = None,
+    end: Optional[int] = None
+):
+    """Filter a CSV/TSV/JSON Lines object server-side and stream matching rows as NDJSON."""
     try:
-        file_content = download_file(key)
-        return StreamingResponse(
-            io.BytesIO(file_content),
-            media_type="application/octet-stream",
-            headers={"Content-Disposition": f"attachment; filename={key.split('/')[-1]}"}
+        result = await run_in_threadpool(
+            s3_query_ops.query_object, key, where, fields, input_format, start, end
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return StreamingResponse(
+        result["rows"],
+        media_type="application/x-ndjson",
+        headers={"X-Query-Engine": result["engine"]}
+    )
+
+
+@app.get("/s3/metadata/{key:path}")
+async def s3_metadata(key: str):
+    """Get object metadata (size, ETag, Last-Modified) without downloading it."""
+    try:
+        return json_response(await run_in_threadpool(s3_operations.head_file, key))
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
 
@@ -99,25 +404,88 @@ async def s3_download(key: str):
 async def s3_delete(key: str):
     """Delete file from S3."""
     try:
-        result = delete_file(key)
-        return result
+        result = await run_in_threadpool(s3_operations.delete_file, key)
+        return json_response(result)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _copy(request: CopyRequest, delete_source: bool) -> dict:
+    """Run a single-object or prefix copy, optionally deleting the source."""
+    if request.prefix:
+        return s3_operations.copy_prefix(
+            request.source, request.destination, delete_source=delete_source
+        )
+    return s3_operations.copy_file(
+        request.source, request.destination, delete_source=delete_source
+    )
+
+
+@app.post("/s3/copy")
+async def s3_copy(request: CopyRequest):
+    """Copy an object or prefix server-side (data never passes through the app)."""
+    try:
+        return json_response(await run_in_threadpool(_copy, request, False))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/s3/move")
+async def s3_move(request: CopyRequest):
+    """Move an object or prefix server-side (copy, then delete the source)."""
+    try:
+        return json_response(await run_in_threadpool(_copy, request, True))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Background jobs
+@app.post("/jobs", status_code=202)
+async def jobs_create(request: JobCreate):
+    """Queue a long-running S3/database job; poll /jobs/{id} for its progress."""
+    if not settings.jobs_enabled:
+        raise HTTPException(status_code=503, detail="Background jobs are disabled")
+    try:
+        job = await run_in_threadpool(jobs.submit, request.type, request.params)
+        return json_response(job, status_code=202, headers={"Location": f"/jobs/{job['id']}"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/jobs/{job_id}")
+async def jobs_status(job_id: str):
+    """Status, progress and result of a background job."""
+    try:
+        job = await run_in_threadpool(jobs.get_job, job_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return json_response(job)
 
 
 # Database endpoints
+# Handlers return json_response() directly: response_model documents the shape,
+# while the dicts from db_operations are serialized in one pass. Blocking calls
+# run in the thread pool so admission control sees the real concurrency
 @app.get("/db/status")
 async def db_status():
     """Check database connection status."""
-    return check_db_connection()
+    return json_response(await run_in_threadpool(db_operations.check_db_connection))
 
 
 @app.post("/db/create", response_model=ItemResponse)
 async def db_create(item: ItemCreate):
     """Create a new item in the database."""
     try:
-        result = create_item(item.name, item.description)
-        return ItemResponse(**result)
+        result = await run_in_threadpool(db_operations.create_item, item.name, item.description)
+        return json_response(result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -126,8 +494,8 @@ async def db_create(item: ItemCreate):
 async def db_read(limit: int = 100, offset: int = 0):
     """Read items from database."""
     try:
-        items = get_items(limit=limit, offset=offset)
-        return [ItemResponse(**item) for item in items]
+        items = await run_in_threadpool(db_operations.get_items, limit=limit, offset=offset)
+        return json_response(items)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -136,10 +504,10 @@ async def db_read(limit: int = 100, offset: int = 0):
 async def db_read_item(item_id: int):
     """Read a single item by ID."""
     try:
-        item = get_item(item_id)
+        item = await run_in_threadpool(db_operations.get_item, item_id)
         if not item:
             raise HTTPException(status_code=404, detail="Item not found")
-        return ItemResponse(**item)
+        return json_response(item)
     except HTTPException:
         raise
     except Exception as e:
@@ -147,6 +515,6 @@ async def db_read_item(item_id: int):
 
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    from app.serve import main
+    main()
 
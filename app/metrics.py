@@ -0,0 +1,158 @@
+"""Prometheus metrics for HTTP requests, S3 calls and database queries.
+
+Set ``PROMETHEUS_MULTIPROC_DIR`` to a writable directory when running several
+worker processes; each worker then writes its samples there and ``/metrics``
+aggregates them.
+"""
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+)
+from prometheus_client import multiprocess
+
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+SIZE_BUCKETS = (
+    100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000
+)
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route and status",
+    ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route",
+    ["method", "route"], buckets=LATENCY_BUCKETS
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "HTTP response body size by route",
+    ["method", "route"], buckets=SIZE_BUCKETS
+)
+IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests currently being served",
+    ["method"], multiprocess_mode="livesum"
+)
+S3_LATENCY = Histogram(
+    "s3_request_duration_seconds", "S3 API call latency by operation",
+    ["operation"], buckets=LATENCY_BUCKETS
+)
+S3_ERRORS = Counter(
+    "s3_request_errors_total", "S3 API calls that returned an error",
+    ["operation"]
+)
+DB_LATENCY = Histogram(
+    "db_query_duration_seconds", "Database statement latency by statement type",
+    ["statement"], buckets=LATENCY_BUCKETS
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency, size, status and in-flight requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        in_progress = IN_PROGRESS.labels(method)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            # Label by route template, not raw path, to keep cardinality bounded
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            REQUESTS.labels(method, route_path, str(status)).inc()
+            REQUEST_LATENCY.labels(method, route_path).observe(elapsed)
+            RESPONSE_SIZE.labels(method, route_path).observe(size)
+
+
+def _s3_before_call(context, **kwargs):
+    context["metrics_started"] = time.perf_counter()
+
+
+def _s3_after_call(http_response, parsed, model, context, **kwargs):
+    started = context.get("metrics_started")
+    if started is None:
+        return
+    S3_LATENCY.labels(model.name).observe(time.perf_counter() - started)
+    if http_response is not None and http_response.status_code >= 400:
+        S3_ERRORS.labels(model.name).inc()
+
+
+def _s3_after_call_error(model, context, **kwargs):
+    started = context.get("metrics_started")
+    if started is not None:
+        S3_LATENCY.labels(model.name).observe(time.perf_counter() - started)
+    S3_ERRORS.labels(model.name).inc()
+
+
+def instrument_s3_client(s3_client):
+    """Time every API call made through a boto3 S3 client."""
+    events = s3_client.meta.events
+    events.register("before-call.s3", _s3_before_call)
+    events.register("after-call.s3", _s3_after_call)
+    events.register("after-call-error.s3", _s3_after_call_error)
+    return s3_client
+
+
+def instrument_engine(engine):
+    """Time every statement executed through a SQLAlchemy engine."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_started"].pop()
+        statement_type = statement.lstrip().split(None, 1)[0].upper() if statement else "UNKNOWN"
+        DB_LATENCY.labels(statement_type).observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        stack = exception_context.connection.info.get("metrics_started") \
+            if exception_context.connection is not None else None
+        if stack:
+            stack.pop()
+
+    return engine
+
+
+def render_metrics():
+    """Render all metrics in Prometheus text format. Returns (body, content type)."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int):
+    """Drop a dead worker's live gauges (called from the gunicorn child_exit hook)."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
@@ -1,9 +1,12 @@
 """Database models."""
-from sqlalchemy import Column, Integer, String, DateTime, create_engine
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Text, create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
+import threading
 from app.config import settings
+from app.metrics import instrument_engine
+from app import tracing
 
 Base = declarative_base()
 
@@ -18,18 +21,58 @@ class Item(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 
+class Job(Base):
+    """Background job (durable queue backend)."""
+    __tablename__ = "jobs"
+    
+    id = Column(String(36), primary_key=True)
+    type = Column(String, nullable=False)
+    status = Column(String, nullable=False, index=True)
+    params = Column(JSON, nullable=False)
+    progress = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # A running job whose lease lapses (its worker died) is claimed again
+    lease_expires_at = Column(DateTime, nullable=True)
+
+
 # Database connection
+# The engine (and its connection pool) is created once per process and reused
+_engine = None
+_session_factory = None
+_schema_ready = False
+_lock = threading.Lock()
+
+
 def get_db_engine():
-    """Create database engine."""
-    if not all([settings.db_host, settings.db_name, settings.db_user, settings.db_password]):
+    """Get the database engine, creating it on first use."""
+    global _engine, _session_factory
+    if _engine is not None:
+        return _engine
+    if not settings.database_url and not all(
+        [settings.db_host, settings.db_name, settings.db_user, settings.db_password]
+    ):
         return None
     
-    database_url = (
-        f"postgresql://{settings.db_user}:{settings.db_password}"
-        f"@{settings.db_host}:{settings.db_port}/{settings.db_name}"
-    )
-    
-    return create_engine(database_url, pool_pre_ping=True)
+    with _lock:
+        if _engine is None:
+            database_url = settings.database_url or (
+                f"postgresql://{settings.db_user}:{settings.db_password}"
+                f"@{settings.db_host}:{settings.db_port}/{settings.db_name}"
+            )
+            engine = tracing.instrument_engine(instrument_engine(create_engine(
+                database_url,
+                pool_pre_ping=True,
+                pool_size=settings.db_pool_size,
+                max_overflow=settings.db_max_overflow
+            )))
+            _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            _engine = engine
+    return _engine
 
 
 def get_db_session():
@@ -38,13 +81,22 @@ def get_db_session():
     if not engine:
         return None
     
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    return SessionLocal()
+    return _session_factory()
+
+
+def checkout_connection(session):
+    """Acquire the session's pooled connection now, so pool wait shows up as its own span."""
+    with tracing.start_span("db.pool.checkout"):
+        session.connection()
 
 
 def init_db():
-    """Initialize database tables."""
+    """Initialize database tables (checked once per process)."""
+    global _schema_ready
+    if _schema_ready:
+        return
     engine = get_db_engine()
     if engine:
         Base.metadata.create_all(bind=engine)
+        _schema_ready = True
 
@@ -0,0 +1,171 @@
+"""In-process HTTP response cache for read endpoints, with strong ETags.
+
+Cached routes are configured as ``prefix=ttl`` pairs. Each route belongs to a
+namespace (its first path segment, e.g. ``db`` or ``s3``); writes call
+``invalidate()`` for their namespace, which bumps a generation counter so older
+entries are never served again. When ``RESPONSE_CACHE_INVALIDATION_DIR`` is set,
+the generation is also stamped on a file there so every worker process sharing
+the directory sees the invalidation.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+
+_lock = threading.Lock()
+_generations: Dict[str, int] = {}
+_entries: "OrderedDict[str, dict]" = OrderedDict()
+
+
+def parse_routes(value: str) -> Dict[str, float]:
+    """Parse ``/path=ttl,...`` into a prefix -> TTL (seconds) mapping."""
+    routes = {}
+    for item in value.split(","):
+        prefix, _, ttl = item.strip().partition("=")
+        if prefix and ttl:
+            routes[prefix.strip()] = float(ttl)
+    return routes
+
+
+def _namespace(path: str) -> str:
+    return path.strip("/").split("/", 1)[0]
+
+
+def _stamp_path(namespace: str) -> Optional[str]:
+    if not settings.response_cache_invalidation_dir:
+        return None
+    return os.path.join(settings.response_cache_invalidation_dir, f"{namespace}.stamp")
+
+
+def generation(namespace: str) -> Tuple[int, int]:
+    """Current generation of a namespace (local counter, shared stamp)."""
+    stamp = 0
+    stamp_path = _stamp_path(namespace)
+    if stamp_path:
+        try:
+            stamp = os.stat(stamp_path).st_mtime_ns
+        except FileNotFoundError:
+            pass
+    return _generations.get(namespace, 0), stamp
+
+
+def invalidate(namespace: str) -> None:
+    """Drop every cached response in a namespace (called after writes)."""
+    with _lock:
+        _generations[namespace] = _generations.get(namespace, 0) + 1
+    stamp_path = _stamp_path(namespace)
+    if stamp_path:
+        os.makedirs(os.path.dirname(stamp_path), exist_ok=True)
+        with open(stamp_path, "a"):
+            pass
+        os.utime(stamp_path, ns=(time.time_ns(), time.time_ns()))
+
+
+def clear() -> None:
+    """Remove all cached entries."""
+    with _lock:
+        _entries.clear()
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [value.strip().removeprefix("W/") for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class ResponseCacheMiddleware:
+    """ASGI middleware serving cached GET responses and answering If-None-Match with 304."""
+
+    def __init__(self, app):
+        self.app = app
+        self.routes = parse_routes(settings.response_cache_routes)
+
+    def _ttl_for(self, path: str) -> Optional[float]:
+        for prefix, ttl in self.routes.items():
+            if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+                return ttl
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        ttl = self._ttl_for(scope["path"])
+        if not ttl:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        if_none_match = headers.get(b"if-none-match", b"").decode("latin-1") or None
+        namespace = _namespace(scope["path"])
+        key = scope["path"] + "?" + "&".join(sorted(scope["query_string"].decode("latin-1").split("&")))
+        # Captured before the handler runs, so a write racing this request
+        # leaves the stored entry already stale
+        current = generation(namespace)
+
+        entry = _entries.get(key)
+        if entry and entry["generation"] == current and entry["expires"] > time.monotonic():
+            # Lets outer middleware (metrics) label the hit with its route
+            scope["route"] = entry["route"]
+            await self._send_cached(send, entry, if_none_match, "HIT")
+            return
+
+        start_message = None
+        body = []
+
+        async def capture(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+            elif message["type"] == "http.response.body":
+                body.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        content = b"".join(body)
+        response_headers = [
+            (name, value) for name, value in start_message["headers"]
+            if name.lower() not in (b"content-length", b"etag", b"cache-control")
+        ]
+        entry = {
+            "status": start_message["status"],
+            "headers": response_headers,
+            "body": content,
+            "etag": '"' + hashlib.sha256(content).hexdigest()[:32] + '"',
+            "ttl": ttl,
+            "generation": current,
+            "expires": time.monotonic() + ttl,
+            "route": scope.get("route"),
+        }
+        if entry["status"] == 200:
+            with _lock:
+                _entries[key] = entry
+                _entries.move_to_end(key)
+                while len(_entries) > settings.response_cache_max_entries:
+                    _entries.popitem(last=False)
+            await self._send_cached(send, entry, if_none_match, "MISS")
+        else:
+            await send({**start_message, "headers": start_message["headers"]})
+            await send({"type": "http.response.body", "body": content})
+
+    async def _send_cached(self, send, entry: dict, if_none_match: Optional[str], status: str):
+        # Remaining lifetime, so a downstream cache (nginx) never extends it
+        max_age = max(0, int(entry["expires"] - time.monotonic()))
+        headers = [
+            (b"etag", entry["etag"].encode()),
+            (b"cache-control", f"max-age={max_age}".encode()),
+            (b"x-app-cache", status.encode()),
+        ]
+        if _etag_matches(if_none_match, entry["etag"]):
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers = entry["headers"] + headers + [
+            (b"content-length", str(len(entry["body"])).encode())
+        ]
+        await send({"type": "http.response.start", "status": entry["status"], "headers": headers})
+        await send({"type": "http.response.body", "body": entry["body"]})
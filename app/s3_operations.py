@@ -1,17 +1,210 @@
 """S3 operations."""
+import base64
+import binascii
+import fnmatch
+import gzip
+import hashlib
+import mimetypes
+import posixpath
+import tarfile
+import threading
+import time
+import zipfile
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import BinaryIO, Callable, Iterator, List, Optional
+
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
-from typing import List, Optional
 from app.config import settings
+from app.metrics import instrument_s3_client
+from app.response_cache import invalidate
+from app import tracing
+from app.tracing import traced
+
+
+# boto3 clients are thread-safe; one per process keeps its connection pool warm
+_s3_client = None
+_s3_client_lock = threading.Lock()
 
 
 def get_s3_client():
     """Get S3 client."""
+    global _s3_client
     if not settings.s3_bucket_name:
         return None
-    return boto3.client("s3", region_name=settings.aws_region)
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                client = boto3.client(
+                    "s3",
+                    region_name=settings.aws_region,
+                    # Room for the parallel workers used by bulk operations
+                    config=Config(max_pool_connections=max(10, settings.s3_max_concurrency * 2))
+                )
+                _s3_client = tracing.instrument_s3_client(instrument_s3_client(client))
+    return _s3_client
+
+
+# Metadata key recording the codec an object was compressed with
+CODEC_METADATA_KEY = "codec"
+# Metadata key recording the SHA-256 of the uncompressed content (dedupe)
+SHA256_METADATA_KEY = "sha256"
+COMPRESSION_CODECS = ("gzip", "zstd")
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# copy_object handles sources up to 5GB; larger objects need multipart copy
+COPY_OBJECT_MAX_SIZE = 5 * 1024 ** 3
+MULTIPART_MAX_PARTS = 10000
+DELETE_OBJECTS_BATCH_SIZE = 1000
+
+
+def _split_setting(value: str) -> List[str]:
+    """Split a comma-separated setting into stripped, non-empty items."""
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _zstd():
+    """Import zstandard on demand (only needed when the zstd codec is used)."""
+    try:
+        import zstandard
+    except ImportError:
+        raise Exception("zstd compression requires the 'zstandard' package")
+    return zstandard
+
+
+def compression_codec_for(key: str, content_type: Optional[str] = None) -> Optional[str]:
+    """Return the codec the compression policy picks for an object, if any."""
+    codec = settings.s3_compression
+    if not codec:
+        return None
+    if codec not in COMPRESSION_CODECS:
+        raise Exception(f"Unsupported compression codec: {codec}")
+    
+    content_type = (content_type or mimetypes.guess_type(key)[0] or "").split(";")[0].strip()
+    if content_type and content_type in _split_setting(settings.s3_compression_content_types):
+        return codec
+    name = posixpath.basename(key)
+    if any(fnmatch.fnmatch(name, pattern)
+           for pattern in _split_setting(settings.s3_compression_key_patterns)):
+        return codec
+    return None
+
+
+def compress_bytes(data: bytes, codec: str) -> bytes:
+    """Compress bytes with the given codec."""
+    level = settings.s3_compression_level
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=level if level is not None else 6)
+    if codec == "zstd":
+        zstandard = _zstd()
+        return zstandard.ZstdCompressor(level=level if level is not None else 3).compress(data)
+    raise Exception(f"Unsupported compression codec: {codec}")
+
+
+def _decompressor(codec: str):
+    """Return a streaming decompressor with decompress()/flush() for the codec."""
+    if codec == "gzip":
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if codec == "zstd":
+        return _zstd().ZstdDecompressor().decompressobj()
+    raise Exception(f"Unsupported compression codec: {codec}")
+
+
+def decompress_stream(chunks: Iterator[bytes], codec: str) -> Iterator[bytes]:
+    """Decompress an iterator of compressed chunks without buffering it whole."""
+    decompressor = _decompressor(codec)
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+
+
+def accepts_encoding(accept_encoding: Optional[str], codec: str) -> bool:
+    """Check whether an Accept-Encoding header value allows the codec."""
+    if not accept_encoding:
+        return False
+    for part in accept_encoding.split(","):
+        token, _, params = part.partition(";")
+        if token.strip().lower() not in (codec, "*"):
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        return quality > 0
+    return False
+
+
+def http_date(value) -> Optional[str]:
+    """Format a datetime as an HTTP date (for Last-Modified)."""
+    if not value:
+        return None
+    # botocore returns dateutil's tzutc(), which usegmt does not accept as UTC
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _is_not_modified(error: ClientError) -> bool:
+    """Check whether a ClientError is S3's 304 response to a conditional GET."""
+    status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return status == 304 or error.response.get("Error", {}).get("Code") in ("304", "NotModified")
+
 
+def _strong_etag(etag: Optional[str]) -> Optional[str]:
+    """Strip the weak validator prefix so S3 can compare the ETag."""
+    if etag and etag.startswith("W/"):
+        return etag[2:]
+    return etag
 
+
+def _put_object(s3_client, key: str, body: bytes, content_type: Optional[str] = None,
+                metadata: Optional[dict] = None, sha256: Optional[str] = None) -> dict:
+    """Put an object, applying the compression policy. Returns what was stored."""
+    params = {
+        "Bucket": settings.s3_bucket_name,
+        "Key": key,
+        "Metadata": dict(metadata or {}),
+    }
+    if sha256:
+        params["Metadata"][SHA256_METADATA_KEY] = sha256
+    content_type = content_type or mimetypes.guess_type(key)[0]
+    if content_type:
+        params["ContentType"] = content_type
+    
+    codec = compression_codec_for(key, content_type)
+    if codec:
+        compressed = compress_bytes(body, codec)
+        # Only keep the compressed form when it actually saves space
+        if len(compressed) < len(body):
+            body = compressed
+            params["ContentEncoding"] = codec
+            params["Metadata"][CODEC_METADATA_KEY] = codec
+        else:
+            codec = None
+    if sha256 and not codec:
+        # Let S3 verify the stored bytes against the hash we computed
+        params["ChecksumSHA256"] = base64.b64encode(bytes.fromhex(sha256)).decode()
+    
+    response = s3_client.put_object(Body=body, **params)
+    return {
+        "codec": codec,
+        "stored_size": len(body),
+        "etag": response.get("ETag"),
+    }
+
+
+@traced()
 def list_objects(prefix: Optional[str] = None) -> List[dict]:
     """List objects in S3 bucket."""
     s3_client = get_s3_client()
@@ -39,27 +232,151 @@ def list_objects(prefix: Optional[str] = None) -> List[dict]:
         raise Exception(f"Error listing objects: {str(e)}")
 
 
-def upload_file(file_content: bytes, key: str) -> dict:
-    """Upload file to S3."""
+@traced()
+def upload_file(
+    file_content: bytes,
+    key: str,
+    content_type: Optional[str] = None,
+    dedupe: bool = False,
+    checksum: Optional[str] = None,
+) -> dict:
+    """Upload file to S3.
+    
+    With ``dedupe`` the upload is skipped when the key already holds the same
+    content, or done as a server-side copy when another key does.
+    """
     s3_client = get_s3_client()
     if not s3_client:
         raise Exception("S3 not configured")
     
+    if dedupe:
+        return _dedupe_upload(s3_client, file_content, key, content_type, checksum)
+    
     try:
-        s3_client.put_object(
-            Bucket=settings.s3_bucket_name,
-            Key=key,
-            Body=file_content
-        )
-        return {
+        stored = _put_object(s3_client, key, file_content, content_type)
+        invalidate("s3")
+        result = {
             "key": key,
             "bucket": settings.s3_bucket_name,
             "status": "uploaded"
         }
+        if stored["codec"]:
+            result["content_encoding"] = stored["codec"]
+            result["size"] = len(file_content)
+            result["stored_size"] = stored["stored_size"]
+        return result
     except ClientError as e:
         raise Exception(f"Error uploading file: {str(e)}")
 
 
+class StreamingUpload:
+    """Multipart upload fed part by part while a request body is still arriving.
+    
+    ``submit`` hands a part to a small thread pool and returns; it blocks once
+    ``s3_max_concurrency`` parts are in flight, which bounds memory per upload.
+    A body that never fills a part is stored with a single put_object (and the
+    compression policy) by ``complete``.
+    """
+    
+    def __init__(self, key: str, content_type: Optional[str] = None):
+        self.s3_client = get_s3_client()
+        if not self.s3_client:
+            raise Exception("S3 not configured")
+        self.key = key
+        self.content_type = content_type or mimetypes.guess_type(key)[0]
+        self.size = 0
+        self.upload_id = None
+        self._parts = []
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(settings.s3_max_concurrency)
+        self._error = None
+    
+    def _start(self) -> None:
+        params = {"Bucket": settings.s3_bucket_name, "Key": self.key}
+        if self.content_type:
+            params["ContentType"] = self.content_type
+        self.upload_id = self.s3_client.create_multipart_upload(**params)["UploadId"]
+        self._executor = ThreadPoolExecutor(max_workers=settings.s3_max_concurrency)
+    
+    def _upload_part(self, part_number: int, data: bytes) -> dict:
+        try:
+            response = self.s3_client.upload_part(
+                Bucket=settings.s3_bucket_name,
+                Key=self.key,
+                UploadId=self.upload_id,
+                PartNumber=part_number,
+                Body=data,
+            )
+            return {"PartNumber": part_number, "ETag": response["ETag"]}
+        except Exception as e:
+            self._error = e
+            raise
+        finally:
+            self._slots.release()
+    
+    def submit(self, data: bytes) -> None:
+        """Upload one part (every part but the last must be at least 5MB)."""
+        try:
+            if self.upload_id is None:
+                self._start()
+        except ClientError as e:
+            raise Exception(f"Error uploading file: {str(e)}")
+        if self._error is not None:
+            # Stop reading the body as soon as a part has failed
+            raise Exception(f"Error uploading file: {str(self._error)}")
+        self._slots.acquire()
+        self.size += len(data)
+        self._parts.append(self._executor.submit(
+            tracing.bind_context(self._upload_part), len(self._parts) + 1, data
+        ))
+    
+    def complete(self, tail: bytes = b"") -> dict:
+        """Upload the remaining bytes and finish the object."""
+        if self.upload_id is None:
+            try:
+                stored = _put_object(self.s3_client, self.key, tail, self.content_type)
+            except ClientError as e:
+                raise Exception(f"Error uploading file: {str(e)}")
+            invalidate("s3")
+            return {"key": self.key, "bucket": settings.s3_bucket_name, "status": "uploaded",
+                    "size": len(tail), "parts": 1, "content_encoding": stored["codec"]}
+        
+        if tail:
+            self.submit(tail)
+        try:
+            parts = [future.result() for future in self._parts]
+            self.s3_client.complete_multipart_upload(
+                Bucket=settings.s3_bucket_name,
+                Key=self.key,
+                UploadId=self.upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except Exception as e:
+            self.abort()
+            raise Exception(f"Error uploading file: {str(e)}")
+        finally:
+            self._executor.shutdown()
+        invalidate("s3")
+        return {"key": self.key, "bucket": settings.s3_bucket_name, "status": "uploaded",
+                "size": self.size, "parts": len(parts), "content_encoding": None}
+    
+    def abort(self) -> None:
+        """Discard uploaded parts (e.g. when the client disconnects)."""
+        if self.upload_id is None:
+            return
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        try:
+            self.s3_client.abort_multipart_upload(
+                Bucket=settings.s3_bucket_name,
+                Key=self.key,
+                UploadId=self.upload_id,
+            )
+        except ClientError:
+            # Left for the bucket's incomplete-upload cleanup
+            pass
+
+
+@traced()
 def download_file(key: str) -> bytes:
     """Download file from S3."""
     s3_client = get_s3_client()
@@ -71,11 +388,200 @@ def download_file(key: str) -> bytes:
             Bucket=settings.s3_bucket_name,
             Key=key
         )
+        codec = response.get("Metadata", {}).get(CODEC_METADATA_KEY)
+        if codec:
+            return b"".join(decompress_stream(
+                response["Body"].iter_chunks(DOWNLOAD_CHUNK_SIZE), codec
+            ))
         return response["Body"].read()
     except ClientError as e:
         raise Exception(f"Error downloading file: {str(e)}")
 
 
+@traced()
+def head_file(key: str) -> dict:
+    """Get object metadata from S3 without reading the body."""
+    s3_client = get_s3_client()
+    if not s3_client:
+        raise Exception("S3 not configured")
+    
+    try:
+        response = s3_client.head_object(
+            Bucket=settings.s3_bucket_name,
+            Key=key
+        )
+    except ClientError as e:
+        raise Exception(f"Error reading file metadata: {str(e)}")
+    
+    metadata = response.get("Metadata", {})
+    return {
+        "key": key,
+        "size": response.get("ContentLength"),
+        "etag": response.get("ETag"),
+        "last_modified": http_date(response.get("LastModified")),
+        "content_type": response.get("ContentType"),
+        "codec": metadata.get(CODEC_METADATA_KEY),
+        "metadata": metadata,
+    }
+
+
+def _conditional_params(if_none_match: Optional[str], if_modified_since: Optional[str]) -> dict:
+    """Translate conditional request headers into get/head_object parameters."""
+    if if_none_match:
+        return {"IfNoneMatch": ", ".join(
+            _strong_etag(etag.strip()) for etag in if_none_match.split(",")
+        )}
+    if if_modified_since:
+        # If-None-Match takes precedence, as in RFC 9110
+        try:
+            return {"IfModifiedSince": parsedate_to_datetime(if_modified_since)}
+        except (TypeError, ValueError):
+            pass
+    return {}
+
+
+def _not_modified(error: ClientError) -> dict:
+    headers = error.response.get("ResponseMetadata", {}).get("HTTPHeaders", {})
+    return {
+        "not_modified": True,
+        "etag": headers.get("etag"),
+        "last_modified": headers.get("last-modified"),
+    }
+
+
+def _representation(response: dict, accept_encoding: Optional[str]) -> dict:
+    """Headers of what a download serves for a get/head_object response."""
+    codec = response.get("Metadata", {}).get(CODEC_METADATA_KEY)
+    result = {
+        "not_modified": False,
+        "content_type": response.get("ContentType") or "application/octet-stream",
+        "content_encoding": None,
+        "content_length": response.get("ContentLength"),
+        "etag": response.get("ETag"),
+        "last_modified": http_date(response.get("LastModified")),
+        "codec": codec,
+    }
+    if codec:
+        if accepts_encoding(accept_encoding, codec):
+            result["content_encoding"] = codec
+        else:
+            # Decoded on the fly: the length is unknown up front, and the
+            # representation differs byte-wise from the stored one
+            result["content_length"] = None
+            if result["etag"]:
+                result["etag"] = f"W/{result['etag']}"
+    return result
+
+
+@traced()
+def open_download(
+    key: str,
+    accept_encoding: Optional[str] = None,
+    if_none_match: Optional[str] = None,
+    if_modified_since: Optional[str] = None,
+) -> dict:
+    """Open an S3 object for streaming.
+    
+    Compressed objects are passed through with their Content-Encoding when the
+    client accepts the codec, and decompressed on the fly otherwise. Conditional
+    headers are forwarded to S3, so an unchanged object comes back as
+    ``not_modified`` without a body being read.
+    """
+    s3_client = get_s3_client()
+    if not s3_client:
+        raise Exception("S3 not configured")
+    
+    params = {"Bucket": settings.s3_bucket_name, "Key": key,
+              **_conditional_params(if_none_match, if_modified_since)}
+    try:
+        response = s3_client.get_object(**params)
+    except ClientError as e:
+        if _is_not_modified(e):
+            return _not_modified(e)
+        raise Exception(f"Error downloading file: {str(e)}")
+    
+    result = _representation(response, accept_encoding)
+    chunks = response["Body"].iter_chunks(DOWNLOAD_CHUNK_SIZE)
+    if result["codec"] and not result["content_encoding"]:
+        result["body"] = decompress_stream(chunks, result["codec"])
+    else:
+        result["body"] = chunks
+    return result
+
+
+@traced()
+def head_download(
+    key: str,
+    accept_encoding: Optional[str] = None,
+    if_none_match: Optional[str] = None,
+    if_modified_since: Optional[str] = None,
+) -> dict:
+    """What open_download would serve, from a head_object call (for HEAD requests)."""
+    s3_client = get_s3_client()
+    if not s3_client:
+        raise Exception("S3 not configured")
+    
+    params = {"Bucket": settings.s3_bucket_name, "Key": key,
+              **_conditional_params(if_none_match, if_modified_since)}
+    try:
+        response = s3_client.head_object(**params)
+    except ClientError as e:
+        if _is_not_modified(e):
+            return _not_modified(e)
+        raise Exception(f"Error downloading file: {str(e)}")
+    return _representation(response, accept_encoding)
+
+
+@traced()
+def offload_download(
+    key: str,
+    accept_encoding: Optional[str] = None,
+    if_none_match: Optional[str] = None,
+    if_modified_since: Optional[str] = None,
+) -> Optional[dict]:
+    """Resolve a download for nginx to fetch from S3 with a presigned URL.
+    
+    Only a ``head_object`` call is made. Returns ``not_modified`` as
+    open_download does, None when the object must be decoded by the app (it is
+    compressed and the client does not accept the codec), and otherwise the
+    presigned ``url``.
+    """
+    s3_client = get_s3_client()
+    if not s3_client:
+        raise Exception("S3 not configured")
+    
+    params = {"Bucket": settings.s3_bucket_name, "Key": key,
+              **_conditional_params(if_none_match, if_modified_since)}
+    try:
+        response = s3_client.head_object(**params)
+    except ClientError as e:
+        if _is_not_modified(e):
+            return _not_modified(e)
+        raise Exception(f"Error downloading file: {str(e)}")
+    
+    codec = response.get("Metadata", {}).get(CODEC_METADATA_KEY)
+    if codec and not accepts_encoding(accept_encoding, codec):
+        return None
+    # Presigning is local; S3 sends ContentEncoding/ContentType as stored
+    url = s3_client.generate_presigned_url(
+        "get_object",
+        Params={
+            "Bucket": settings.s3_bucket_name,
+            "Key": key,
+            "ResponseContentDisposition": f"attachment; filename={posixpath.basename(key)}",
+        },
+        ExpiresIn=settings.download_offload_url_ttl,
+    )
+    return {
+        "not_modified": False,
+        "url": url,
+        "codec": codec,
+        "etag": response.get("ETag"),
+        "last_modified": http_date(response.get("LastModified")),
+    }
+
+
+@traced()
 def delete_file(key: str) -> dict:
     """Delete file from S3."""
     s3_client = get_s3_client()
@@ -87,6 +593,7 @@ def delete_file(key: str) -> dict:
             Bucket=settings.s3_bucket_name,
             Key=key
         )
+        invalidate("s3")
         return {
             "key": key,
             "status": "deleted"
@@ -94,3 +601,539 @@ def delete_file(key: str) -> dict:
     except ClientError as e:
         raise Exception(f"Error deleting file: {str(e)}")
 
+
+@traced()
+def delete_prefix(prefix: str, on_progress: Optional[Callable[[int], None]] = None) -> dict:
+    """Delete every object under a prefix in delete_objects batches.
+    
+    ``on_progress`` is called with the number of objects deleted so far.
+    """
+    s3_client = get_s3_client()
+    if not s3_client:
+        raise Exception("S3 not configured")
+    if not prefix:
+        raise ValueError("A prefix is required")
+    
+    started = time.perf_counter()
+    count = 0
+    errors = []
+    batch = []
+    try:
+        # Deleting behind the paginator is safe: continuation tokens are key-based
+        for obj in _iter_objects(s3_client, prefix):
+            batch.append(obj["Key"])
+            if len(batch) == DELETE_OBJECTS_BATCH_SIZE:
+                errors.extend(_delete_keys(s3_client, batch))
+                count += len(batch)
+                batch = []
+                if on_progress:
+                    on_progress(count - len(errors))
+        if batch:
+            errors.extend(_delete_keys(s3_client, batch))
+            count += len(batch)
+    except ClientError as e:
+        raise Exception(f"Error deleting prefix: {str(e)}")
+    finally:
+        invalidate("s3")
+    
+    return {
+        "prefix": prefix,
+        "count": count,
+        "deleted": count - len(errors),
+        "failed": len(errors),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        "errors": [{"key": error["Key"], "error": error.get("Message", error.get("Code"))}
+                   for error in errors],
+    }
+
+
+def _upload_stream(s3_client, fileobj: BinaryIO, key: str,
+                   content_type: Optional[str] = None) -> None:
+    """Read a file object sequentially into S3 (multipart above the transfer threshold)."""
+    extra_args = {"ContentType": content_type} if content_type else None
+    s3_client.upload_fileobj(
+        fileobj,
+        settings.s3_bucket_name,
+        key,
+        ExtraArgs=extra_args,
+        Config=TransferConfig(max_concurrency=settings.s3_max_concurrency),
+    )
+
+
+@traced()
+def upload_fileobj(fileobj: BinaryIO, key: str, content_type: Optional[str] = None) -> dict:
+    """Stream a file object to S3 with boto3's managed (multipart) transfer."""
+    s3_client = get_s3_client()
+    if not s3_client:
+        raise Exception("S3 not configured")
+    
+    try:
+        _upload_stream(s3_client, fileobj, key, content_type)
+        invalidate("s3")
+        return {
+            "key": key,
+            "bucket": settings.s3_bucket_name,
+            "status": "uploaded"
+        }
+    except ClientError as e:
+        raise Exception(f"Error uploading file: {str(e)}")
+
+
+def _archive_entry_key(prefix: str, name: str) -> Optional[str]:
+    """Build the target key for an archive entry, rejecting unsafe paths."""
+    path = posixpath.normpath(name.replace("\\", "/")).lstrip("/")
+    if not path or path == "." or path.startswith(".."):
+        return None
+    return posixpath.join(prefix, path) if prefix else path
+
+
+class _ForwardOnlyReader:
+    """Sequential view of a tar stream member; boto3 must not try to seek it."""
+    
+    def __init__(self, fileobj: BinaryIO):
+        self._fileobj = fileobj
+    
+    def read(self, size: int = -1) -> bytes:
+        return self._fileobj.read(size)
+    
+    def seekable(self) -> bool:
+        return False
+
+
+def _iter_tar_entries(fileobj: BinaryIO):
+    """Yield (name, size, file object) for each tar member, reading the stream once.
+    
+    A member's file object is only readable until the next member is requested.
+    """
+    # "r|*" is tarfile's stream mode: no seeking, transparent gz/bz2/xz
+    with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            yield member.name, member.size, _ForwardOnlyReader(archive.extractfile(member))
+
+
+def _iter_zip_entries(fileobj: BinaryIO):
+    """Yield (name, size, file object) for each zip entry."""
+    # Zip keeps its directory at the end of the file, so this needs a
+    # seekable file object (the app spools zip bodies to a temporary file)
+    with zipfile.ZipFile(fileobj) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            with archive.open(info) as extracted:
+                yield info.filename, info.file_size, extracted
+
+
+@traced()
+def upload_archive(
+    fileobj: BinaryIO,
+    prefix: str = "",
+    archive_format: str = "tar",
+    max_workers: Optional[int] = None,
+) -> dict:
+    """Unpack a tar or zip archive and upload its entries to S3.
+    
+    Entries up to one part (``s3_upload_part_size``) are read and put in
+    parallel, with the compression policy. Larger entries are streamed from
+    the archive into a multipart upload as they are read, uncompressed, so
+    neither the archive nor an entry is ever held in memory whole.
+    """
+    s3_client = get_s3_client()
+    if not s3_client:
+        raise Exception("S3 not configured")
+    
+    if archive_format == "tar":
+        entries = _iter_tar_entries(fileobj)
+    elif archive_format == "zip":
+        entries = _iter_zip_entries(fileobj)
+    else:
+        raise ValueError(f"Unsupported archive format: {archive_format}")
+    
+    workers = max_workers or settings.s3_max_concurrency
+    # Bound the number of entries held in memory while waiting for a worker
+    in_flight = threading.BoundedSemaphore(workers * 2)
+    manifest = []
+    
+    def stream_entry(key: str, size: int, extracted: BinaryIO) -> dict:
+        started = time.perf_counter()
+        entry = {"key": key, "size": size, "status": "uploaded"}
+        try:
+            _upload_stream(s3_client, extracted, key, mimetypes.guess_type(key)[0])
+        except ClientError as e:
+            entry.update(status="failed", error=str(e))
+        entry["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return entry
+    
+    def put_entry(key: str, content: bytes) -> dict:
+        started = time.perf_counter()
+        try:
+            _put_object(s3_client, key, content)
+            status, error = "uploaded", None
+        except ClientError as e:
+            status, error = "failed", str(e)
+        finally:
+            in_flight.release()
+        entry = {
+            "key": key,
+            "size": len(content),
+            "status": status,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        if error:
+            entry["error"] = error
+        return entry
+    
+    started = time.perf_counter()
+    futures = []
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for name, size, extracted in entries:
+                key = _archive_entry_key(prefix, name)
+                if key is None:
+                    manifest.append({"key": name, "size": size, "status": "skipped",
+                                     "error": "Unsafe entry path"})
+                    continue
+                if size > settings.s3_upload_part_size:
+                    # Must be consumed before the archive can advance to the next entry
+                    manifest.append(stream_entry(key, size, extracted))
+                    continue
+                content = extracted.read()
+                in_flight.acquire()
+                futures.append(executor.submit(tracing.bind_context(put_entry), key, content))
+    except (tarfile.TarError, zipfile.BadZipFile) as e:
+        raise ValueError(f"Invalid {archive_format} archive: {str(e)}")
+    
+    manifest.extend(future.result() for future in futures)
+    invalidate("s3")
+    return {
+        "bucket": settings.s3_bucket_name,
+        "prefix": prefix,
+        "count": len(manifest),
+        "uploaded": sum(1 for entry in manifest if entry["status"] == "uploaded"),
+        "failed": sum(1 for entry in manifest if entry["status"] == "failed"),
+        "skipped": sum(1 for entry in manifest if entry["status"] == "skipped"),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        "entries": manifest,
+    }
+
+
+def _iter_objects(s3_client, prefix: str) -> Iterator[dict]:
+    """Yield every object under a prefix, following list pagination."""
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=settings.s3_bucket_name, Prefix=prefix):
+        yield from page.get("Contents", [])
+
+
+def _multipart_copy(s3_client, source_key: str, destination_key: str, source: dict) -> None:
+    """Copy a large object server-side with concurrent upload_part_copy calls."""
+    size = source["ContentLength"]
+    part_size = max(settings.s3_copy_part_size, -(-size // MULTIPART_MAX_PARTS))
+    params = {
+        "Bucket": settings.s3_bucket_name,
+        "Key": destination_key,
+        "Metadata": source.get("Metadata", {}),
+    }
+    for field in ("ContentType", "ContentEncoding", "ContentDisposition", "CacheControl"):
+        if source.get(field):
+            params[field] = source[field]
+    
+    upload_id = s3_client.create_multipart_upload(**params)["UploadId"]
+    copy_source = {"Bucket": settings.s3_bucket_name, "Key": source_key}
+    
+    def copy_part(part_number: int) -> dict:
+        start = (part_number - 1) * part_size
+        end = min(start + part_size, size) - 1
+        response = s3_client.upload_part_copy(
+            Bucket=settings.s3_bucket_name,
+            Key=destination_key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            CopySource=copy_source,
+            CopySourceRange=f"bytes={start}-{end}",
+            CopySourceIfMatch=source["ETag"],
+        )
+        return {"PartNumber": part_number, "ETag": response["CopyPartResult"]["ETag"]}
+    
+    try:
+        part_count = -(-size // part_size)
+        with ThreadPoolExecutor(max_workers=settings.s3_max_concurrency) as executor:
+            parts = list(executor.map(tracing.bind_context(copy_part), range(1, part_count + 1)))
+        s3_client.complete_multipart_upload(
+            Bucket=settings.s3_bucket_name,
+            Key=destination_key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+    except Exception:
+        s3_client.abort_multipart_upload(
+            Bucket=settings.s3_bucket_name,
+            Key=destination_key,
+            UploadId=upload_id,
+        )
+        raise
+
+
+def _copy_object(s3_client, source_key: str, destination_key: str,
+                 size: Optional[int] = None) -> dict:
+    """Copy one object server-side, switching to multipart copy above 5GB."""
+    if size is None or size > COPY_OBJECT_MAX_SIZE:
+        source = s3_client.head_object(Bucket=settings.s3_bucket_name, Key=source_key)
+        size = source["ContentLength"]
+        if size > COPY_OBJECT_MAX_SIZE:
+            _multipart_copy(s3_client, source_key, destination_key, source)
+            return {"source": source_key, "destination": destination_key,
+                    "size": size, "method": "multipart"}
+    
+    s3_client.copy_object(
+        Bucket=settings.s3_bucket_name,
+        Key=destination_key,
+        CopySource={"Bucket": settings.s3_bucket_name, "Key": source_key},
+    )
+    return {"source": source_key, "destination": destination_key,
+            "size": size, "method": "copy_object"}
+
+
+def _delete_keys(s3_client, keys: List[str]) -> List[dict]:
+    """Delete keys in batches with delete_objects. Returns per-key errors."""
+    errors = []
+    for start in range(0, len(keys), DELETE_OBJECTS_BATCH_SIZE):
+        batch = keys[start:start + DELETE_OBJECTS_BATCH_SIZE]
+        response = s3_client.delete_objects(
+            Bucket=settings.s3_bucket_name,
+            Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+        )
+        errors.extend(response.get("Errors", []))
+    return errors
+
+
+@traced()
+def copy_file(source_key: str, destination_key: str, delete_source: bool = False) -> dict:
+    """Copy (or move) an object within the bucket without downloading it."""
+    s3_client = get_s3_client()
+    if not s3_client:
+        raise Exception("S3 not configured")
+    
+    try:
+        result = _copy_object(s3_client, source_key, destination_key)
+        if delete_source:
+            s3_client.delete_object(Bucket=settings.s3_bucket_name, Key=source_key)
+        invalidate("s3")
+        result["status"] = "moved" if delete_source else "copied"
+        return result
+    except ClientError as e:
+        raise Exception(f"Error copying file: {str(e)}")
+
+
+def check_copy_prefixes(source_prefix: str, destination_prefix: str) -> None:
+    """Reject prefixes where one contains the other. Raises ValueError."""
+    # Copies written under the source would be listed and copied again
+    if source_prefix.startswith(destination_prefix) or destination_prefix.startswith(source_prefix):
+        raise ValueError(
+            f"Source and destination prefixes overlap: {source_prefix!r}, {destination_prefix!r}"
+        )
+
+
+@traced()
+def copy_prefix(
+    source_prefix: str,
+    destination_prefix: str,
+    delete_source: bool = False,
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> dict:
+    """Copy (or move) every object under a prefix with bounded parallelism.
+    
+    ``on_progress`` is called with the number of objects processed so far.
+    Raises ValueError when the prefixes overlap.
+    """
+    check_copy_prefixes(source_prefix, destination_prefix)
+    s3_client = get_s3_client()
+    if not s3_client:
+        raise Exception("S3 not configured")
+    
+    workers = settings.s3_max_concurrency
+    # Bound the listed objects waiting for a worker, as the listing can be huge
+    in_flight = threading.BoundedSemaphore(workers * 2)
+    processed = 0
+    processed_lock = threading.Lock()
+    
+    def copy_entry(obj: dict) -> dict:
+        nonlocal processed
+        source_key = obj["Key"]
+        destination_key = destination_prefix + source_key[len(source_prefix):]
+        try:
+            entry = _copy_object(s3_client, source_key, destination_key, size=obj["Size"])
+            entry["status"] = "copied"
+        except Exception as e:
+            # Any failure is reported per object; the rest of the prefix still runs
+            entry = {"source": source_key, "destination": destination_key,
+                     "status": "failed", "error": str(e)}
+        finally:
+            in_flight.release()
+        if on_progress:
+            with processed_lock:
+                processed += 1
+                on_progress(processed)
+        return entry
+    
+    started = time.perf_counter()
+    try:
+        futures = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for obj in _iter_objects(s3_client, source_prefix):
+                in_flight.acquire()
+                futures.append(executor.submit(tracing.bind_context(copy_entry), obj))
+        entries = [future.result() for future in futures]
+        
+        if delete_source:
+            copied = [entry["source"] for entry in entries if entry["status"] == "copied"]
+            failed_deletes = {error["Key"]: error.get("Message", error.get("Code"))
+                              for error in _delete_keys(s3_client, copied)}
+            for entry in entries:
+                if entry["status"] != "copied":
+                    continue
+                if entry["source"] in failed_deletes:
+                    entry["status"] = "copied"
+                    entry["error"] = f"Source not deleted: {failed_deletes[entry['source']]}"
+                else:
+                    entry["status"] = "moved"
+    except ClientError as e:
+        raise Exception(f"Error copying prefix: {str(e)}")
+    finally:
+        invalidate("s3")
+    
+    return {
+        "source_prefix": source_prefix,
+        "destination_prefix": destination_prefix,
+        "count": len(entries),
+        "failed": sum(1 for entry in entries if entry["status"] == "failed"),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        "objects": entries,
+    }
+
+
+# Local SHA-256 -> key index of content this process has stored
+_hash_index: "OrderedDict[str, str]" = OrderedDict()
+_hash_index_lock = threading.Lock()
+
+
+def _remember_hash(sha256: str, key: str) -> None:
+    with _hash_index_lock:
+        _hash_index[sha256] = key
+        _hash_index.move_to_end(sha256)
+        while len(_hash_index) > settings.s3_dedupe_index_size:
+            _hash_index.popitem(last=False)
+
+
+def _lookup_hash(sha256: str) -> Optional[str]:
+    with _hash_index_lock:
+        return _hash_index.get(sha256)
+
+
+def _forget_hash(sha256: str) -> None:
+    with _hash_index_lock:
+        _hash_index.pop(sha256, None)
+
+
+def normalize_checksum(checksum: str) -> str:
+    """Accept a SHA-256 checksum as hex or base64 and return it as hex."""
+    value = checksum.strip()
+    if len(value) == 64:
+        try:
+            return bytes.fromhex(value).hex()
+        except ValueError:
+            pass
+    try:
+        digest = base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        digest = b""
+    if len(digest) != 32:
+        raise ValueError("Checksum must be a SHA-256 digest in hex or base64")
+    return digest.hex()
+
+
+def _has_content(s3_client, key: str, sha256: str, md5: str) -> Optional[dict]:
+    """The head_object response of an existing object holding content with these hashes."""
+    try:
+        head = s3_client.head_object(Bucket=settings.s3_bucket_name, Key=key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+    metadata = head.get("Metadata", {})
+    if metadata.get(SHA256_METADATA_KEY):
+        return head if metadata[SHA256_METADATA_KEY] == sha256 else None
+    # Objects stored before dedupe: a single-part, uncompressed ETag is the MD5
+    if metadata.get(CODEC_METADATA_KEY):
+        return None
+    return head if head.get("ETag", "").strip('"') == md5 else None
+
+
+def _copy_duplicate(s3_client, source_key: str, source: dict, key: str,
+                    content_type: Optional[str], sha256: str) -> Optional[str]:
+    """Copy a duplicate's bytes to key with the new upload's metadata. Returns the codec."""
+    # The stored bytes (and so their encoding) come from the source; everything
+    # describing the upload itself is replaced, not inherited
+    metadata = {SHA256_METADATA_KEY: sha256}
+    codec = source.get("Metadata", {}).get(CODEC_METADATA_KEY)
+    if codec:
+        metadata[CODEC_METADATA_KEY] = codec
+    params = {
+        "Bucket": settings.s3_bucket_name,
+        "Key": key,
+        "CopySource": {"Bucket": settings.s3_bucket_name, "Key": source_key},
+        "MetadataDirective": "REPLACE",
+        "Metadata": metadata,
+    }
+    content_type = content_type or mimetypes.guess_type(key)[0]
+    if content_type:
+        params["ContentType"] = content_type
+    if source.get("ContentEncoding"):
+        params["ContentEncoding"] = source["ContentEncoding"]
+    s3_client.copy_object(**params)
+    return codec
+
+
+def _dedupe_upload(s3_client, file_content: bytes, key: str,
+                   content_type: Optional[str], checksum: Optional[str]) -> dict:
+    """Store content only if neither the key nor a known duplicate already holds it."""
+    sha256 = hashlib.sha256(file_content).hexdigest()
+    if checksum and normalize_checksum(checksum) != sha256:
+        raise ValueError("Checksum does not match the uploaded content")
+    md5 = hashlib.md5(file_content, usedforsecurity=False).hexdigest()
+    result = {
+        "key": key,
+        "bucket": settings.s3_bucket_name,
+        "sha256": sha256,
+        "size": len(file_content),
+    }
+    
+    try:
+        if _has_content(s3_client, key, sha256, md5):
+            _remember_hash(sha256, key)
+            return {**result, "status": "unchanged", "dedupe": "skipped", "transferred": False}
+        
+        duplicate_key = _lookup_hash(sha256)
+        if duplicate_key and duplicate_key != key:
+            source = _has_content(s3_client, duplicate_key, sha256, md5)
+            if source:
+                codec = _copy_duplicate(s3_client, duplicate_key, source, key, content_type, sha256)
+                invalidate("s3")
+                _remember_hash(sha256, key)
+                result = {**result, "status": "uploaded", "dedupe": "copied",
+                          "source": duplicate_key, "transferred": False}
+                if codec:
+                    result["content_encoding"] = codec
+                return result
+            _forget_hash(sha256)
+        
+        stored = _put_object(s3_client, key, file_content, content_type, sha256=sha256)
+        invalidate("s3")
+        _remember_hash(sha256, key)
+        result = {**result, "status": "uploaded", "dedupe": "uploaded", "transferred": True}
+        if stored["codec"]:
+            result["content_encoding"] = stored["codec"]
+            result["stored_size"] = stored["stored_size"]
+        return result
+    except ClientError as e:
+        raise Exception(f"Error uploading file: {str(e)}")
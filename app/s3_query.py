@@ -0,0 +1,276 @@
+"""Server-side filtering of CSV/TSV/JSON objects in S3."""
+import csv
+import json
+import re
+from typing import Iterator, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+from app.config import settings
+from app.tracing import traced
+from app.s3_operations import (
+    get_s3_client, decompress_stream, CODEC_METADATA_KEY, DOWNLOAD_CHUNK_SIZE
+)
+
+QUERY_FORMATS = ("csv", "tsv", "json")
+CSV_DELIMITERS = {"csv": ",", "tsv": "\t"}
+FIELD_PATTERN = re.compile(r"^[A-Za-z_][\w.]*$")
+CONDITION_PATTERN = re.compile(
+    r"^\s*([A-Za-z_][\w.]*)\s*(=|!=|<>|<=|>=|<|>)\s*"
+    r"('(?:[^']|'')*'|-?\d+(?:\.\d+)?)\s*$"
+)
+AND_PATTERN = re.compile(r"\s+AND\s+", re.IGNORECASE)
+# S3 Select is not available to every account/region; only these codes mean "use the
+# fallback". Anything else (permissions, a bad request) is a real error and is raised
+SELECT_UNAVAILABLE_CODES = ("MethodNotAllowed", "NotImplemented", "XNotImplemented")
+
+Condition = Tuple[str, str, object]
+
+
+def parse_filter(expression: Optional[str]) -> List[Condition]:
+    """Parse ``field op value [AND ...]`` into (field, op, value) conditions.
+
+    Values are single-quoted strings or numbers; numbers compare numerically.
+    """
+    if not expression or not expression.strip():
+        return []
+    conditions = []
+    for part in AND_PATTERN.split(expression.strip()):
+        match = CONDITION_PATTERN.match(part)
+        if not match:
+            raise ValueError(f"Invalid filter condition: {part!r}")
+        field, op, literal = match.groups()
+        if literal.startswith("'"):
+            value = literal[1:-1].replace("''", "'")
+        else:
+            value = float(literal)
+        conditions.append((field, "!=" if op == "<>" else op, value))
+    return conditions
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Parse a comma-separated projection list (empty means all fields)."""
+    if not fields:
+        return []
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    for name in names:
+        if not FIELD_PATTERN.match(name):
+            raise ValueError(f"Invalid field name: {name!r}")
+    return names
+
+
+def build_select_sql(conditions: List[Condition], fields: List[str]) -> str:
+    """Render conditions and projection as an S3 Select SQL expression."""
+    projection = ", ".join(f's."{name}"' for name in fields) if fields else "*"
+    sql = f"SELECT {projection} FROM S3Object s"
+    clauses = []
+    for field, op, value in conditions:
+        if isinstance(value, float):
+            clauses.append(f'CAST(s."{field}" AS DECIMAL) {op} {value!r}')
+        else:
+            escaped = value.replace("'", "''")
+            clauses.append(f"s.\"{field}\" {op} '{escaped}'")
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    return sql
+
+
+def _compare(left, op: str, right) -> bool:
+    if op == "=":
+        return left == right
+    if op == "!=":
+        return left != right
+    if op == "<":
+        return left < right
+    if op == "<=":
+        return left <= right
+    if op == ">":
+        return left > right
+    return left >= right
+
+
+def row_matches(row: dict, conditions: List[Condition]) -> bool:
+    """Evaluate the parsed conditions against one row (fallback path)."""
+    for field, op, value in conditions:
+        actual = row.get(field)
+        if actual is None:
+            return False
+        try:
+            if isinstance(value, float):
+                actual = float(actual)
+            else:
+                actual = str(actual)
+        except (TypeError, ValueError):
+            return False
+        if not _compare(actual, op, value):
+            return False
+    return True
+
+
+def _project(row: dict, fields: List[str]) -> dict:
+    return {name: row.get(name) for name in fields} if fields else row
+
+
+def _iter_lines(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Split a chunk stream into lines, keeping the line endings."""
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line + b"\n"
+    if pending:
+        yield pending
+
+
+def _iter_range_lines(s3_client, key: str, start: Optional[int],
+                      end: Optional[int]) -> Iterator[bytes]:
+    """Yield the lines that start inside [start, end], like S3 Select's ScanRange."""
+    if not start and end is None:
+        response = s3_client.get_object(Bucket=settings.s3_bucket_name, Key=key)
+        yield from _iter_lines(response["Body"].iter_chunks(DOWNLOAD_CHUNK_SIZE))
+        return
+
+    # Read one byte early so a record starting exactly at `start` is kept
+    offset = max((start or 0) - 1, 0)
+    response = s3_client.get_object(
+        Bucket=settings.s3_bucket_name, Key=key, Range=f"bytes={offset}-"
+    )
+    lines = _iter_lines(response["Body"].iter_chunks(DOWNLOAD_CHUNK_SIZE))
+    try:
+        if start:
+            # Skip the tail of the record that started before the range
+            offset += len(next(lines))
+        for line in lines:
+            if end is not None and offset > end:
+                break
+            yield line
+            offset += len(line)
+    except StopIteration:
+        return
+    finally:
+        response["Body"].close()
+
+
+def _read_csv_header(s3_client, key: str, delimiter: str) -> List[str]:
+    """Read only the header line of a CSV/TSV object."""
+    response = s3_client.get_object(Bucket=settings.s3_bucket_name, Key=key)
+    try:
+        first = next(_iter_lines(response["Body"].iter_chunks(64 * 1024)), b"")
+    finally:
+        response["Body"].close()
+    return next(csv.reader([first.decode("utf-8-sig")], delimiter=delimiter), [])
+
+
+def _filter_rows(s3_client, key: str, input_format: str, codec: Optional[str],
+                 conditions: List[Condition], fields: List[str],
+                 start: Optional[int], end: Optional[int]) -> Iterator[bytes]:
+    """Streaming row filter over the (ranged) object body."""
+    if codec:
+        response = s3_client.get_object(Bucket=settings.s3_bucket_name, Key=key)
+        lines = _iter_lines(decompress_stream(
+            response["Body"].iter_chunks(DOWNLOAD_CHUNK_SIZE), codec
+        ))
+    else:
+        lines = _iter_range_lines(s3_client, key, start, end)
+
+    if input_format in CSV_DELIMITERS:
+        delimiter = CSV_DELIMITERS[input_format]
+        header = _read_csv_header(s3_client, key, delimiter) if start else None
+        text_lines = (line.decode("utf-8-sig") for line in lines)
+        rows = csv.DictReader(text_lines, fieldnames=header, delimiter=delimiter)
+    else:
+        rows = (json.loads(line) for line in lines if line.strip())
+
+    for row in rows:
+        if row_matches(row, conditions):
+            yield (json.dumps(_project(row, fields)) + "\n").encode()
+
+
+def _select_rows(s3_client, key: str, input_format: str, codec: Optional[str],
+                 conditions: List[Condition], fields: List[str],
+                 start: Optional[int], end: Optional[int]):
+    """Start an S3 Select query. Returns the event stream, or None if unavailable."""
+    if codec not in (None, "gzip"):
+        return None
+    if input_format in CSV_DELIMITERS:
+        serialization = {"CSV": {"FileHeaderInfo": "USE", "FieldDelimiter": CSV_DELIMITERS[input_format]}}
+    else:
+        serialization = {"JSON": {"Type": "LINES"}}
+    if codec == "gzip":
+        serialization["CompressionType"] = "GZIP"
+
+    params = {
+        "Bucket": settings.s3_bucket_name,
+        "Key": key,
+        "ExpressionType": "SQL",
+        "Expression": build_select_sql(conditions, fields),
+        "InputSerialization": serialization,
+        "OutputSerialization": {"JSON": {"RecordDelimiter": "\n"}},
+    }
+    if start is not None or end is not None:
+        scan_range = {}
+        if start is not None:
+            scan_range["Start"] = start
+        if end is not None:
+            scan_range["End"] = end
+        params["ScanRange"] = scan_range
+
+    try:
+        response = s3_client.select_object_content(**params)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in SELECT_UNAVAILABLE_CODES:
+            return None
+        raise
+    return _iter_select_records(response["Payload"])
+
+
+def _iter_select_records(payload) -> Iterator[bytes]:
+    for event in payload:
+        if "Records" in event:
+            yield event["Records"]["Payload"]
+
+
+@traced()
+def query_object(
+    key: str,
+    where: Optional[str] = None,
+    fields: Optional[str] = None,
+    input_format: Optional[str] = None,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+) -> dict:
+    """Filter a CSV, TSV or JSON Lines object server-side and stream matches as NDJSON.
+
+    The query is pushed down to S3 Select when it is available, otherwise the
+    object body is streamed through a row filter. Returns the engine used and an
+    iterator of NDJSON bytes.
+    """
+    s3_client = get_s3_client()
+    if not s3_client:
+        raise Exception("S3 not configured")
+
+    conditions = parse_filter(where)
+    projection = parse_fields(fields)
+    if not input_format:
+        extension = key.lower().split(".")[-1]
+        input_format = extension if extension in CSV_DELIMITERS else "json"
+    if input_format not in QUERY_FORMATS:
+        raise ValueError(f"Unsupported input format: {input_format}")
+    if start is not None and end is not None and end < start:
+        raise ValueError("Range end must not be before range start")
+
+    try:
+        head = s3_client.head_object(Bucket=settings.s3_bucket_name, Key=key)
+        codec = head.get("Metadata", {}).get(CODEC_METADATA_KEY)
+        if codec and (start is not None or end is not None):
+            raise ValueError("Byte ranges are not supported on compressed objects")
+
+        args = (s3_client, key, input_format, codec, conditions, projection, start, end)
+        if settings.s3_select_enabled:
+            records = _select_rows(*args)
+            if records is not None:
+                return {"engine": "s3-select", "rows": records}
+        return {"engine": "scan", "rows": _filter_rows(*args)}
+    except ClientError as e:
+        raise Exception(f"Error querying file: {str(e)}")
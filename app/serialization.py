@@ -0,0 +1,65 @@
+"""JSON response classes and the configured default serializer.
+
+Handlers return ``json_response(...)`` with plain dicts/lists (or Pydantic
+models), which bypasses FastAPI's response-model validation and
+``jsonable_encoder`` pass and serializes the content in a single call.
+"""
+import json
+from datetime import date, datetime
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from app.config import settings
+from app.tracing import start_span
+
+SERIALIZERS = ("orjson", "stdlib")
+
+
+def _default(obj):
+    """Serialize the types handlers return beyond plain JSON."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class OrjsonResponse(JSONResponse):
+    """JSON response rendered with orjson."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_default)
+
+
+class StdlibJSONResponse(JSONResponse):
+    """JSON response rendered with the standard library encoder."""
+
+    def render(self, content) -> bytes:
+        return json.dumps(
+            content,
+            default=_default,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+
+def get_response_class(serializer: str = None):
+    """Return the response class for a serializer name (default from settings)."""
+    serializer = serializer or settings.json_serializer
+    if serializer == "orjson":
+        return OrjsonResponse
+    if serializer == "stdlib":
+        return StdlibJSONResponse
+    raise ValueError(f"Unknown JSON serializer: {serializer}")
+
+
+ResponseClass = get_response_class()
+
+
+def json_response(content, status_code: int = 200, headers: dict = None):
+    """Serialize content directly with the configured serializer."""
+    with start_span("serialize"):
+        return ResponseClass(content, status_code=status_code, headers=headers)
@@ -0,0 +1,65 @@
+"""Application server entry point (``python -m app.serve``)."""
+import os
+import socket
+
+from app.config import settings
+
+
+def prepare_metrics_dir():
+    """Create an empty Prometheus multiprocess directory before workers start."""
+    metrics_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not metrics_dir:
+        return
+    os.makedirs(metrics_dir, exist_ok=True)
+    # Samples from a previous run would otherwise be aggregated into this one
+    for name in os.listdir(metrics_dir):
+        if name.endswith(".db"):
+            os.remove(os.path.join(metrics_dir, name))
+
+
+def bind_unix_socket(path: str) -> socket.socket:
+    """Bind the Unix socket nginx proxies to, replacing a stale one."""
+    if os.path.exists(path):
+        os.remove(path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(path)
+    # The nginx user connects to a socket created by the container's root
+    os.chmod(path, 0o666)
+    return sock
+
+
+def main():
+    """Start the API with the configured serving mode."""
+    prepare_metrics_dir()
+    if settings.server_mode == "gunicorn":
+        # Replace this process so gunicorn receives container signals directly
+        os.execvp("gunicorn", ["gunicorn", "-c", "python:app.gunicorn_conf", "app.main:app"])
+    elif settings.server_mode == "uvicorn":
+        import uvicorn
+        if settings.server_reload:
+            # The reloader supervises a single TCP listener (development only)
+            uvicorn.run(
+                "app.main:app",
+                host=settings.host,
+                port=settings.port,
+                reload=True,
+                timeout_keep_alive=settings.web_keepalive
+            )
+            return
+        config = uvicorn.Config(
+            "app.main:app",
+            host=settings.host,
+            port=settings.port,
+            timeout_keep_alive=settings.web_keepalive
+        )
+        # TCP stays bound next to the Unix socket for health checks, as with gunicorn
+        sockets = [config.bind_socket()]
+        if settings.unix_socket:
+            sockets.append(bind_unix_socket(settings.unix_socket))
+        uvicorn.Server(config).run(sockets=sockets)
+    else:
+        raise SystemExit(f"Unknown SERVER_MODE: {settings.server_mode}")
+
+
+if __name__ == "__main__":
+    main()
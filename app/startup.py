@@ -0,0 +1,132 @@
+"""Startup warmup and precomputed health/readiness state."""
+import importlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+from app.config import settings
+from app.lazy import lazy_import
+
+models = lazy_import("app.models")
+s3_operations = lazy_import("app.s3_operations")
+
+logger = logging.getLogger(__name__)
+
+# Readiness state, filled in by warmup()
+state = {
+    "ready": False,
+    "started_at": None,
+    "duration_ms": None,
+    "checks": {},
+}
+# Set on shutdown to stop retrying failed checks
+_stopping = threading.Event()
+
+
+def build_health_payload() -> bytes:
+    """Serialize the static /health payload once (it never changes at runtime)."""
+    hostname = socket.gethostname()
+    return json.dumps({
+        "status": "healthy",
+        "app_name": settings.app_name,
+        "version": settings.app_version,
+        "hostname": hostname,
+        "container_name": os.getenv("HOSTNAME", hostname),
+        "image_tag": os.getenv("IMAGE_TAG", "unknown"),
+        "aws_region": os.getenv("AWS_REGION", "unknown"),
+        "s3_bucket": os.getenv("S3_BUCKET_NAME", "not configured"),
+    }).encode()
+
+
+def import_backends() -> list:
+    """Import the modules for configured backends only (boto3, SQLAlchemy)."""
+    names = []
+    if settings.s3_bucket_name:
+        names += ["app.s3_operations", "app.s3_query"]
+    if settings.database_url or settings.db_host:
+        names += ["app.models", "app.db_operations"]
+    for name in names:
+        importlib.import_module(name)
+    return names
+
+
+def _warm_s3() -> str:
+    # Checked before touching s3_operations so boto3 is never imported when unused
+    if not settings.s3_bucket_name:
+        return "not configured"
+    s3_client = s3_operations.get_s3_client()
+    # Resolves credentials and opens a pooled connection to the bucket endpoint
+    s3_client.head_bucket(Bucket=settings.s3_bucket_name)
+    return "ok"
+
+
+def _warm_db() -> str:
+    if not (settings.database_url or settings.db_host):
+        return "not configured"
+    from sqlalchemy import text
+    engine = models.get_db_engine()
+    if not engine:
+        return "not configured"
+    # Check out several connections at once so the pool holds that many
+    connections = []
+    try:
+        for _ in range(max(1, min(settings.db_warm_connections, settings.db_pool_size))):
+            connection = engine.connect()
+            connection.execute(text("SELECT 1"))
+            connections.append(connection)
+    finally:
+        for connection in connections:
+            connection.close()
+    models.init_db()
+    return "ok"
+
+
+def warmup() -> dict:
+    """Build clients, warm the DB pool and check the schema, then mark ready.
+    
+    The instance is only marked ready once every check has passed; failed
+    checks are retried every ``warmup_retry_interval`` seconds until then.
+    """
+    started = time.perf_counter()
+    state["started_at"] = time.time()
+    _stopping.clear()
+    pending = {"s3": _warm_s3, "database": _warm_db}
+    while True:
+        for name, check in list(pending.items()):
+            try:
+                state["checks"][name] = check()
+                del pending[name]
+            except Exception as e:
+                logger.warning("Warmup of %s failed: %s", name, e)
+                state["checks"][name] = f"error: {str(e)}"
+        state["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        if not pending:
+            state["ready"] = True
+            return state
+        if _stopping.wait(settings.warmup_retry_interval):
+            return state
+
+
+def stop() -> None:
+    """Stop retrying failed warmup checks (on shutdown)."""
+    _stopping.set()
+
+
+def readiness() -> dict:
+    """Current readiness state; ``failed`` lists checks that have not passed yet."""
+    failed = sorted(name for name, result in state["checks"].items() if result.startswith("error"))
+    if state["ready"]:
+        status = "ready"
+    elif failed:
+        status = "unavailable"
+    else:
+        status = "starting"
+    return {
+        "status": status,
+        "warmup_ms": state["duration_ms"],
+        "checks": state["checks"],
+        "failed": failed,
+    }
@@ -0,0 +1,47 @@
+"""Shared fixtures: S3 served by moto, the database by a temporary SQLite file.
+
+Settings are read when ``app.config`` is first imported, so the environment
+is set up here before any test module imports the app.
+"""
+import os
+import tempfile
+
+import pytest
+
+TEST_BUCKET = "test-bucket"
+_DB_DIR = tempfile.mkdtemp(prefix="app-tests-")
+
+os.environ.update({
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "AWS_REGION": "us-east-1",
+    "S3_BUCKET_NAME": TEST_BUCKET,
+    "DATABASE_URL": f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}",
+    "RESPONSE_CACHE_ENABLED": "false",
+    "TRACING_EXPORTER": "none",
+})
+os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+from app.benchmarks.suite import mock_s3  # noqa: E402
+
+
+@pytest.fixture
+def s3():
+    """A fresh moto bucket; yields the app's (instrumented) S3 client."""
+    from app import s3_operations
+    with mock_s3():
+        # The client is cached per process; rebuild it inside this mock
+        s3_operations._s3_client = None
+        client = s3_operations.get_s3_client()
+        client.create_bucket(Bucket=TEST_BUCKET)
+        yield client
+        s3_operations._s3_client = None
+
+
+@pytest.fixture
+def client(s3):
+    """TestClient for the app (without lifespan, so no warmup or job threads)."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    return TestClient(app)
@@ -0,0 +1,104 @@
+"""Admission control: bounded concurrency, bounded queue, 503 shedding."""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+
+from app import admission, s3_operations
+from app.admission import AdaptiveLimiter, AdmissionControlMiddleware
+from app.config import settings
+
+
+def test_limiter_queues_then_sheds():
+    async def scenario():
+        limiter = AdaptiveLimiter("s3", max_limit=2, min_limit=1, max_queue=1, queue_timeout=0.05)
+        assert await limiter.acquire()
+        assert await limiter.acquire()
+        # Budget used up: one request may wait, the next is shed at once
+        waiting = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not await limiter.acquire()
+        # The waiter times out and is shed as well
+        assert not await waiting
+        assert limiter.rejected == 2
+        limiter.release()
+        assert await limiter.acquire()
+
+    asyncio.run(scenario())
+
+
+def test_limit_stays_low_under_sustained_overload(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(admission, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+    limiter = AdaptiveLimiter("db", max_limit=20, min_limit=2, min_latency_window=30.0)
+
+    def observe(latency: float, seconds: float):
+        for _ in range(int(seconds * 10)):
+            clock[0] += 0.1
+            limiter._update_limit(latency)
+
+    observe(0.01, 5)
+    assert int(limiter.limit) == 20
+    # Two minutes at ten times the no-load latency: the baseline must not jump to it,
+    # so the limit stays at the floor the gradient rule allows
+    observe(0.1, 120)
+    assert limiter._min_latency < 0.02
+    assert int(limiter.limit) <= 4
+
+
+def test_blocking_s3_handlers_are_shed_with_503(s3, monkeypatch):
+    def slow_head_file(key):
+        time.sleep(0.3)  # Stands in for a slow boto3 call
+        return {"key": key, "size": 1, "etag": None, "last_modified": None,
+                "content_type": None, "codec": None, "metadata": {}}
+
+    monkeypatch.setattr(s3_operations, "head_file", slow_head_file)
+    monkeypatch.setattr(settings, "admission_s3_max_concurrency", 1)
+    monkeypatch.setattr(settings, "admission_min_concurrency", 1)
+    monkeypatch.setattr(settings, "admission_max_queue", 0)
+    from app.main import app
+    limited = AdmissionControlMiddleware(app)
+
+    async def burst():
+        transport = httpx.ASGITransport(app=limited)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.get("/s3/metadata/a.txt") for _ in range(4)))
+
+    responses = asyncio.run(burst())
+
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [200, 503, 503, 503]
+    shed = next(response for response in responses if response.status_code == 503)
+    assert shed.headers["retry-after"] == str(settings.admission_retry_after)
+
+
+def test_uploads_do_not_shrink_or_use_the_s3_budget(monkeypatch):
+    monkeypatch.setattr(settings, "admission_s3_max_concurrency", 2)
+    monkeypatch.setattr(settings, "admission_transfer_max_concurrency", 2)
+    monkeypatch.setattr(settings, "admission_max_queue", 0)
+
+    async def app(scope, receive, send):
+        # Uploads answer only once the whole body has gone to S3
+        await asyncio.sleep(0.3 if scope["path"].startswith("/s3/upload") else 0.001)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    limited = AdmissionControlMiddleware(app)
+
+    async def traffic():
+        transport = httpx.ASGITransport(app=limited)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            uploads = [asyncio.ensure_future(client.put(f"/s3/upload-stream/{i}", content=b"x"))
+                       for i in range(3)]
+            await asyncio.sleep(0.05)
+            reads = [await client.get("/s3/list") for _ in range(5)]
+            return await asyncio.gather(*uploads), reads
+
+    uploads, reads = asyncio.run(traffic())
+
+    assert [response.status_code for response in reads] == [200] * 5
+    # The third concurrent upload is over the transfer budget
+    assert sorted(response.status_code for response in uploads) == [200, 200, 503]
+    assert limited.limiters["/s3/upload"].limit == 2
+    assert limited.limiters["/s3/"].limit == 2
@@ -0,0 +1,42 @@
+"""Benchmark suite bookkeeping: failed requests must fail the run."""
+import asyncio
+
+from app.benchmarks import suite
+
+
+class Response:
+    def __init__(self, status_code: int, text: str = ""):
+        self.status_code = status_code
+        self.text = text
+
+
+def row(scenario="s3_metadata", errors=0, p50=1.0, p99=2.0, rps=100.0):
+    return {"scenario": scenario, "requests": 40, "errors": errors, "first_error": None,
+            "p50_ms": p50, "p99_ms": p99, "throughput_rps": rps}
+
+
+def test_run_scenario_counts_failed_requests():
+    async def not_found(client, i):
+        return Response(404, '{"detail":"Not Found"}')
+
+    result = asyncio.run(suite.run_scenario(None, "missing", not_found, requests=10, concurrency=2))
+
+    assert result["errors"] == 10
+    assert result["first_error"].startswith("404")
+    assert suite.failures([result])
+
+
+def test_compare_fails_on_errors_even_when_faster():
+    baseline = {"results": [row()]}
+    faster_but_failing = row(errors=40, p50=0.1, p99=0.2, rps=10000.0)
+
+    regressions = suite.compare([faster_but_failing], baseline, threshold=0.25)
+
+    assert regressions == ["s3_metadata: 40/40 requests failed (first: None)"]
+
+
+def test_compare_flags_latency_and_throughput_regressions():
+    regressions = suite.compare([row(p50=2.0, rps=50.0)], {"results": [row()]}, threshold=0.25)
+
+    assert len(regressions) == 2
+    assert suite.compare([row()], {"results": [row()]}, threshold=0.25) == []
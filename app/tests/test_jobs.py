@@ -0,0 +1,94 @@
+"""Background jobs with the database backend, seen from several "workers"."""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from app import jobs
+from app.config import settings
+
+
+def test_auto_backend_uses_the_configured_database(monkeypatch):
+    assert jobs.backend_name() == "database"
+    assert isinstance(jobs.store, jobs.DatabaseJobStore)
+
+    monkeypatch.setattr(settings, "database_url", None)
+    monkeypatch.setattr(settings, "db_host", None)
+    assert jobs.backend_name() == "memory"
+
+
+def test_job_accepted_by_one_worker_is_run_and_reported_by_another(client, s3):
+    for i in range(3):
+        s3.put_object(Bucket=settings.s3_bucket_name, Key=f"tmp/{i}.txt", Body=b"x")
+
+    accepted = client.post("/jobs", json={"type": "s3.delete_prefix", "params": {"prefix": "tmp/"}})
+    assert accepted.status_code == 202
+    job_id = accepted.json()["id"]
+    assert accepted.headers["location"] == f"/jobs/{job_id}"
+
+    # A second store stands in for another worker process sharing the database
+    other_worker = jobs.DatabaseJobStore()
+    assert other_worker.get(job_id)["status"] == jobs.QUEUED
+    claimed = other_worker.claim(timeout=0)
+    assert claimed["id"] == job_id
+    jobs.JobRunner(other_worker, workers=1).run(claimed)
+
+    status = client.get(f"/jobs/{job_id}")
+    assert status.status_code == 200
+    assert status.json()["status"] == jobs.SUCCEEDED
+    assert status.json()["result"]["deleted"] == 3
+    assert "Contents" not in s3.list_objects_v2(Bucket=settings.s3_bucket_name, Prefix="tmp/")
+
+
+def test_unknown_job_is_404(client):
+    assert client.get("/jobs/00000000-0000-0000-0000-000000000000").status_code == 404
+
+
+def test_invalid_job_is_400(client):
+    response = client.post("/jobs", json={"type": "s3.copy_prefix", "params": {"source": "a/"}})
+    assert response.status_code == 400
+
+
+def test_gunicorn_disables_jobs_but_starts_with_several_memory_workers():
+    env = {**os.environ, "WEB_WORKERS": "3", "JOBS_BACKEND": "memory", "WEB_PRELOAD_APP": "false"}
+    result = subprocess.run(
+        [sys.executable, "-c",
+         "import app.gunicorn_conf\nfrom app.config import settings\nprint(settings.jobs_enabled)"],
+        cwd=Path(__file__).resolve().parents[2], env=env, capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "False"
+    assert "JOBS_BACKEND=database" in result.stderr
+
+
+def test_disabled_jobs_answer_503(client, monkeypatch):
+    monkeypatch.setattr(settings, "jobs_enabled", False)
+    response = client.post("/jobs", json={"type": "s3.delete_prefix", "params": {"prefix": "tmp/"}})
+    assert response.status_code == 503
+
+
+def test_worker_survives_a_store_failure(monkeypatch, caplog):
+    calls = []
+
+    class FlakyStore:
+        def claim(self, timeout):
+            calls.append(1)
+            if len(calls) > 2:
+                runner._stopping.set()
+                return None
+            return {"id": str(len(calls)), "type": "s3.delete_prefix", "params": {"prefix": "x/"}}
+
+        def report(self, job_id, progress):
+            pass
+
+        def finish(self, job_id, status, **outcome):
+            raise RuntimeError("database unavailable")
+
+    monkeypatch.setitem(jobs.JOB_TYPES, "s3.delete_prefix", (lambda params, report: {}, ("prefix",)))
+    runner = jobs.JobRunner(FlakyStore(), workers=1)
+
+    runner._work()
+
+    # Both jobs were attempted: the first failure did not end the worker loop
+    assert len(calls) == 3
+    assert "could not be completed" in caplog.text
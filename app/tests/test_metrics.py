@@ -0,0 +1,15 @@
+"""Prometheus request metrics."""
+import re
+
+
+def test_metrics_count_requests_by_route_template(client, s3):
+    client.get("/health")
+    client.get("/s3/metadata/missing.txt")
+
+    body = client.get("/metrics").text
+
+    assert re.search(r'http_requests_total\{method="GET",route="/health",status="200"\} [1-9]', body)
+    # Labelled with the route template, not the raw path
+    assert 'route="/s3/metadata/{key:path}",status="404"' in body
+    assert "missing.txt" not in body
+    assert 'http_request_duration_seconds_bucket{le="0.001",method="GET",route="/health"}' in body
@@ -0,0 +1,101 @@
+"""In-process response cache: strong ETags, 304s, TTLs and invalidation on writes."""
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import response_cache
+from app.config import settings
+from app.main import app
+from app.response_cache import ResponseCacheMiddleware
+
+
+@pytest.fixture
+def cached(monkeypatch):
+    monkeypatch.setattr(settings, "response_cache_routes", "/db/read=5,/s3/list=5")
+    response_cache.clear()
+    yield TestClient(ResponseCacheMiddleware(app))
+    response_cache.clear()
+
+
+def create(cached, name):
+    assert cached.post("/db/create", json={"name": name}).status_code == 200
+
+
+def test_strong_etag_and_304(cached):
+    create(cached, "etag")
+    first = cached.get("/db/read")
+    assert first.headers["x-app-cache"] == "MISS"
+    etag = first.headers["etag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+    # The remaining lifetime, rounded down so downstream caches never extend it
+    assert first.headers["cache-control"] in ("max-age=4", "max-age=5")
+
+    hit = cached.get("/db/read")
+    assert hit.headers["x-app-cache"] == "HIT"
+    assert hit.headers["etag"] == etag
+    assert hit.content == first.content
+
+    not_modified = cached.get("/db/read", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    # A weak form of the same validator matches too
+    assert cached.get("/db/read", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+
+
+def test_entries_expire_after_their_ttl(cached, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(response_cache, "time",
+                        SimpleNamespace(monotonic=lambda: clock[0], time_ns=time.time_ns))
+    cached.get("/db/read")
+    clock[0] += 4
+    assert cached.get("/db/read").headers["x-app-cache"] == "HIT"
+    clock[0] += 2
+    assert cached.get("/db/read").headers["x-app-cache"] == "MISS"
+
+
+def test_create_item_invalidates_db_reads(cached):
+    before = cached.get("/db/read", params={"limit": 1000})
+    create(cached, "fresh")
+
+    after = cached.get("/db/read", params={"limit": 1000})
+
+    assert after.headers["x-app-cache"] == "MISS"
+    assert after.headers["etag"] != before.headers["etag"]
+    assert "fresh" in [item["name"] for item in after.json()]
+
+
+def test_upload_and_delete_invalidate_listings(cached, s3):
+    assert cached.get("/s3/list").json()["count"] == 0
+
+    cached.post("/s3/upload", params={"key": "a.txt"}, files={"file": ("a.txt", b"a", "text/plain")})
+    listed = cached.get("/s3/list")
+    assert listed.headers["x-app-cache"] == "MISS"
+    assert listed.json()["count"] == 1
+
+    assert cached.delete("/s3/delete/a.txt").status_code == 200
+    assert cached.get("/s3/list").json()["count"] == 0
+
+
+def test_invalidation_from_another_worker_via_stamp_dir(cached, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "response_cache_invalidation_dir", str(tmp_path))
+    cached.get("/db/read")
+    assert cached.get("/db/read").headers["x-app-cache"] == "HIT"
+
+    # Another worker process writes and stamps the shared directory
+    time.sleep(0.01)
+    subprocess.run(
+        [sys.executable, "-c", "from app import response_cache; response_cache.invalidate('db')"],
+        cwd=Path(__file__).resolve().parents[2], check=True,
+        env={**os.environ, "RESPONSE_CACHE_INVALIDATION_DIR": str(tmp_path)},
+    )
+
+    assert (tmp_path / "db.stamp").exists()
+    assert cached.get("/db/read").headers["x-app-cache"] == "MISS"
+    # Other namespaces keep their entries
+    assert response_cache.generation("s3")[1] == 0
@@ -0,0 +1,82 @@
+"""Compression on upload and Accept-Encoding-driven decoding on download (moto)."""
+import gzip
+import os
+
+import pytest
+
+from app import s3_operations
+from app.config import settings
+
+# Several download chunks, so decoding has to carry state across them
+JSON_BODY = b"".join(b'{"id": %d, "status": "active"}\n' % i for i in range(60_000))
+
+
+@pytest.fixture(autouse=True)
+def gzip_policy(monkeypatch):
+    monkeypatch.setattr(settings, "s3_compression", "gzip")
+
+
+def upload(client, key, content, content_type="application/json"):
+    return client.post("/s3/upload", params={"key": key},
+                       files={"file": (key, content, content_type)})
+
+
+def raw_download(client, key, accept_encoding):
+    # httpx would decode gzip itself; read the bytes as they were sent
+    with client.stream("GET", f"/s3/download/{key}",
+                       headers={"Accept-Encoding": accept_encoding}) as response:
+        return response, b"".join(response.iter_raw())
+
+
+def test_compressible_upload_is_stored_compressed(client, s3):
+    response = upload(client, "data/items.json", JSON_BODY)
+
+    assert response.status_code == 200
+    stored = s3.get_object(Bucket=settings.s3_bucket_name, Key="data/items.json")
+    assert stored["ContentEncoding"] == "gzip"
+    assert stored["Metadata"][s3_operations.CODEC_METADATA_KEY] == "gzip"
+    body = stored["Body"].read()
+    assert len(body) < len(JSON_BODY) / 5
+    assert gzip.decompress(body) == JSON_BODY
+
+
+def test_incompressible_or_unlisted_content_is_stored_as_is(client, s3):
+    noise = os.urandom(4096)
+    upload(client, "noise.txt", noise, "text/plain")
+    upload(client, "image.png", JSON_BODY, "image/png")
+
+    for key, body in (("noise.txt", noise), ("image.png", JSON_BODY)):
+        stored = s3.get_object(Bucket=settings.s3_bucket_name, Key=key)
+        assert "ContentEncoding" not in stored
+        assert stored["Body"].read() == body
+
+
+def test_download_passes_the_stored_encoding_through(client, s3):
+    upload(client, "data/items.json", JSON_BODY)
+    stored_size = s3.head_object(Bucket=settings.s3_bucket_name, Key="data/items.json")["ContentLength"]
+
+    response, body = raw_download(client, "data/items.json", "gzip, br")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-length"] == str(stored_size)
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert gzip.decompress(body) == JSON_BODY
+
+
+@pytest.mark.parametrize("accept_encoding", ["identity", "br", "gzip;q=0"])
+def test_download_decodes_when_the_codec_is_not_accepted(client, s3, accept_encoding):
+    upload(client, "data/items.json", JSON_BODY)
+
+    response, body = raw_download(client, "data/items.json", accept_encoding)
+
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"].startswith("W/")
+    assert body == JSON_BODY
+
+
+def test_decompress_stream_handles_arbitrary_chunk_boundaries():
+    compressed = gzip.compress(JSON_BODY)
+    chunks = (compressed[start:start + 777] for start in range(0, len(compressed), 777))
+
+    assert b"".join(s3_operations.decompress_stream(chunks, "gzip")) == JSON_BODY
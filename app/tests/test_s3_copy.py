@@ -0,0 +1,103 @@
+"""Server-side copy and move of whole prefixes (moto)."""
+import threading
+
+import pytest
+
+from app import s3_operations
+from app.config import settings
+
+
+def put(s3, *keys):
+    for key in keys:
+        s3.put_object(Bucket=settings.s3_bucket_name, Key=key, Body=key.encode())
+
+
+def keys(s3, prefix: str) -> list:
+    listing = s3.list_objects_v2(Bucket=settings.s3_bucket_name, Prefix=prefix)
+    return sorted(obj["Key"] for obj in listing.get("Contents", []))
+
+
+def test_copy_prefix(client, s3):
+    put(s3, "src/a.txt", "src/sub/b.txt")
+
+    response = client.post("/s3/copy", json={"source": "src/", "destination": "dst/", "prefix": True})
+
+    assert response.status_code == 200
+    assert (response.json()["count"], response.json()["failed"]) == (2, 0)
+    assert keys(s3, "dst/") == ["dst/a.txt", "dst/sub/b.txt"]
+    assert keys(s3, "src/") == ["src/a.txt", "src/sub/b.txt"]
+
+
+def test_move_prefix(client, s3):
+    put(s3, "src/a.txt", "src/b.txt")
+
+    response = client.post("/s3/move", json={"source": "src/", "destination": "dst/", "prefix": True})
+
+    assert response.status_code == 200
+    assert {entry["status"] for entry in response.json()["objects"]} == {"moved"}
+    assert keys(s3, "dst/") == ["dst/a.txt", "dst/b.txt"]
+    assert keys(s3, "src/") == []
+
+
+@pytest.mark.parametrize("source, destination", [("a/", "a/b/"), ("a/b/", "a/"), ("a/", "a/"), ("", "x/")])
+def test_overlapping_prefixes_are_rejected(client, s3, source, destination):
+    put(s3, "a/one.txt")
+    body = {"source": source, "destination": destination, "prefix": True}
+
+    assert client.post("/s3/copy", json=body).status_code == 400
+    assert keys(s3, "a/") == ["a/one.txt"]
+
+
+def test_overlapping_prefix_job_is_rejected(client):
+    body = {"type": "s3.copy_prefix", "params": {"source": "a/", "destination": "a/b/"}}
+    assert client.post("/jobs", json=body).status_code == 400
+
+
+def test_unexpected_errors_give_a_partial_report(s3, monkeypatch):
+    put(s3, "src/a.txt", "src/b.txt", "src/c.txt")
+    copy_object = s3_operations._copy_object
+
+    def flaky_copy(s3_client, source_key, destination_key, size=None):
+        if source_key == "src/b.txt":
+            raise OSError("connection reset")
+        return copy_object(s3_client, source_key, destination_key, size=size)
+
+    monkeypatch.setattr(s3_operations, "_copy_object", flaky_copy)
+
+    result = s3_operations.copy_prefix("src/", "dst/", delete_source=True)
+
+    assert (result["count"], result["failed"]) == (3, 1)
+    failed = next(entry for entry in result["objects"] if entry["status"] == "failed")
+    assert failed["source"] == "src/b.txt" and "connection reset" in failed["error"]
+    # Only sources that were copied are deleted
+    assert keys(s3, "src/") == ["src/b.txt"]
+    assert keys(s3, "dst/") == ["dst/a.txt", "dst/c.txt"]
+
+
+def test_listing_is_consumed_in_bounded_batches(s3, monkeypatch):
+    monkeypatch.setattr(settings, "s3_max_concurrency", 2)
+    listed = []
+    release = threading.Event()
+
+    def listing(s3_client, prefix):
+        for i in range(50):
+            listed.append(i)
+            yield {"Key": f"src/{i}.txt", "Size": 1}
+
+    def blocked_copy(s3_client, source_key, destination_key, size=None):
+        release.wait(5)
+        return {"source": source_key, "destination": destination_key}
+
+    monkeypatch.setattr(s3_operations, "_iter_objects", listing)
+    monkeypatch.setattr(s3_operations, "_copy_object", blocked_copy)
+    worker = threading.Thread(target=s3_operations.copy_prefix, args=("src/", "dst/"))
+    worker.start()
+    try:
+        # Copies are stuck, so the listing must stop once the in-flight budget is used
+        worker.join(0.3)
+        assert len(listed) == 2 * settings.s3_max_concurrency + 1
+    finally:
+        release.set()
+        worker.join()
+    assert len(listed) == 50
+
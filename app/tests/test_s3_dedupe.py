@@ -0,0 +1,81 @@
+"""Deduplicated uploads (POST /s3/upload?dedupe=true) against moto."""
+import base64
+import hashlib
+
+import pytest
+
+from app import s3_operations
+from app.config import settings
+
+CONTENT = b"id,name\n1,ada\n2,grace\n"
+
+
+@pytest.fixture(autouse=True)
+def empty_hash_index():
+    s3_operations._hash_index.clear()
+    yield
+    s3_operations._hash_index.clear()
+
+
+def upload(client, key, content=CONTENT, content_type="text/plain", **params):
+    return client.post("/s3/upload", params={"key": key, "dedupe": True, **params},
+                       files={"file": (key.rsplit("/", 1)[-1], content, content_type)})
+
+
+def head(s3, key):
+    return s3.head_object(Bucket=settings.s3_bucket_name, Key=key)
+
+
+def test_new_content_is_uploaded_with_its_hash(client, s3):
+    response = upload(client, "a.txt")
+
+    assert response.status_code == 200
+    assert (response.json()["dedupe"], response.json()["transferred"]) == ("uploaded", True)
+    assert head(s3, "a.txt")["Metadata"][s3_operations.SHA256_METADATA_KEY] == \
+        hashlib.sha256(CONTENT).hexdigest()
+
+
+def test_same_content_on_the_same_key_is_skipped(client, s3):
+    upload(client, "a.txt")
+    etag = head(s3, "a.txt")["ETag"]
+
+    response = upload(client, "a.txt")
+
+    assert (response.json()["dedupe"], response.json()["transferred"]) == ("skipped", False)
+    assert head(s3, "a.txt")["ETag"] == etag
+
+
+def test_known_duplicate_is_copied_with_the_new_uploads_metadata(client, s3):
+    upload(client, "a.txt", content_type="text/plain")
+
+    response = upload(client, "reports/b.csv", content_type="text/csv")
+
+    assert response.json()["dedupe"] == "copied"
+    assert response.json()["source"] == "a.txt"
+    copied = head(s3, "reports/b.csv")
+    # Not inherited from a.txt
+    assert copied["ContentType"] == "text/csv"
+    assert copied["Metadata"][s3_operations.SHA256_METADATA_KEY] == hashlib.sha256(CONTENT).hexdigest()
+    body = s3.get_object(Bucket=settings.s3_bucket_name, Key="reports/b.csv")["Body"].read()
+    assert body == CONTENT
+
+
+def test_checksum_is_verified(client, s3):
+    digest = hashlib.sha256(CONTENT).digest()
+    assert upload(client, "a.txt", checksum=digest.hex()).status_code == 200
+    assert upload(client, "b.txt", checksum=base64.b64encode(digest).decode()).status_code == 200
+
+    response = upload(client, "c.txt", checksum=hashlib.sha256(b"other").hexdigest())
+
+    assert response.status_code == 400
+    assert "Contents" not in s3.list_objects_v2(Bucket=settings.s3_bucket_name, Prefix="c.txt")
+
+
+def test_object_stored_before_dedupe_is_matched_by_its_md5_etag(client, s3):
+    s3.put_object(Bucket=settings.s3_bucket_name, Key="legacy.txt", Body=CONTENT)
+
+    response = upload(client, "legacy.txt")
+
+    assert (response.json()["dedupe"], response.json()["transferred"]) == ("skipped", False)
+    changed = upload(client, "legacy.txt", content=CONTENT + b"3,alan\n")
+    assert changed.json()["dedupe"] == "uploaded"
@@ -0,0 +1,125 @@
+"""/s3/query over CSV and JSON Lines objects (moto).
+
+moto's S3 Select cannot parse the quoted-identifier SQL the app sends, so these
+run the scan engine; pushdown is covered by stubbing select_object_content.
+"""
+import json
+
+import pytest
+from botocore.exceptions import ClientError
+
+from app.config import settings
+
+CSV_BODY = b"name,city,age\nada,london,36\nalan,wilmslow,41\ngrace,arlington,85\n"
+JSONL_BODY = b"".join(
+    json.dumps(row).encode() + b"\n"
+    for row in ({"name": "ada", "age": 36}, {"name": "alan", "age": 41}, {"name": "grace", "age": 85})
+)
+
+
+def rows(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+@pytest.fixture(autouse=True)
+def scan_engine(monkeypatch):
+    monkeypatch.setattr(settings, "s3_select_enabled", False)
+
+
+def test_query_csv_filters_and_projects(client, s3):
+    s3.put_object(Bucket=settings.s3_bucket_name, Key="people.csv", Body=CSV_BODY)
+
+    response = client.get("/s3/query/people.csv", params={"where": "age > 40", "fields": "name"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.headers["x-query-engine"] == "scan"
+    assert rows(response) == [{"name": "alan"}, {"name": "grace"}]
+
+
+def test_query_tsv_splits_on_tabs(client, s3):
+    s3.put_object(Bucket=settings.s3_bucket_name, Key="people.tsv",
+                  Body=CSV_BODY.replace(b",", b"\t").replace(b"london", b"london, uk"))
+
+    response = client.get("/s3/query/people.tsv", params={"where": "age < 40"})
+
+    assert response.status_code == 200
+    assert rows(response) == [{"name": "ada", "city": "london, uk", "age": "36"}]
+
+
+def test_query_json_lines(client, s3):
+    s3.put_object(Bucket=settings.s3_bucket_name, Key="people.jsonl", Body=JSONL_BODY)
+
+    response = client.get("/s3/query/people.jsonl", params={"where": "name = 'ada'"})
+
+    assert response.status_code == 200
+    assert [row["name"] for row in rows(response)] == ["ada"]
+
+
+def test_query_rejects_invalid_filter(client, s3):
+    s3.put_object(Bucket=settings.s3_bucket_name, Key="people.csv", Body=CSV_BODY)
+
+    response = client.get("/s3/query/people.csv", params={"where": "age >> 1"})
+
+    assert response.status_code == 400
+
+
+def test_query_missing_object_is_404(client, s3):
+    assert client.get("/s3/query/missing.csv").status_code == 404
+
+
+def select_failing_with(code: str):
+    def select_object_content(**params):
+        raise ClientError({"Error": {"Code": code, "Message": code}}, "SelectObjectContent")
+    return select_object_content
+
+
+def test_select_pushdown_streams_its_records(client, s3, monkeypatch):
+    monkeypatch.setattr(settings, "s3_select_enabled", True)
+    s3.put_object(Bucket=settings.s3_bucket_name, Key="people.csv", Body=CSV_BODY)
+    payload = [{"Records": {"Payload": b'{"name":"grace"}\n'}}, {"End": {}}]
+    monkeypatch.setattr(s3, "select_object_content", lambda **params: {"Payload": payload})
+
+    response = client.get("/s3/query/people.csv", params={"where": "age > 80", "fields": "name"})
+
+    assert response.headers["x-query-engine"] == "s3-select"
+    assert rows(response) == [{"name": "grace"}]
+
+
+def test_select_reads_tsv_with_a_tab_delimiter(client, s3, monkeypatch):
+    monkeypatch.setattr(settings, "s3_select_enabled", True)
+    s3.put_object(Bucket=settings.s3_bucket_name, Key="people.tsv", Body=CSV_BODY.replace(b",", b"\t"))
+    calls = []
+
+    def select_object_content(**params):
+        calls.append(params)
+        return {"Payload": [{"End": {}}]}
+    monkeypatch.setattr(s3, "select_object_content", select_object_content)
+
+    client.get("/s3/query/people.tsv", params={"where": "age > 80"})
+
+    assert calls[0]["InputSerialization"]["CSV"]["FieldDelimiter"] == "\t"
+
+
+@pytest.mark.parametrize("code", ["MethodNotAllowed", "NotImplemented", "XNotImplemented"])
+def test_select_unavailable_falls_back_to_scan(client, s3, monkeypatch, code):
+    monkeypatch.setattr(settings, "s3_select_enabled", True)
+    s3.put_object(Bucket=settings.s3_bucket_name, Key="people.csv", Body=CSV_BODY)
+    monkeypatch.setattr(s3, "select_object_content", select_failing_with(code))
+
+    response = client.get("/s3/query/people.csv", params={"where": "age > 80", "fields": "name"})
+
+    assert response.headers["x-query-engine"] == "scan"
+    assert rows(response) == [{"name": "grace"}]
+
+
+@pytest.mark.parametrize("code", ["AccessDenied", "InvalidRequest", "UnsupportedSyntax"])
+def test_select_errors_are_not_masked_by_the_scan(client, s3, monkeypatch, code):
+    monkeypatch.setattr(settings, "s3_select_enabled", True)
+    s3.put_object(Bucket=settings.s3_bucket_name, Key="people.csv", Body=CSV_BODY)
+    monkeypatch.setattr(s3, "select_object_content", select_failing_with(code))
+
+    response = client.get("/s3/query/people.csv", params={"where": "age > 80"})
+
+    assert response.status_code != 200
+    assert code in response.json()["detail"]
@@ -0,0 +1,99 @@
+"""Uploads: the buffered multipart-form route and the streamed raw-body routes (moto)."""
+import io
+import tarfile
+import zipfile
+
+from app.config import settings
+
+PART = 5 * 1024 * 1024  # The smallest part S3 accepts
+
+
+def stored(s3, key: str) -> bytes:
+    return s3.get_object(Bucket=settings.s3_bucket_name, Key=key)["Body"].read()
+
+
+def test_form_upload(client, s3):
+    response = client.post("/s3/upload", params={"key": "docs/a.txt"},
+                           files={"file": ("a.txt", b"hello", "text/plain")})
+
+    assert response.status_code == 200
+    assert stored(s3, "docs/a.txt") == b"hello"
+
+
+def test_stream_upload_small_body_is_a_single_put(client, s3):
+    response = client.put("/s3/upload-stream/small.bin", content=b"x" * 1000)
+
+    assert response.status_code == 200
+    assert response.json()["parts"] == 1
+    assert stored(s3, "small.bin") == b"x" * 1000
+
+
+def test_stream_upload_sends_parts_while_the_body_arrives(client, s3, monkeypatch):
+    monkeypatch.setattr(settings, "s3_upload_part_size", PART)
+    body = bytes(range(256)) * (PART * 2 // 256) + b"tail"
+
+    def chunks():
+        # A chunked request body, as a client streaming a file would send it
+        for start in range(0, len(body), 1024 * 1024):
+            yield body[start:start + 1024 * 1024]
+
+    response = client.put("/s3/upload-stream/big.bin", content=chunks(),
+                          headers={"content-type": "application/octet-stream"})
+
+    assert response.status_code == 200
+    assert response.json()["parts"] == 3
+    assert response.json()["size"] == len(body)
+    assert stored(s3, "big.bin") == body
+
+
+def tar_archive(files: dict, mode: str = "w:gz") -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as archive:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    return buffer.getvalue()
+
+
+def test_archive_body_is_unpacked_as_it_streams(client, s3, monkeypatch):
+    monkeypatch.setattr(settings, "s3_upload_part_size", PART)
+    large = bytes(range(256)) * (PART * 2 // 256)
+    body = tar_archive({"small.txt": b"hello", "big.bin": large, "../escape.txt": b"no"})
+
+    def chunks():
+        for start in range(0, len(body), 64 * 1024):
+            yield body[start:start + 64 * 1024]
+
+    response = client.post("/s3/upload-archive", params={"prefix": "unpacked"}, content=chunks(),
+                           headers={"content-type": "application/gzip"})
+
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["uploaded"], result["skipped"], result["failed"]) == (2, 1, 0)
+    assert stored(s3, "unpacked/small.txt") == b"hello"
+    # Larger than one part: streamed from the archive into a multipart upload
+    assert stored(s3, "unpacked/big.bin") == large
+
+
+def test_archive_zip_body_and_legacy_form(client, s3):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("a/one.txt", b"1")
+    response = client.post("/s3/upload-archive", content=buffer.getvalue(),
+                           headers={"content-type": "application/zip"})
+    assert response.status_code == 200
+    assert stored(s3, "a/one.txt") == b"1"
+
+    form = client.post("/s3/upload-archive", params={"prefix": "form"},
+                       files={"file": ("x.tar", tar_archive({"two.txt": b"2"}, "w"))})
+    assert form.status_code == 200
+    assert stored(s3, "form/two.txt") == b"2"
+
+
+def test_archive_truncated_body_is_400(client, s3):
+    body = tar_archive({"big.bin": b"x" * 100_000}, "w")
+
+    response = client.post("/s3/upload-archive", content=body[:50_000])
+
+    assert response.status_code == 400
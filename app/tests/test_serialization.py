@@ -0,0 +1,16 @@
+"""The orjson response class renders exactly what the stdlib encoder does."""
+from datetime import datetime, timezone
+
+import pytest
+
+from app.serialization import OrjsonResponse, StdlibJSONResponse
+
+
+@pytest.mark.parametrize("content", [
+    {"id": 1, "name": "naïve café ✓", "tags": ["a", "b"], "nested": {"ok": True, "none": None}},
+    [{"created_at": datetime(2024, 5, 1, 12, 30, 15, 123456)},
+     {"created_at": datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)}],
+    {"count": 0, "ratio": 0.25, "negative": -3, "big": 2 ** 53, "empty": {}, "list": []},
+])
+def test_fast_json_matches_the_stdlib_encoder(content):
+    assert OrjsonResponse(content).body == StdlibJSONResponse(content).body
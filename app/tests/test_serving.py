@@ -0,0 +1,38 @@
+"""Serving-mode configuration (gunicorn config evaluated in a fresh interpreter)."""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+PRINT_POOLS = (
+    "import app.gunicorn_conf as conf\n"
+    "from app.config import settings as s\n"
+    "print(conf.workers, s.db_pool_size, s.db_max_overflow, s.admission_db_max_concurrency)\n"
+)
+
+
+def gunicorn_settings(**env) -> list:
+    result = subprocess.run(
+        [sys.executable, "-c", PRINT_POOLS],
+        cwd=Path(__file__).resolve().parents[2],
+        env={**os.environ, "WEB_PRELOAD_APP": "false", **env},
+        capture_output=True, text=True, check=True,
+    )
+    return [int(value) for value in result.stdout.split()]
+
+
+def test_worker_pools_share_the_container_connection_budget():
+    workers, pool_size, max_overflow, admission = gunicorn_settings(
+        WEB_WORKERS="9", DB_MAX_CONNECTIONS="40"
+    )
+    assert workers == 9
+    assert workers * (pool_size + max_overflow) <= 40
+    assert (pool_size, max_overflow, admission) == (4, 0, 4)
+
+
+def test_small_worker_counts_keep_the_configured_pool():
+    assert gunicorn_settings(WEB_WORKERS="2", DB_MAX_CONNECTIONS="40")[1:] == [5, 10, 15]
+
+
+def test_budget_can_be_disabled():
+    assert gunicorn_settings(WEB_WORKERS="9", DB_MAX_CONNECTIONS="0")[1:] == [5, 10, 15]
@@ -0,0 +1,72 @@
+"""Startup warmup and the /ready endpoint."""
+import threading
+import time
+
+import pytest
+
+from app import startup
+from app.config import settings
+
+
+@pytest.fixture
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(startup, "state", {"ready": False, "started_at": None,
+                                           "duration_ms": None, "checks": {}})
+    monkeypatch.setattr(settings, "warmup_retry_interval", 0.01)
+    yield startup.state
+    startup.stop()
+
+
+def test_ready_once_every_check_passes(client, s3, fresh_state):
+    startup.warmup()
+
+    response = client.get("/ready")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+    assert response.json()["checks"] == {"s3": "ok", "database": "ok"}
+
+
+def test_failed_check_is_reported_and_retried(client, fresh_state, monkeypatch):
+    attempts = []
+    healthy = threading.Event()
+
+    def flaky_s3():
+        attempts.append(1)
+        if not healthy.is_set():
+            raise RuntimeError("bucket unreachable")
+        return "ok"
+
+    monkeypatch.setattr(startup, "_warm_s3", flaky_s3)
+    warmup = threading.Thread(target=startup.warmup)
+    warmup.start()
+    try:
+        while len(attempts) < 2:
+            time.sleep(0.01)
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "unavailable"
+        assert response.json()["failed"] == ["s3"]
+        assert "bucket unreachable" in response.json()["checks"]["s3"]
+    finally:
+        healthy.set()
+        warmup.join(5)
+
+    assert client.get("/ready").status_code == 200
+
+
+def test_stop_ends_the_retries(s3, fresh_state, monkeypatch):
+    def broken():
+        raise RuntimeError("down")
+
+    monkeypatch.setattr(startup, "_warm_db", broken)
+    monkeypatch.setattr(settings, "warmup_retry_interval", 60)
+    warmup = threading.Thread(target=startup.warmup)
+    warmup.start()
+    while "database" not in fresh_state["checks"]:
+        time.sleep(0.01)
+    startup.stop()
+    warmup.join(5)
+
+    assert not warmup.is_alive()
+    assert not fresh_state["ready"]
@@ -0,0 +1,13 @@
+"""The startup import budget (python -m app.benchmarks.startup --check)."""
+import subprocess
+import sys
+from pathlib import Path
+
+
+def test_app_import_stays_within_budget_and_lazy():
+    result = subprocess.run(
+        [sys.executable, "-m", "app.benchmarks.startup", "--check", "--runs", "3", "--top", "0"],
+        cwd=Path(__file__).resolve().parents[2], capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "Lazy backends loaded at import: none" in result.stdout
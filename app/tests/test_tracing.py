@@ -0,0 +1,48 @@
+"""Trace context propagation through the tracing middleware."""
+import pytest
+from fastapi.testclient import TestClient
+
+from app import tracing
+from app.config import settings
+from app.main import app
+from app.tracing import InMemoryExporter, NullExporter, TracingMiddleware
+
+
+@pytest.fixture
+def spans():
+    exporter = InMemoryExporter()
+    tracing.set_exporter(exporter)
+    yield exporter.spans
+    tracing.set_exporter(NullExporter())
+
+
+def test_incoming_trace_context_is_continued(s3, spans):
+    s3.put_object(Bucket=settings.s3_bucket_name, Key="a.txt", Body=b"a")
+    client = TestClient(TracingMiddleware(app))
+    trace_id, parent_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+
+    response = client.get("/s3/metadata/a.txt",
+                          headers={"traceparent": f"00-{trace_id}-{parent_id}-01"})
+
+    assert response.status_code == 200
+    assert response.headers["x-trace-id"] == trace_id
+    root = next(span for span in spans if span.parent_id == parent_id)
+    assert root.name == "GET /s3/metadata/{key:path}"
+    assert response.headers["traceparent"] == f"00-{trace_id}-{root.span_id}-01"
+    # Work done for the request is recorded in the same trace, below the root
+    children = [span for span in spans if span is not root]
+    assert children and {span.trace_id for span in children} == {trace_id}
+    assert "serialize" in {span.name for span in children}
+
+
+def test_unsampled_request_still_gets_a_trace_id(spans):
+    client = TestClient(TracingMiddleware(app))
+    request_id = "0123456789abcdef0123456789abcdef"
+
+    response = client.get("/health", headers={
+        "traceparent": f"00-{request_id}-00f067aa0ba902b7-00",
+    })
+
+    assert response.headers["x-trace-id"] == request_id
+    assert "traceparent" not in response.headers
+    assert spans == []
@@ -0,0 +1,363 @@
+"""Lightweight request tracing across FastAPI, SQLAlchemy and boto3.
+
+Every sampled request gets a root span; ``traced`` operations, SQL statements
+and S3 API calls made while handling it become child spans. Trace context is
+taken from an incoming W3C ``traceparent`` header, or from nginx's
+``X-Request-ID`` when there is none. Finished spans go to the configured
+exporter:
+
+- ``none``: tracing disabled
+- ``memory``: kept in ``InMemoryExporter.spans`` (for tests and benchmarks)
+- ``file``: appended as JSON lines to ``TRACING_FILE``
+- ``log``: written to the ``app.tracing`` logger
+- ``package.module:ClassName``: any class with an ``export(span)`` method
+
+Unsampled requests only pay for a context variable lookup per operation.
+"""
+import contextvars
+import functools
+import importlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+REQUEST_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+MAX_STATEMENT_LENGTH = 500
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes",
+                 "start_ns", "end_ns", "status", "_token")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None,
+                 attributes: Optional[dict] = None):
+        self.trace_id = trace_id
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes or {}
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = "ok"
+        self._token = None
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        self.status = "error"
+        self.attributes["error.type"] = type(error).__name__
+        self.attributes["error.message"] = str(error)[:MAX_STATEMENT_LENGTH]
+
+    def finish(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            exporter.export(self)
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end_ns is None:
+            return None
+        return round((self.end_ns - self.start_ns) / 1e6, 3)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+# Exporters
+
+class NullExporter:
+    def export(self, span: Span) -> None:
+        pass
+
+
+class InMemoryExporter:
+    """Keeps finished spans in a list."""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans.clear()
+
+
+class FileExporter:
+    """Appends finished spans to a file as JSON lines."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line)
+
+
+class LoggingExporter:
+    """Writes finished spans to the module logger."""
+
+    def export(self, span: Span) -> None:
+        logger.info("span %s", json.dumps(span.to_dict(), default=str))
+
+
+def build_exporter(name: Optional[str] = None):
+    """Create the exporter named by settings (or by ``name``)."""
+    name = name or settings.tracing_exporter
+    if name == "none":
+        return NullExporter()
+    if name == "memory":
+        return InMemoryExporter()
+    if name == "file":
+        return FileExporter(settings.tracing_file)
+    if name == "log":
+        return LoggingExporter()
+    module_name, _, class_name = name.partition(":")
+    if not class_name:
+        raise ValueError(f"Unknown tracing exporter: {name}")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+exporter = build_exporter()
+enabled = settings.tracing_exporter != "none"
+
+
+def set_exporter(new_exporter) -> None:
+    """Replace the exporter (and enable tracing), e.g. with an InMemoryExporter."""
+    global exporter, enabled
+    exporter = new_exporter
+    enabled = not isinstance(new_exporter, NullExporter)
+
+
+# Span API
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def start_span(name: str, attributes: Optional[dict] = None):
+    """Run a block as a child span of the current span (no-op when not tracing)."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    span = Span(name, parent.trace_id, parent.span_id, attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.finish()
+
+
+def traced(name: Optional[str] = None):
+    """Decorator recording each call of a function as a child span."""
+    def decorator(fn):
+        span_name = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return fn(*args, **kwargs)
+            with start_span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def bind_context(fn):
+    """Wrap a callable so it runs in a copy of the caller's context.
+
+    Use for work submitted to a ThreadPoolExecutor, which does not carry
+    context variables (and so the current span) into its threads.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return wrapper
+
+
+# Propagation and the request middleware
+
+def extract_context(headers: dict):
+    """Return (trace_id, parent_span_id, sampled) from request headers."""
+    traceparent = headers.get(b"traceparent", b"").decode("latin-1").strip().lower()
+    match = TRACEPARENT_PATTERN.match(traceparent)
+    if match:
+        trace_id, parent_id, flags = match.groups()
+        return trace_id, parent_id, bool(int(flags, 16) & 1)
+    request_id = headers.get(b"x-request-id", b"").decode("latin-1").strip().lower()
+    if REQUEST_ID_PATTERN.match(request_id):
+        return request_id, None, None
+    return _new_id(128), None, None
+
+
+class TracingMiddleware:
+    """ASGI middleware creating the root span of each sampled request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not enabled:
+            await self.app(scope, receive, send)
+            return
+
+        trace_id, parent_id, sampled = extract_context(dict(scope["headers"]))
+        if sampled is None:
+            sampled = random.random() < settings.tracing_sample_rate
+        trace_header = (b"x-trace-id", trace_id.encode())
+        if not sampled:
+            async def send_unsampled(message):
+                if message["type"] == "http.response.start":
+                    message = {**message, "headers": [*message.get("headers", []), trace_header]}
+                await send(message)
+            await self.app(scope, receive, send_unsampled)
+            return
+
+        span = Span(f"{scope['method']} {scope['path']}", trace_id, parent_id, {
+            "http.method": scope["method"],
+            "http.target": scope["path"],
+        })
+        token = _current_span.set(span)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.status_code", message["status"])
+                message = {**message, "headers": [
+                    *message.get("headers", []), trace_header,
+                    (b"traceparent", span.traceparent.encode()),
+                ]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            route = scope.get("route")
+            if route is not None:
+                span.name = f"{scope['method']} {route.path}"
+                span.set_attribute("http.route", route.path)
+            _current_span.reset(token)
+            span.finish()
+
+
+# Library instrumentation
+
+def _s3_before_call(model, context, **kwargs):
+    parent = _current_span.get()
+    if parent is None:
+        return
+    context["tracing_span"] = Span(f"s3.{model.name}", parent.trace_id, parent.span_id, {
+        "aws.service": "s3",
+        "aws.operation": model.name,
+    })
+
+
+def _s3_after_call(http_response, parsed, model, context, **kwargs):
+    span = context.pop("tracing_span", None)
+    if span is None:
+        return
+    metadata = parsed.get("ResponseMetadata", {}) if isinstance(parsed, dict) else {}
+    if http_response is not None:
+        span.set_attribute("http.status_code", http_response.status_code)
+        if http_response.status_code >= 400:
+            span.status = "error"
+    span.set_attribute("aws.retry_attempts", metadata.get("RetryAttempts", 0))
+    span.finish()
+
+
+def _s3_after_call_error(exception, model, context, **kwargs):
+    span = context.pop("tracing_span", None)
+    if span is not None:
+        span.record_error(exception)
+        span.finish()
+
+
+def instrument_s3_client(s3_client):
+    """Record every API call made through a boto3 S3 client as a span."""
+    events = s3_client.meta.events
+    events.register("before-call.s3", _s3_before_call)
+    events.register("after-call.s3", _s3_after_call)
+    events.register("after-call-error.s3", _s3_after_call_error)
+    return s3_client
+
+
+def instrument_engine(engine):
+    """Record every SQL statement executed through a SQLAlchemy engine as a span."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        parent = _current_span.get()
+        if parent is None:
+            return
+        conn.info.setdefault("tracing_spans", []).append(Span("db.query", parent.trace_id, parent.span_id, {
+            "db.system": engine.dialect.name,
+            "db.statement": statement[:MAX_STATEMENT_LENGTH],
+        }))
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("tracing_spans")
+        if spans:
+            span = spans.pop()
+            span.set_attribute("db.rowcount", cursor.rowcount)
+            span.finish()
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        spans = connection.info.get("tracing_spans") if connection is not None else None
+        if spans:
+            span = spans.pop()
+            span.record_error(exception_context.original_exception)
+            span.finish()
+
+    return engine
@@ -20,11 +20,23 @@ class ACMComponent(BaseComponent):
         
         # If zone_id provided, create validation records automatically
         if zone_id:
-            # Get certificate validation options
+            # DNS record from the certificate's validation options (one per domain;
+            # domain_validation_options is an Output, so it is indexed, not iterated)
+            validation_option = self.certificate.domain_validation_options[0]
+            self.validation_record = aws.route53.Record(
+                f"{name}-cert-validation-record",
+                zone_id=zone_id,
+                name=validation_option.resource_record_name,
+                type=validation_option.resource_record_type,
+                records=[validation_option.resource_record_value],
+                ttl=300,
+                allow_overwrite=True,
+                opts=pulumi.ResourceOptions(parent=self)
+            )
             cert_validation = aws.acm.CertificateValidation(
                 f"{name}-cert-validation",
                 certificate_arn=self.certificate.arn,
-                validation_record_fqdns=[record.fqdn for record in self.certificate.domain_validation_options],
+                validation_record_fqdns=[self.validation_record.fqdn],
                 opts=pulumi.ResourceOptions(parent=self)
             )
             self.certificate_validation = cert_validation
@@ -0,0 +1,209 @@
+"""Auto Scaling compute component - launch template, ASG and ALB."""
+import base64
+
+import pulumi
+import pulumi_aws as aws
+from infrastructure.components.base import BaseComponent
+from infrastructure.components.ec2 import ami_ignore_changes, resolve_ami_id
+from infrastructure.config_types.ec2_config import EC2Config
+
+
+class AutoScalingComputeComponent(BaseComponent):
+    """Auto Scaling Group of app instances behind an Application Load Balancer."""
+
+    def __init__(
+        self,
+        name: str,
+        config: EC2Config,
+        vpc_id=None,
+        subnet_ids=None,
+        security_group_id=None,
+        iam_instance_profile_name=None,
+        user_data=None,
+        opts=None
+    ):
+        super().__init__(name, "custom:components:AutoScalingCompute", opts)
+        tags = config.tags or {}
+
+        # Load balancer security group (instances keep the shared EC2 group)
+        self.alb_security_group = aws.ec2.SecurityGroup(
+            f"{name}-alb-sg",
+            vpc_id=vpc_id,
+            description="Security group for the application load balancer",
+            ingress=[
+                aws.ec2.SecurityGroupIngressArgs(
+                    protocol="tcp",
+                    from_port=80,
+                    to_port=80,
+                    cidr_blocks=["0.0.0.0/0"],
+                    description="HTTP"
+                ),
+            ],
+            egress=[aws.ec2.SecurityGroupEgressArgs(
+                protocol="-1",
+                from_port=0,
+                to_port=0,
+                cidr_blocks=["0.0.0.0/0"],
+            )],
+            tags={**tags, "Name": f"{name}-alb-sg"},
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+
+        # Launch template built from the same user_data as the single instance
+        self.launch_template = aws.ec2.LaunchTemplate(
+            f"{name}-lt",
+            image_id=resolve_ami_id(config),
+            instance_type=config.instance_type,
+            key_name=config.key_pair_name,
+            iam_instance_profile=aws.ec2.LaunchTemplateIamInstanceProfileArgs(
+                name=iam_instance_profile_name,
+            ),
+            network_interfaces=[aws.ec2.LaunchTemplateNetworkInterfaceArgs(
+                associate_public_ip_address=str(config.associate_public_ip).lower(),
+                security_groups=[security_group_id] if security_group_id else [],
+            )],
+            user_data=pulumi.Output.from_input(user_data).apply(
+                lambda script: base64.b64encode(script.encode()).decode() if script else None
+            ),
+            tag_specifications=[aws.ec2.LaunchTemplateTagSpecificationArgs(
+                resource_type="instance",
+                tags={**tags, "Name": f"{name}-instance"},
+            )],
+            update_default_version=True,
+            tags=tags,
+            opts=pulumi.ResourceOptions(
+                parent=self,
+                ignore_changes=ami_ignore_changes(config, "imageId")
+            )
+        )
+
+        # Target group: nginx on port 80 of each instance, checked on the readiness path
+        self.target_group = aws.lb.TargetGroup(
+            f"{name}-tg",
+            port=80,
+            protocol="HTTP",
+            target_type="instance",
+            vpc_id=vpc_id,
+            deregistration_delay=30,
+            health_check=aws.lb.TargetGroupHealthCheckArgs(
+                path=config.health_check_path,
+                protocol="HTTP",
+                matcher="200",
+                interval=15,
+                timeout=5,
+                healthy_threshold=2,
+                unhealthy_threshold=3,
+            ),
+            tags=tags,
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+
+        self.load_balancer = aws.lb.LoadBalancer(
+            f"{name}-alb",
+            load_balancer_type="application",
+            internal=False,
+            security_groups=[self.alb_security_group.id],
+            subnets=subnet_ids or [],
+            tags={**tags, "Name": f"{name}-alb"},
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+
+        self.listener = aws.lb.Listener(
+            f"{name}-http",
+            load_balancer_arn=self.load_balancer.arn,
+            port=80,
+            protocol="HTTP",
+            default_actions=[aws.lb.ListenerDefaultActionArgs(
+                type="forward",
+                target_group_arn=self.target_group.arn,
+            )],
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+
+        # Instances are replaced when the ALB reports them unhealthy, and rolled
+        # when the launch template changes
+        self.group = aws.autoscaling.Group(
+            f"{name}-asg",
+            min_size=config.asg_min_size,
+            max_size=config.asg_max_size,
+            desired_capacity=config.asg_desired_capacity,
+            vpc_zone_identifiers=subnet_ids or [],
+            launch_template=aws.autoscaling.GroupLaunchTemplateArgs(
+                id=self.launch_template.id,
+                version=self.launch_template.latest_version.apply(str),
+            ),
+            target_group_arns=[self.target_group.arn],
+            health_check_type="ELB",
+            health_check_grace_period=config.asg_health_check_grace_period,
+            default_instance_warmup=config.asg_instance_warmup,
+            instance_refresh=aws.autoscaling.GroupInstanceRefreshArgs(
+                strategy="Rolling",
+                preferences=aws.autoscaling.GroupInstanceRefreshPreferencesArgs(
+                    min_healthy_percentage=50,
+                ),
+            ),
+            tags=[
+                aws.autoscaling.GroupTagArgs(key=key, value=value, propagate_at_launch=True)
+                for key, value in {**tags, "Name": f"{name}-instance"}.items()
+            ],
+            opts=pulumi.ResourceOptions(parent=self, depends_on=[self.listener])
+        )
+
+        # Target tracking: scale out when either CPU or per-instance request rate is above target
+        self.policies = [
+            aws.autoscaling.Policy(
+                f"{name}-cpu-tracking",
+                autoscaling_group_name=self.group.name,
+                policy_type="TargetTrackingScaling",
+                estimated_instance_warmup=config.asg_instance_warmup,
+                target_tracking_configuration=aws.autoscaling.PolicyTargetTrackingConfigurationArgs(
+                    predefined_metric_specification=aws.autoscaling.PolicyTargetTrackingConfigurationPredefinedMetricSpecificationArgs(
+                        predefined_metric_type="ASGAverageCPUUtilization",
+                    ),
+                    target_value=config.asg_cpu_target,
+                ),
+                opts=pulumi.ResourceOptions(parent=self)
+            )
+        ]
+        if config.asg_requests_per_target:
+            self.policies.append(aws.autoscaling.Policy(
+                f"{name}-requests-tracking",
+                autoscaling_group_name=self.group.name,
+                policy_type="TargetTrackingScaling",
+                estimated_instance_warmup=config.asg_instance_warmup,
+                target_tracking_configuration=aws.autoscaling.PolicyTargetTrackingConfigurationArgs(
+                    predefined_metric_specification=aws.autoscaling.PolicyTargetTrackingConfigurationPredefinedMetricSpecificationArgs(
+                        predefined_metric_type="ALBRequestCountPerTarget",
+                        resource_label=pulumi.Output.concat(
+                            self.load_balancer.arn_suffix, "/", self.target_group.arn_suffix
+                        ),
+                    ),
+                    target_value=float(config.asg_requests_per_target),
+                ),
+                opts=pulumi.ResourceOptions(parent=self)
+            ))
+
+        # Register outputs
+        self.register_outputs({
+            "alb_dns_name": self.load_balancer.dns_name,
+            "alb_zone_id": self.load_balancer.zone_id,
+            "asg_name": self.group.name,
+            "ami_id": self.launch_template.image_id,
+            "target_group_arn": self.target_group.arn,
+        })
+
+    @property
+    def dns_name(self):
+        return self.load_balancer.dns_name
+
+    @property
+    def zone_id(self):
+        return self.load_balancer.zone_id
+
+    @property
+    def ami(self):
+        return self.launch_template.image_id
+
+    @property
+    def group_name(self):
+        return self.group.name
@@ -5,6 +5,30 @@ from infrastructure.components.base import BaseComponent
 from infrastructure.config_types.ec2_config import EC2Config
 
 
+def resolve_ami_id(config: EC2Config):
+    """Configured AMI, or the latest Amazon Linux 2023 AMI (as an Output).
+    
+    The output-form invoke runs while the rest of the graph is registered
+    instead of blocking it.
+    """
+    if config.ami_id:
+        return config.ami_id
+    ami = aws.ec2.get_ami_output(
+        most_recent=True,
+        owners=["amazon"],
+        filters=[aws.ec2.GetAmiFilterArgs(
+            name="name",
+            values=["al2023-ami-*-x86_64"],
+        )]
+    )
+    return ami.id
+
+
+def ami_ignore_changes(config: EC2Config, property_name: str):
+    """With pin_ami, keep the AMI a resource was created with when a newer one appears."""
+    return [property_name] if config.pin_ami and not config.ami_id else None
+
+
 class EC2Component(BaseComponent):
     """Reusable EC2 component."""
     
@@ -21,18 +45,7 @@ class EC2Component(BaseComponent):
         super().__init__(name, "custom:components:EC2", opts)
         
         # Get latest Amazon Linux 2023 AMI if not provided
-        if not config.ami_id:
-            ami = aws.ec2.get_ami(
-                most_recent=True,
-                owners=["amazon"],
-                filters=[aws.ec2.GetAmiFilterArgs(
-                    name="name",
-                    values=["al2023-ami-*-x86_64"],
-                )]
-            )
-            ami_id = ami.id
-        else:
-            ami_id = config.ami_id
+        self.ami_id = resolve_ami_id(config)
         
         # Allocate Elastic IP if enabled
         self.elastic_ip = None
@@ -47,7 +60,7 @@ class EC2Component(BaseComponent):
         # Create EC2 instance
         self.instance = aws.ec2.Instance(
             f"{name}-instance",
-            ami=ami_id,
+            ami=self.ami_id,
             instance_type=config.instance_type,
             subnet_id=subnet_id,
             vpc_security_group_ids=[security_group_id] if security_group_id else [],
@@ -56,7 +69,10 @@ class EC2Component(BaseComponent):
             associate_public_ip_address=config.associate_public_ip,
             user_data=user_data,
             tags={**(config.tags or {}), "Name": f"{name}-instance"},
-            opts=pulumi.ResourceOptions(parent=self)
+            opts=pulumi.ResourceOptions(
+                parent=self,
+                ignore_changes=ami_ignore_changes(config, "ami")
+            )
         )
         
         # Associate Elastic IP if created
@@ -73,6 +89,7 @@ class EC2Component(BaseComponent):
             "instance_id": self.instance.id,
             "public_ip": self.instance.public_ip,
             "private_ip": self.instance.private_ip,
+            "ami_id": self.instance.ami,
         }
         
         if self.elastic_ip:
@@ -91,4 +108,9 @@ class EC2Component(BaseComponent):
     @property
     def private_ip(self):
         return self.instance.private_ip
+    
+    @property
+    def ami(self):
+        """AMI the instance actually runs (differs from the latest one when pinned)."""
+        return self.instance.ami
 
@@ -8,7 +8,7 @@ from infrastructure.config_types.iam_config import IAMConfig
 class IAMComponent(BaseComponent):
     """Reusable IAM component for EC2 instance roles."""
     
-    def __init__(self, name: str, config: IAMConfig, s3_bucket_arns=None, rds_instance_arn=None, ecr_repository_arn=None, opts=None):
+    def __init__(self, name: str, config: IAMConfig, s3_bucket_arns=None, rds_instance_arn=None, ecr_repository_arn=None, metrics_namespace=None, opts=None):
         super().__init__(name, "custom:components:IAM", opts)
         
         # Use provided parameters or fall back to config
@@ -52,6 +52,7 @@ class IAMComponent(BaseComponent):
                             "s3:PutObject",
                             "s3:DeleteObject",
                             "s3:ListBucket",
+                            "s3:AbortMultipartUpload",
                         ],
                         "Resource": s3_resources,
                     })
@@ -103,6 +104,20 @@ class IAMComponent(BaseComponent):
                 ],
             })
             
+            # CloudWatch custom metrics (e.g. boot-to-healthy time), limited to one namespace;
+            # PutMetricData has no resource-level permissions
+            if metrics_namespace:
+                policy_statements.append({
+                    "Effect": "Allow",
+                    "Action": [
+                        "cloudwatch:PutMetricData",
+                    ],
+                    "Resource": ["*"],
+                    "Condition": {
+                        "StringEquals": {"cloudwatch:namespace": metrics_namespace},
+                    },
+                })
+            
             # Build policy document
             policy_doc = {
                 "Version": "2012-10-17",
@@ -112,7 +127,10 @@ class IAMComponent(BaseComponent):
         
         # Resolve all ARNs and build policy
         if arn_outputs:
-            policy_json = pulumi.Output.all(*arn_outputs).apply(build_policy_document)
+            # Output.all resolves to one list; unpack it into the positional ARNs
+            policy_json = pulumi.Output.all(*arn_outputs).apply(
+                lambda resolved_arns: build_policy_document(*resolved_arns)
+            )
         else:
             # No policy statements needed
             policy_json = None
@@ -0,0 +1,165 @@
+"""Image Builder component - golden AMI with the instance host setup baked in."""
+import hashlib
+import json
+
+import pulumi
+import pulumi_aws as aws
+from infrastructure.components.base import BaseComponent
+from infrastructure.config_types.image_builder_config import ImageBuilderConfig
+from infrastructure.user_data import host_setup_script
+
+
+def content_version(*parts: str) -> str:
+    """Semantic version derived from content.
+
+    Image Builder components and recipes are immutable per version, so a
+    changed document is created under a new version instead of updated.
+    """
+    digest = hashlib.sha256("\n".join(parts).encode()).hexdigest()
+    return f"1.0.{int(digest[:6], 16)}"
+
+
+class GoldenAmiComponent(BaseComponent):
+    """EC2 Image Builder image with Docker, nginx, the AWS CLI and the SSM agent."""
+
+    def __init__(self, name: str, config: ImageBuilderConfig, subnet_id=None, security_group_id=None, opts=None):
+        super().__init__(name, "custom:components:GoldenAmi", opts)
+        tags = config.tags or {}
+        aws_config = pulumi.Config("aws")
+        aws_region = aws_config.get("region") or "us-east-1"
+
+        # Build document: the same host setup user_data runs on a stock AMI
+        # (JSON is valid YAML, which Image Builder expects)
+        document = json.dumps({
+            "name": f"{name}-host-setup",
+            "description": "Docker, nginx, AWS CLI and SSM agent for the FastAPI host",
+            "schemaVersion": 1.0,
+            "phases": [
+                {
+                    "name": "build",
+                    "steps": [{
+                        "name": "HostSetup",
+                        "action": "ExecuteBash",
+                        "inputs": {"commands": [host_setup_script(config.prepull_images or ())]},
+                    }],
+                },
+                {
+                    "name": "validate",
+                    "steps": [{
+                        "name": "CheckServices",
+                        "action": "ExecuteBash",
+                        "inputs": {"commands": [
+                            "systemctl is-enabled docker nginx amazon-ssm-agent",
+                            "nginx -v",
+                            "aws --version",
+                        ]},
+                    }],
+                },
+            ],
+        }, indent=2)
+
+        # Role for the temporary build instance
+        self.role = aws.iam.Role(
+            f"{name}-role",
+            assume_role_policy=json.dumps({
+                "Version": "2012-10-17",
+                "Statement": [{
+                    "Effect": "Allow",
+                    "Principal": {"Service": "ec2.amazonaws.com"},
+                    "Action": "sts:AssumeRole",
+                }],
+            }),
+            tags=tags,
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+        attachments = [
+            aws.iam.RolePolicyAttachment(
+                f"{name}-{suffix}-policy",
+                role=self.role.name,
+                policy_arn=f"arn:aws:iam::aws:policy/{policy}",
+                opts=pulumi.ResourceOptions(parent=self)
+            )
+            for suffix, policy in (
+                ("image-builder", "EC2InstanceProfileForImageBuilder"),
+                ("ssm", "AmazonSSMManagedInstanceCore"),
+            )
+        ]
+        self.instance_profile = aws.iam.InstanceProfile(
+            f"{name}-instance-profile",
+            role=self.role.name,
+            tags=tags,
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+
+        self.component = aws.imagebuilder.Component(
+            f"{name}-host-setup",
+            name=f"{name}-host-setup",
+            platform="Linux",
+            version=content_version(document),
+            data=document,
+            tags=tags,
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+
+        # Parent is the newest Amazon-managed image at build time ("x.x.x")
+        self.recipe = aws.imagebuilder.ImageRecipe(
+            f"{name}-recipe",
+            name=f"{name}-recipe",
+            parent_image=f"arn:aws:imagebuilder:{aws_region}:aws:image/{config.parent_image}/x.x.x",
+            version=content_version(document, config.parent_image),
+            components=[aws.imagebuilder.ImageRecipeComponentArgs(
+                component_arn=self.component.arn,
+            )],
+            tags=tags,
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+
+        self.infrastructure = aws.imagebuilder.InfrastructureConfiguration(
+            f"{name}-infrastructure",
+            name=f"{name}-infrastructure",
+            instance_profile_name=self.instance_profile.name,
+            instance_types=[config.instance_type],
+            subnet_id=subnet_id,
+            security_group_ids=[security_group_id] if security_group_id else None,
+            terminate_instance_on_failure=True,
+            tags=tags,
+            opts=pulumi.ResourceOptions(parent=self, depends_on=attachments)
+        )
+
+        self.distribution = aws.imagebuilder.DistributionConfiguration(
+            f"{name}-distribution",
+            name=f"{name}-distribution",
+            distributions=[aws.imagebuilder.DistributionConfigurationDistributionArgs(
+                region=aws_region,
+                ami_distribution_configuration=aws.imagebuilder.DistributionConfigurationDistributionAmiDistributionConfigurationArgs(
+                    name=f"{name}-{{{{ imagebuilder:buildDate }}}}",
+                    ami_tags={**tags, "Name": name},
+                ),
+            )],
+            tags=tags,
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+
+        # Built during `pulumi up` (typically 20-40 minutes), and rebuilt only
+        # when the recipe version changes
+        self.image = aws.imagebuilder.Image(
+            f"{name}-image",
+            image_recipe_arn=self.recipe.arn,
+            infrastructure_configuration_arn=self.infrastructure.arn,
+            distribution_configuration_arn=self.distribution.arn,
+            tags=tags,
+            opts=pulumi.ResourceOptions(
+                parent=self,
+                custom_timeouts=pulumi.CustomTimeouts(create="90m")
+            )
+        )
+        self.ami_id = self.image.output_resources.apply(
+            lambda resources: resources[0].amis[0].image
+        )
+
+        # Register outputs
+        self.register_outputs({
+            "ami_id": self.ami_id,
+            "image_arn": self.image.arn,
+            "recipe_arn": self.recipe.arn,
+        })
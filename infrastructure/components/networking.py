@@ -11,12 +11,13 @@ class NetworkingComponent(BaseComponent):
     def __init__(self, name: str, config: NetworkingConfig, opts=None):
         super().__init__(name, "custom:components:Networking", opts)
         
-        # Get availability zones
+        # Get availability zones: configured ones, or the first az_count from an
+        # output-form lookup that does not block building the rest of the graph
         if config.availability_zones:
             azs = config.availability_zones
         else:
-            azs_data = aws.get_availability_zones(state="available")
-            azs = azs_data.names[:2]  # Use first 2 AZs
+            az_names = aws.get_availability_zones_output(state="available").names
+            azs = [az_names.apply(lambda names, i=i: names[i]) for i in range(config.az_count)]
         
         # Create VPC
         self.vpc = aws.ec2.Vpc(
@@ -0,0 +1,240 @@
+"""Image rollout component - EventBridge rules that deploy images via SSM Run Command."""
+import json
+
+import pulumi
+import pulumi_aws as aws
+from infrastructure.components.base import BaseComponent
+from infrastructure.config_types.rollout_config import RolloutConfig
+from infrastructure.user_data import DEPLOY_COMMAND
+
+
+class ImageRolloutComponent(BaseComponent):
+    """Runs the instances' deploy agent when the image tag parameter or a tracked ECR tag changes."""
+
+    def __init__(
+        self,
+        name: str,
+        config: RolloutConfig,
+        image_tag_parameter_name: str,
+        instance_tags: dict,
+        repository_name=None,
+        opts=None
+    ):
+        super().__init__(name, "custom:components:ImageRollout", opts)
+        tags = config.tags or {}
+
+        # Run Command document: the deploy agent with an exact tag, or with the
+        # tag in the parameter when ImageTag is empty
+        self.document = aws.ssm.Document(
+            f"{name}-deploy",
+            document_type="Command",
+            document_format="JSON",
+            content=json.dumps({
+                "schemaVersion": "2.2",
+                "description": f"Deploy a FastAPI image tag (empty: the tag in {image_tag_parameter_name})",
+                "parameters": {
+                    "ImageTag": {
+                        "type": "String",
+                        "default": "",
+                        "allowedPattern": "^[A-Za-z0-9_.-]{0,128}$",
+                    },
+                },
+                "mainSteps": [{
+                    "action": "aws:runShellScript",
+                    "name": "Deploy",
+                    "inputs": {
+                        "runCommand": [f"{DEPLOY_COMMAND} '{{{{ ImageTag }}}}'"],
+                        "timeoutSeconds": str(config.timeout_seconds),
+                    },
+                }],
+            }, indent=2),
+            tags=tags,
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+
+        # Pushes of the tracked ECR tag are recorded in the parameter by an
+        # Automation document, so the parameter rule below runs the rollout and
+        # instances launched later boot the same tag
+        self.record_document = None
+        if config.ecr_tag and repository_name is not None:
+            self.record_document = aws.ssm.Document(
+                f"{name}-record-tag",
+                document_type="Automation",
+                document_format="JSON",
+                content=json.dumps({
+                    "schemaVersion": "0.3",
+                    "description": f"Record a pushed FastAPI image tag in {image_tag_parameter_name}",
+                    "parameters": {
+                        "ImageTag": {
+                            "type": "String",
+                            "allowedPattern": "^[A-Za-z0-9_.-]{1,128}$",
+                        },
+                    },
+                    "mainSteps": [{
+                        "action": "aws:executeAwsApi",
+                        "name": "RecordImageTag",
+                        "inputs": {
+                            "Service": "ssm",
+                            "Api": "PutParameter",
+                            "Name": image_tag_parameter_name,
+                            "Value": "{{ ImageTag }}",
+                            "Type": "String",
+                            "Overwrite": True,
+                        },
+                    }],
+                }, indent=2),
+                tags=tags,
+                opts=pulumi.ResourceOptions(parent=self)
+            )
+
+        # EventBridge may send the deploy document to the app's instances only,
+        # and (with no assume role in the Automation document) write the tag
+        self.role = aws.iam.Role(
+            f"{name}-events-role",
+            assume_role_policy=json.dumps({
+                "Version": "2012-10-17",
+                "Statement": [{
+                    "Effect": "Allow",
+                    "Principal": {"Service": "events.amazonaws.com"},
+                    "Action": "sts:AssumeRole",
+                }],
+            }),
+            tags=tags,
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+        self.role_policy = aws.iam.RolePolicy(
+            f"{name}-events-policy",
+            role=self.role.id,
+            policy=pulumi.Output.all(
+                self.document.arn,
+                self.record_document.arn if self.record_document else None,
+                self.record_document.name if self.record_document else None,
+            ).apply(lambda args: json.dumps({
+                "Version": "2012-10-17",
+                "Statement": self._policy_statements(
+                    *args, image_tag_parameter_name, instance_tags
+                ),
+            })),
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+
+        # Instances carrying all of instance_tags
+        run_command_targets = [
+            aws.cloudwatch.EventTargetRunCommandTargetArgs(key=f"tag:{key}", values=[value])
+            for key, value in instance_tags.items()
+        ]
+
+        # CI writes the tag it pushed; the parameter change event carries no value,
+        # so the agent reads the parameter itself
+        self.parameter_rule = aws.cloudwatch.EventRule(
+            f"{name}-image-tag-changed",
+            description=f"Deploy when {image_tag_parameter_name} changes",
+            event_pattern=json.dumps({
+                "source": ["aws.ssm"],
+                "detail-type": ["Parameter Store Change"],
+                "detail": {
+                    "name": [image_tag_parameter_name],
+                    "operation": ["Create", "Update"],
+                },
+            }),
+            tags=tags,
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+        self.targets = [aws.cloudwatch.EventTarget(
+            f"{name}-image-tag-changed-target",
+            rule=self.parameter_rule.name,
+            arn=self.document.arn,
+            role_arn=self.role.arn,
+            input=json.dumps({"ImageTag": [""]}),
+            run_command_targets=run_command_targets,
+            opts=pulumi.ResourceOptions(parent=self, depends_on=[self.role_policy])
+        )]
+
+        # Optional: roll out every push of a tracked tag (e.g. "test") by recording
+        # it in the parameter
+        self.ecr_rule = None
+        if config.ecr_tag and repository_name is not None:
+            self.ecr_rule = aws.cloudwatch.EventRule(
+                f"{name}-ecr-push",
+                description=f"Deploy pushes of the {config.ecr_tag} tag",
+                event_pattern=pulumi.Output.from_input(repository_name).apply(
+                    lambda repository: json.dumps({
+                        "source": ["aws.ecr"],
+                        "detail-type": ["ECR Image Action"],
+                        "detail": {
+                            "action-type": ["PUSH"],
+                            "result": ["SUCCESS"],
+                            "repository-name": [repository],
+                            "image-tag": [config.ecr_tag],
+                        },
+                    })
+                ),
+                tags=tags,
+                opts=pulumi.ResourceOptions(parent=self)
+            )
+            self.targets.append(aws.cloudwatch.EventTarget(
+                f"{name}-ecr-push-target",
+                rule=self.ecr_rule.name,
+                arn=pulumi.Output.all(self.record_document.arn, self.record_document.name).apply(
+                    lambda args: f"{self._automation_definition_arn(*args)}:$DEFAULT"
+                ),
+                role_arn=self.role.arn,
+                input_transformer=aws.cloudwatch.EventTargetInputTransformerArgs(
+                    input_paths={"tag": "$.detail.image-tag"},
+                    input_template='{"ImageTag": ["<tag>"]}',
+                ),
+                opts=pulumi.ResourceOptions(parent=self, depends_on=[self.role_policy])
+            ))
+
+        # Register outputs
+        self.register_outputs({
+            "document_name": self.document.name,
+            "parameter_rule_arn": self.parameter_rule.arn,
+        })
+
+    @staticmethod
+    def _automation_definition_arn(document_arn: str, document_name: str) -> str:
+        """ARN EventBridge uses to start an Automation document (without version)."""
+        prefix = ":".join(document_arn.split(":")[:5])  # arn:aws:ssm:<region>:<account>
+        return f"{prefix}:automation-definition/{document_name}"
+
+    @classmethod
+    def _policy_statements(cls, document_arn, record_document_arn, record_document_name,
+                           image_tag_parameter_name, instance_tags) -> list:
+        """Statements of the EventBridge role policy."""
+        statements = [
+            {
+                "Effect": "Allow",
+                "Action": ["ssm:SendCommand"],
+                "Resource": [document_arn],
+            },
+            {
+                "Effect": "Allow",
+                "Action": ["ssm:SendCommand"],
+                "Resource": ["arn:aws:ec2:*:*:instance/*"],
+                "Condition": {
+                    "StringEquals": {
+                        f"ssm:resourceTag/{key}": value for key, value in instance_tags.items()
+                    },
+                },
+            },
+        ]
+        if record_document_arn:
+            definition_arn = cls._automation_definition_arn(record_document_arn, record_document_name)
+            statements += [
+                {
+                    "Effect": "Allow",
+                    "Action": ["ssm:StartAutomationExecution"],
+                    "Resource": [f"{definition_arn}:*"],
+                },
+                {
+                    "Effect": "Allow",
+                    "Action": ["ssm:PutParameter"],
+                    "Resource": [f"arn:aws:ssm:*:*:parameter{image_tag_parameter_name}"],
+                },
+            ]
+        return statements
+
+    @property
+    def document_name(self):
+        return self.document.name
@@ -35,6 +35,21 @@ class Route53Component(BaseComponent):
             opts=pulumi.ResourceOptions(parent=self)
         )
     
+    def create_alias_record(self, record_name: str, dns_name, alias_zone_id):
+        """Create an A alias record pointing to an AWS endpoint (e.g. a load balancer)."""
+        return aws.route53.Record(
+            f"{self.name}-alias-{record_name}",
+            zone_id=self.hosted_zone.zone_id,
+            name=record_name,
+            type="A",
+            aliases=[aws.route53.RecordAliasArgs(
+                name=dns_name,
+                zone_id=alias_zone_id,
+                evaluate_target_health=True,
+            )],
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+    
     @property
     def zone_id(self):
         return self.hosted_zone.zone_id
@@ -6,6 +6,8 @@ from infrastructure.config_types.rds_config import RDSConfig
 from infrastructure.config_types.ec2_config import EC2Config
 from infrastructure.config_types.iam_config import IAMConfig
 from infrastructure.config_types.ecr_config import ECRConfig
+from infrastructure.config_types.image_builder_config import ImageBuilderConfig
+from infrastructure.config_types.rollout_config import RolloutConfig
 
 
 def get_config():
@@ -27,6 +29,8 @@ def get_config():
     networking_config = NetworkingConfig(
         vpc_cidr=config.get("vpcCidr") or "10.0.0.0/16",
         enable_nat_gateway=config.get_bool("enableNatGateway") if config.get("enableNatGateway") else True,
+        availability_zones=config.get_object("availabilityZones"),
+        az_count=config.get_int("azCount") or 2,
         tags=base_tags,
     )
     
@@ -55,8 +59,21 @@ def get_config():
     # EC2 config
     ec2_config = EC2Config(
         instance_type=config.get("ec2InstanceType") or "t3.micro",
+        ami_id=config.get("ec2AmiId") or None,
+        pin_ami=config.get_bool("ec2PinAmi") or False,
         associate_public_ip=config.get_bool("ec2AssociatePublicIp") if config.get("ec2AssociatePublicIp") else True,
         enable_elastic_ip=config.get_bool("ec2EnableElasticIp") if config.get("ec2EnableElasticIp") else True,
+        app_workers=config.get_int("appWorkers") or 0,
+        app_unix_socket=config.get_bool("appUnixSocket") or False,
+        autoscaling_enabled=config.get_bool("ec2Autoscaling") or False,
+        asg_min_size=config.get_int("asgMinSize") or 2,
+        asg_max_size=config.get_int("asgMaxSize") or 4,
+        asg_desired_capacity=config.get_int("asgDesiredCapacity"),
+        asg_cpu_target=config.get_float("asgCpuTarget") or 60.0,
+        asg_requests_per_target=config.get_int("asgRequestsPerTarget") if config.get("asgRequestsPerTarget") else 1000,
+        asg_instance_warmup=config.get_int("asgInstanceWarmup") or 300,
+        asg_health_check_grace_period=config.get_int("asgHealthCheckGracePeriod") or 600,
+        health_check_path=config.get("healthCheckPath") or "/ready",
         tags=base_tags,
     )
     
@@ -76,6 +93,22 @@ def get_config():
         tags=base_tags,
     )
     
+    # Golden AMI config
+    image_builder_config = ImageBuilderConfig(
+        enabled=config.get_bool("goldenAmi") or False,
+        instance_type=config.get("goldenAmiInstanceType") or "t3.small",
+        prepull_images=config.get_object("goldenAmiPrepullImages") or ["python:3.11-slim"],  # Dockerfile base
+        tags=base_tags,
+    )
+    
+    # Image rollout config
+    rollout_config = RolloutConfig(
+        enabled=config.get_bool("eventRollout") if config.get("eventRollout") else True,
+        ecr_tag=config.get("rolloutEcrTag") or None,
+        timeout_seconds=config.get_int("rolloutTimeoutSeconds") or 600,
+        tags=base_tags,
+    )
+    
     return {
         "environment": environment,
         "networking": networking_config,
@@ -84,6 +117,8 @@ def get_config():
         "ec2": ec2_config,
         "iam": iam_config,
         "ecr": ecr_config,
+        "image_builder": image_builder_config,
+        "rollout": rollout_config,
         "tags": base_tags,
     }
 
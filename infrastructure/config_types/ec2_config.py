@@ -7,9 +7,22 @@ from typing import Optional
 class EC2Config:
     """Configuration for EC2 component."""
     instance_type: str = "t3.micro"
-    ami_id: Optional[str] = None
+    ami_id: Optional[str] = None  # Pinned AMI; None resolves the latest Amazon Linux 2023
+    pin_ami: bool = False  # Keep the AMI resources were created with instead of replacing them
     key_pair_name: Optional[str] = None
     associate_public_ip: bool = True
     enable_elastic_ip: bool = True
+    app_workers: int = 0  # API worker processes per instance (0 = derive from vCPUs)
+    app_unix_socket: bool = False  # Proxy nginx -> app over a Unix socket instead of TCP
+    # Auto Scaling Group behind an ALB instead of a single instance
+    autoscaling_enabled: bool = False
+    asg_min_size: int = 2
+    asg_max_size: int = 4
+    asg_desired_capacity: Optional[int] = None  # None lets the scaling policies decide
+    asg_cpu_target: float = 60.0  # Average CPU % tracked by the scaling policy
+    asg_requests_per_target: Optional[int] = 1000  # ALB requests per instance per minute
+    asg_instance_warmup: int = 300  # Seconds before a new instance counts in the metrics
+    asg_health_check_grace_period: int = 600  # First boot pulls the image (can take minutes)
+    health_check_path: str = "/ready"
     tags: Optional[dict] = None
 
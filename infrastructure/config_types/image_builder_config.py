@@ -0,0 +1,13 @@
+"""Image Builder configuration types."""
+from dataclasses import dataclass
+from typing import Optional, List
+
+
+@dataclass
+class ImageBuilderConfig:
+    """Configuration for the golden AMI component."""
+    enabled: bool = False
+    instance_type: str = "t3.small"  # Build instance
+    parent_image: str = "amazon-linux-2023-x86"  # Image Builder managed image, latest version
+    prepull_images: Optional[List[str]] = None  # Docker images cached in the AMI
+    tags: Optional[dict] = None
@@ -7,7 +7,8 @@ from typing import Optional, List
 class NetworkingConfig:
     """Configuration for networking component."""
     vpc_cidr: str = "10.0.0.0/16"
-    availability_zones: Optional[List[str]] = None
+    availability_zones: Optional[List[str]] = None  # None looks them up
+    az_count: int = 2  # Zones used when looking them up
     enable_nat_gateway: bool = True
     tags: Optional[dict] = None
 
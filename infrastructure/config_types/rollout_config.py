@@ -0,0 +1,12 @@
+"""Image rollout configuration types."""
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class RolloutConfig:
+    """Configuration for the event-driven image rollout component."""
+    enabled: bool = True
+    ecr_tag: Optional[str] = None  # Also roll out on every push of this ECR tag
+    timeout_seconds: int = 600  # Per-instance deploy command timeout
+    tags: Optional[dict] = None
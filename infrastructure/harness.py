@@ -0,0 +1,418 @@
+"""Offline check and timing harness for the Pulumi program.
+
+Runs ``infrastructure/__main__.py`` under ``pulumi.runtime.set_mocks``, so it
+needs no AWS credentials, state backend or Pulumi CLI. Each scenario (a set of
+stack config values) runs in a fresh interpreter. For each one the harness
+reports how long building and settling the resource graph took and how many
+resources of each type were registered. It also checks the graph and the
+generated IAM policy::
+
+    python -m infrastructure.harness
+    python -m infrastructure.harness --scenario autoscaling --verbose
+    python -m infrastructure.harness --budget-ms 3000   # exits 1 over budget
+
+Run from the repository root. Exits 1 if any scenario fails a check.
+"""
+import argparse
+import base64
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Dict, List
+
+PROJECT = "pulumi-provisioning"
+REGION = "us-east-1"
+ACCOUNT_ID = "123456789012"
+MOCK_AMI_ID = "ami-0harness0latest0"
+MOCK_GOLDEN_AMI_ID = "ami-0harness0golden0"
+MOCK_AZS = ["us-east-1a", "us-east-1b", "us-east-1c"]
+RESULT_PREFIX = "HARNESS_RESULT "
+
+# Stack config shared by every scenario (the keys get_config() requires)
+BASE_CONFIG = {
+    "environment": "harness",
+    "projectName": "pulumi-provisioning-harness",
+    "s3BucketName": "pulumi-provisioning-harness-bucket",
+    "dbName": "harness_db",
+    "dbPassword": "harness-password",
+    "ecrRepositoryName": "pulumi-provisioning-harness",
+}
+
+SCENARIOS: Dict[str, dict] = {
+    "instance": {},
+    "autoscaling": {"ec2Autoscaling": "true", "rolloutEcrTag": "test"},
+    "pinned": {
+        "eventRollout": "false",
+        "ec2AmiId": "ami-0harness0pinned0",
+        "ec2PinAmi": "true",
+        "availabilityZones": json.dumps(MOCK_AZS[:2]),
+    },
+    "domain": {"domainName": "harness.example.com"},
+    "golden": {"goldenAmi": "true", "ec2Autoscaling": "true"},
+}
+
+# Resource types every stack must contain
+REQUIRED_TYPES = (
+    "aws:ec2/vpc:Vpc",
+    "aws:s3/bucket:Bucket",
+    "aws:rds/instance:Instance",
+    "aws:ecr/repository:Repository",
+    "aws:iam/role:Role",
+    "aws:iam/rolePolicy:RolePolicy",
+    "aws:iam/instanceProfile:InstanceProfile",
+    "aws:ssm/parameter:Parameter",
+)
+# Actions that may be granted on every resource ("Resource": "*")
+WILDCARD_ACTIONS = {"ecr:GetAuthorizationToken", "cloudwatch:PutMetricData"}
+
+INVOKE_RESULTS = {
+    "aws:ec2/getAmi:getAmi": {"id": MOCK_AMI_ID, "imageId": MOCK_AMI_ID},
+    "aws:index/getAvailabilityZones:getAvailabilityZones": {
+        "id": REGION,
+        "names": MOCK_AZS,
+        "zoneIds": [f"use1-az{i + 1}" for i in range(len(MOCK_AZS))],
+    },
+}
+
+
+def _mock_outputs(typ: str, name: str, inputs: dict) -> dict:
+    """Computed outputs the program reads back (ARNs, endpoints, names).
+
+    An ``id`` entry becomes the resource's physical id.
+    """
+    service = typ.split(":")[1].split("/")[0]
+    outputs = {
+        "arn": f"arn:aws:{service}:{REGION}:{ACCOUNT_ID}:{name}",
+        "name": inputs.get("name", name),
+    }
+    if typ == "aws:s3/bucket:Bucket":
+        outputs["id"] = inputs.get("bucket", name)
+        outputs["arn"] = f"arn:aws:s3:::{outputs['id']}"
+    elif typ == "aws:ecr/repository:Repository":
+        outputs["registryId"] = ACCOUNT_ID
+    elif typ == "aws:rds/instance:Instance":
+        outputs["address"] = f"{name}.harness.{REGION}.rds.amazonaws.com"
+        outputs["endpoint"] = f"{outputs['address']}:5432"
+    elif typ == "aws:ec2/instance:Instance":
+        outputs["publicIp"] = "203.0.113.10"
+        outputs["privateIp"] = "10.0.1.10"
+    elif typ == "aws:ec2/launchTemplate:LaunchTemplate":
+        outputs["latestVersion"] = 1
+    elif typ in ("aws:lb/loadBalancer:LoadBalancer", "aws:lb/targetGroup:TargetGroup"):
+        outputs["arnSuffix"] = f"app/{name}/0123456789abcdef"
+        outputs["dnsName"] = f"{name}.{REGION}.elb.amazonaws.com"
+        outputs["zoneId"] = "Z35SXDOTRQ7X7K"
+    elif typ == "aws:route53/zone:Zone":
+        outputs["zoneId"] = "Z0HARNESS"
+        outputs["nameServers"] = ["ns-1.awsdns-00.com"]
+    elif typ == "aws:route53/record:Record":
+        outputs["fqdn"] = inputs.get("name", name)
+    elif typ == "aws:imagebuilder/image:Image":
+        outputs["outputResources"] = [{"amis": [{"image": MOCK_GOLDEN_AMI_ID, "region": REGION}]}]
+    elif typ == "aws:acm/certificate:Certificate":
+        domain = inputs.get("domainName", name)
+        outputs["domainValidationOptions"] = [{
+            "domainName": domain,
+            "resourceRecordName": f"_harness.{domain}.",
+            "resourceRecordType": "CNAME",
+            "resourceRecordValue": "_harness.acm-validations.aws.",
+        }]
+    return outputs
+
+
+def run_program(scenario: str) -> dict:
+    """Build the program for one scenario under mocks. Call once per interpreter."""
+    import pulumi
+
+    class RecordingMocks(pulumi.runtime.Mocks):
+        def __init__(self):
+            self.resources: List[dict] = []
+            self.invokes: List[str] = []
+
+        def new_resource(self, args: pulumi.runtime.MockResourceArgs):
+            outputs = _mock_outputs(args.typ, args.name, args.inputs)
+            resource_id = outputs.pop("id", f"{args.name}-id")
+            self.resources.append({
+                "type": args.typ, "name": args.name, "inputs": args.inputs, "outputs": outputs,
+            })
+            return resource_id, {**args.inputs, **outputs}
+
+        def call(self, args: pulumi.runtime.MockCallArgs):
+            self.invokes.append(args.token)
+            return INVOKE_RESULTS.get(args.token, {})
+
+    mocks = RecordingMocks()
+    pulumi.runtime.set_mocks(mocks, project=PROJECT, stack=scenario, preview=False)
+    values = {**BASE_CONFIG, **SCENARIOS[scenario]}
+    pulumi.runtime.set_all_config(
+        {"aws:region": REGION, **{f"{PROJECT}:{key}": value for key, value in values.items()}},
+        [f"{PROJECT}:dbPassword"],
+    )
+
+    timings = {}
+
+    @pulumi.runtime.test
+    def program():
+        started = time.perf_counter()
+        import infrastructure.__main__  # noqa: F401  (registers every resource)
+        timings["construct_ms"] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    error = None
+    try:
+        program()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    timings["settle_ms"] = (time.perf_counter() - started) * 1000
+
+    return {
+        "scenario": scenario,
+        "construct_ms": round(timings.get("construct_ms", 0.0), 1),
+        "settle_ms": round(timings["settle_ms"], 1),
+        "resources": len(mocks.resources),
+        "types": dict(Counter(resource["type"] for resource in mocks.resources)),
+        "invokes": mocks.invokes,
+        "failures": [error] if error else check(scenario, mocks.resources, mocks.invokes),
+    }
+
+
+# Checks
+
+def _of_type(resources: List[dict], typ: str) -> List[dict]:
+    return [resource for resource in resources if resource["type"] == typ]
+
+
+def check_policy(resources: List[dict]) -> List[str]:
+    """Validate the instance role's inline policy JSON against the stack's resources."""
+    failures = []
+    # The instance role is the IAM component's; other components have their own roles
+    policies = [policy for policy in _of_type(resources, "aws:iam/rolePolicy:RolePolicy")
+                if policy["name"].endswith("-iam-policy")]
+    if len(policies) != 1:
+        return [f"expected 1 inline role policy, found {len(policies)}"]
+    try:
+        document = json.loads(policies[0]["inputs"]["policy"])
+    except (KeyError, TypeError, ValueError) as e:
+        return [f"inline role policy is not valid JSON: {e}"]
+
+    if document.get("Version") != "2012-10-17":
+        failures.append(f"policy Version is {document.get('Version')!r}")
+    statements = document.get("Statement") or []
+    if not statements:
+        failures.append("policy has no statements")
+    granted = {}
+    for index, statement in enumerate(statements):
+        missing = [key for key in ("Effect", "Action", "Resource") if key not in statement]
+        if missing:
+            failures.append(f"statement {index} is missing {', '.join(missing)}")
+            continue
+        actions = statement["Action"] if isinstance(statement["Action"], list) else [statement["Action"]]
+        targets = statement["Resource"] if isinstance(statement["Resource"], list) else [statement["Resource"]]
+        for action in actions:
+            granted.setdefault(action, set()).update(targets)
+            if "*" in targets and action not in WILDCARD_ACTIONS:
+                failures.append(f"{action} is granted on every resource")
+
+    for bucket in _of_type(resources, "aws:s3/bucket:Bucket"):
+        arn = bucket["outputs"]["arn"]
+        if arn not in granted.get("s3:ListBucket", set()):
+            failures.append(f"s3:ListBucket is not granted on {arn}")
+        for action in ("s3:GetObject", "s3:PutObject", "s3:AbortMultipartUpload"):
+            if f"{arn}/*" not in granted.get(action, set()):
+                failures.append(f"{action} is not granted on {arn}/*")
+    for repository in _of_type(resources, "aws:ecr/repository:Repository"):
+        if repository["outputs"]["arn"] not in granted.get("ecr:BatchGetImage", set()):
+            failures.append("ecr:BatchGetImage is not granted on the repository")
+    if not any(target.startswith("arn:aws:ssm:") for target in granted.get("ssm:GetParameter", set())):
+        failures.append("ssm:GetParameter is not granted on the parameter path")
+    for statement in statements:
+        if "cloudwatch:PutMetricData" in statement.get("Action", []) \
+                and "cloudwatch:namespace" not in json.dumps(statement.get("Condition", {})):
+            failures.append("cloudwatch:PutMetricData is not limited to a namespace")
+
+    for role in [role for role in _of_type(resources, "aws:iam/role:Role") if role["name"].endswith("-iam-role")]:
+        trust = json.loads(role["inputs"]["assumeRolePolicy"])
+        principals = [statement.get("Principal", {}).get("Service") for statement in trust["Statement"]]
+        if principals != ["ec2.amazonaws.com"]:
+            failures.append(f"role {role['name']} trusts {principals}, expected EC2 only")
+    return failures
+
+
+def check_rollout(values: dict, resources: List[dict]) -> List[str]:
+    """Rollout rules fire on the stack's image tag parameter and target its instances."""
+    rules = _of_type(resources, "aws:cloudwatch/eventRule:EventRule")
+    targets = _of_type(resources, "aws:cloudwatch/eventTarget:EventTarget")
+    if values.get("eventRollout") == "false":
+        return ["rollout disabled but event rules were created"] if rules else []
+
+    failures = []
+    expected = 2 if values.get("rolloutEcrTag") else 1
+    if len(rules) != expected or len(targets) != expected:
+        failures.append(f"expected {expected} rollout rules and targets, found {len(rules)} and {len(targets)}")
+    patterns = [json.loads(rule["inputs"]["eventPattern"]) for rule in rules]
+    parameter = f"/pulumi/{values['scenario']}/image_tag"
+    if not any(pattern["detail"].get("name") == [parameter] for pattern in patterns):
+        failures.append(f"no rollout rule for changes to {parameter}")
+    if values.get("rolloutEcrTag") and not any(
+            pattern["detail"].get("image-tag") == [values["rolloutEcrTag"]] for pattern in patterns):
+        failures.append(f"no rollout rule for pushes of {values['rolloutEcrTag']}")
+    for target in targets:
+        if target["name"].endswith("-ecr-push-target"):
+            # Pushes only record the tag; the parameter rule deploys it
+            if target["inputs"].get("runCommandTargets") or "automation-definition/" not in target["inputs"]["arn"]:
+                failures.append(f"{target['name']} does not record the pushed tag in {parameter}")
+            continue
+        keys = sorted(run["key"] for run in target["inputs"].get("runCommandTargets", []))
+        if keys != ["tag:Environment", "tag:Project"]:
+            failures.append(f"{target['name']} targets {keys}, expected the stack's instance tags")
+
+    documents = _of_type(resources, "aws:ssm/document:Document")
+    by_type = Counter(document["inputs"]["documentType"] for document in documents)
+    if by_type["Command"] != 1:
+        failures.append(f"expected 1 deploy document, found {by_type['Command']}")
+    if by_type["Automation"] != (1 if values.get("rolloutEcrTag") else 0):
+        failures.append(f"expected an Automation document only with rolloutEcrTag, found {by_type['Automation']}")
+    for document in documents:
+        if "allowedPattern" not in document["inputs"]["content"]:
+            failures.append(f"{document['name']} does not constrain ImageTag")
+        elif document["inputs"]["documentType"] == "Automation" and parameter not in document["inputs"]["content"]:
+            failures.append(f"{document['name']} does not write {parameter}")
+    return failures
+
+
+def _user_data(resources: List[dict]) -> List[str]:
+    scripts = [resource["inputs"].get("userData") for resource in _of_type(resources, "aws:ec2/instance:Instance")]
+    for template in _of_type(resources, "aws:ec2/launchTemplate:LaunchTemplate"):
+        encoded = template["inputs"].get("userData")
+        scripts.append(base64.b64decode(encoded).decode() if encoded else None)
+    return scripts
+
+
+def check(scenario: str, resources: List[dict], invokes: List[str]) -> List[str]:
+    """Return failed checks for one scenario's resource graph."""
+    values = {**BASE_CONFIG, **SCENARIOS[scenario], "scenario": scenario}
+    types = Counter(resource["type"] for resource in resources)
+    failures = [f"missing {typ}" for typ in REQUIRED_TYPES if not types[typ]]
+
+    autoscaling = values.get("ec2Autoscaling") == "true"
+    if autoscaling:
+        for typ in ("aws:autoscaling/group:Group", "aws:lb/loadBalancer:LoadBalancer",
+                    "aws:ec2/launchTemplate:LaunchTemplate"):
+            if types[typ] != 1:
+                failures.append(f"expected 1 {typ}, found {types[typ]}")
+        if types["aws:ec2/instance:Instance"]:
+            failures.append("autoscaling stack also created a standalone instance")
+    elif types["aws:ec2/instance:Instance"] != 1:
+        failures.append(f"expected 1 EC2 instance, found {types['aws:ec2/instance:Instance']}")
+
+    # Subnets: one public and one private per zone, each in a distinct zone
+    zones = json.loads(values["availabilityZones"]) if "availabilityZones" in values else MOCK_AZS[:2]
+    subnets = _of_type(resources, "aws:ec2/subnet:Subnet")
+    if len(subnets) != 2 * len(zones):
+        failures.append(f"expected {2 * len(zones)} subnets, found {len(subnets)}")
+    for public in (True, False):
+        placed = sorted(subnet["inputs"].get("availabilityZone") for subnet in subnets
+                        if bool(subnet["inputs"].get("mapPublicIpOnLaunch")) == public)
+        if placed != sorted(zones):
+            failures.append(f"{'public' if public else 'private'} subnets are in {placed}, expected {zones}")
+
+    # AMI: a configured AMI is used as-is and skips the lookup
+    golden = values.get("goldenAmi") == "true"
+    expected_ami = values.get("ec2AmiId") or (MOCK_GOLDEN_AMI_ID if golden else MOCK_AMI_ID)
+    for resource in resources:
+        ami = resource["inputs"].get("ami") or resource["inputs"].get("imageId")
+        if resource["type"] in ("aws:ec2/instance:Instance", "aws:ec2/launchTemplate:LaunchTemplate") \
+                and ami != expected_ami:
+            failures.append(f"{resource['name']} uses AMI {ami}, expected {expected_ami}")
+    if values.get("ec2AmiId") and "aws:ec2/getAmi:getAmi" in invokes:
+        failures.append("AMI looked up although ec2AmiId is set")
+    if "availabilityZones" in values and any("getAvailabilityZones" in token for token in invokes):
+        failures.append("availability zones looked up although availabilityZones is set")
+
+    for script in _user_data(resources):
+        if not script or not script.startswith("#!/bin/bash"):
+            failures.append("user data is missing or not a bash script")
+        elif values["s3BucketName"] not in script:
+            failures.append("user data does not reference the S3 bucket")
+        elif golden == ("yum install" in script):
+            failures.append(f"user data {'installs' if golden else 'does not install'} packages "
+                            f"{'on' if golden else 'without'} a golden AMI")
+        elif "fastapi-deploy" not in script or "docker pull" in script.split("DEPLOY_EOF")[-1]:
+            failures.append("user data does not leave image pulls to the deploy agent")
+
+    if golden and types["aws:imagebuilder/image:Image"] != 1:
+        failures.append("golden AMI configured but no Image Builder image")
+
+    failures += check_rollout(values, resources)
+
+    if values.get("domainName"):
+        for typ in ("aws:route53/zone:Zone", "aws:route53/record:Record",
+                    "aws:acm/certificate:Certificate", "aws:acm/certificateValidation:CertificateValidation"):
+            if not types[typ]:
+                failures.append(f"domain configured but no {typ}")
+
+    return failures + check_policy(resources)
+
+
+# Runner
+
+def run_scenario_process(scenario: str) -> dict:
+    """Run one scenario in a fresh interpreter so module and runtime state start clean."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-m", "infrastructure.harness", "--child", scenario],
+        capture_output=True, text=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    elapsed = (time.perf_counter() - started) * 1000
+    for line in result.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            report = json.loads(line[len(RESULT_PREFIX):])
+            report["process_ms"] = round(elapsed, 1)
+            return report
+    raise Exception(f"Scenario {scenario} did not report a result:\n{result.stderr}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", action="append", default=[], choices=sorted(SCENARIOS),
+                        help="Run only these scenarios")
+    parser.add_argument("--budget-ms", type=float, help="Fail if settling a scenario takes longer")
+    parser.add_argument("--verbose", action="store_true", help="List resource counts by type")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(RESULT_PREFIX + json.dumps(run_program(args.child)))
+        return
+
+    results = [run_scenario_process(name) for name in args.scenario or SCENARIOS]
+    print(f"{'scenario':<12} {'construct ms':>13} {'settle ms':>10} {'process ms':>11} "
+          f"{'resources':>10} {'invokes':>8}")
+    failed = False
+    for row in results:
+        print(f"{row['scenario']:<12} {row['construct_ms']:>13.1f} {row['settle_ms']:>10.1f} "
+              f"{row['process_ms']:>11.1f} {row['resources']:>10} {len(row['invokes']):>8}")
+        if args.verbose:
+            for typ, count in sorted(row["types"].items()):
+                print(f"    {count:>4}  {typ}")
+        if args.budget_ms and row["settle_ms"] > args.budget_ms:
+            row["failures"].append(f"settled in {row['settle_ms']:.1f} ms, budget {args.budget_ms:g} ms")
+        for failure in row["failures"]:
+            print(f"    FAIL: {failure}")
+        failed = failed or bool(row["failures"])
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+    if failed:
+        sys.exit(1)
+    print("All scenarios passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,416 @@
+"""Instance bootstrap scripts: EC2 user_data and the golden AMI build.
+
+Host setup (packages and services) either runs on every boot or is baked
+into a golden AMI once (see ``components/image_builder.py``). On a golden AMI
+user_data only writes the nginx config and installs and runs the deploy agent,
+which image rollouts (``components/rollout.py``) also run.
+"""
+
+APP_SOCKET_DIR = "/run/fastapi"
+METRICS_NAMESPACE = "PulumiProvisioning"  # BootToHealthySeconds is published here
+HEALTH_WAIT_SECONDS = 120
+DEPLOY_COMMAND = "/usr/local/bin/fastapi-deploy"
+
+
+def host_setup_script(prepull_images=()) -> str:
+    """Install and enable Docker, nginx, the AWS CLI and the SSM agent.
+
+    ``prepull_images`` are pulled into the local Docker cache, so app images
+    built on them only download their own layers at boot.
+    """
+    prepull = "".join(f"docker pull {image} || true\n" for image in prepull_images)
+    if prepull:
+        prepull = "\n# Pre-pull base images\nsystemctl start docker\n" + prepull
+    return f"""# Install packages (don't fail on update)
+yum update -y || true
+yum install -y docker nginx aws-cli || exit 1
+
+# Ensure SSM agent is installed and running (should be pre-installed on AL2023)
+echo "Checking SSM agent status..."
+if systemctl is-active --quiet amazon-ssm-agent; then
+    echo "SSM agent is already running"
+else
+    echo "Starting SSM agent..."
+    systemctl start amazon-ssm-agent || true
+    systemctl enable amazon-ssm-agent || true
+    # Wait a moment for agent to start
+    sleep 5
+fi
+
+# Pull image layers in parallel (Docker's default is 3 at a time)
+mkdir -p /etc/docker
+cat > /etc/docker/daemon.json << 'DOCKER_EOF'
+{{"max-concurrent-downloads": 10}}
+DOCKER_EOF
+
+# Start Docker and nginx on every boot
+systemctl enable docker nginx
+usermod -aG docker ec2-user
+{prepull}"""
+
+
+def nginx_setup_script(app_unix_socket: bool = False) -> str:
+    """Write the nginx reverse-proxy config and (re)start nginx."""
+    # With appUnixSocket, nginx proxies over a socket in a directory bind-mounted into
+    # the container; TCP stays as a backup for containers started without the mount
+    if app_unix_socket:
+        upstream_servers = f"server unix:{APP_SOCKET_DIR}/gunicorn.sock;\n    server 127.0.0.1:8000 backup;"
+    else:
+        upstream_servers = "server 127.0.0.1:8000;"
+    return f"""# Configure Nginx for FastAPI reverse proxy
+echo "Configuring Nginx..."
+install -d -o nginx -g nginx /var/cache/nginx/fastapi /var/cache/nginx/s3
+cat > /etc/nginx/conf.d/fastapi.conf << 'NGINX_EOF'
+# Micro-cache for read endpoints. Entries live seconds (the app's Cache-Control);
+# inactive bounds how long stale copies stay servable
+proxy_cache_path /var/cache/nginx/fastapi levels=1:2 keys_zone=fastapi_micro:10m
+                 max_size=256m inactive=60s use_temp_path=off;
+# Object bodies of offloaded /s3/download responses
+proxy_cache_path /var/cache/nginx/s3 levels=1:2 keys_zone=s3_objects:10m
+                 max_size=1g inactive=10m use_temp_path=off;
+
+log_format fastapi '$remote_addr - $remote_user [$time_local] "$request" '
+                   '$status $body_bytes_sent "$http_referer" "$http_user_agent" '
+                   'request_id=$request_id rt=$request_time urt=$upstream_response_time '
+                   'cache=$upstream_cache_status';
+
+# Only WebSocket upgrades get "Connection: upgrade"; everything else sends an
+# empty Connection header so the upstream connection can be kept alive
+map $http_upgrade $connection_upgrade {{
+    default upgrade;
+    ''      '';
+}}
+
+upstream fastapi_backend {{
+    {upstream_servers}
+
+    # Idle connections each nginx worker keeps open to the app
+    keepalive 32;
+    keepalive_requests 10000;
+    # Below the app's keep-alive (WEB_KEEPALIVE, 30s) so nginx never reuses a
+    # connection the app is about to close
+    keepalive_timeout 20s;
+}}
+
+# HTTP server - proxy to FastAPI (HTTPS can be added later with SSL)
+server {{
+    listen 80;
+    server_name _;
+    access_log /var/log/nginx/access.log fastapi;
+
+    # Security headers
+    add_header X-Frame-Options "SAMEORIGIN" always;
+    add_header X-Content-Type-Options "nosniff" always;
+    add_header X-XSS-Protection "1; mode=block" always;
+    # HIT/MISS/EXPIRED/UPDATING/STALE for cached routes (omitted when empty)
+    add_header X-Cache-Status $upstream_cache_status always;
+
+    # Client body size limit
+    client_max_body_size 100M;
+
+    # Proxy settings
+    location / {{
+        proxy_pass http://fastapi_backend;
+        proxy_http_version 1.1;
+        proxy_set_header Upgrade $http_upgrade;
+        proxy_set_header Connection $connection_upgrade;
+        proxy_set_header Host $host;
+        proxy_set_header X-Real-IP $remote_addr;
+        proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
+        proxy_set_header X-Forwarded-Proto $scheme;
+        # Trace correlation: the app uses this as trace id when no traceparent is sent
+        proxy_set_header X-Request-ID $request_id;
+        # Lets the app hand large downloads back to nginx (DOWNLOAD_OFFLOAD_ENABLED)
+        proxy_set_header X-Sendfile-Type X-Accel-Redirect;
+        proxy_cache_bypass $http_upgrade;
+        # Micro-cache: only responses with Cache-Control max-age are stored, so
+        # the app's RESPONSE_CACHE_ROUTES TTLs (a few seconds) decide what is
+        # cached and for how long
+        proxy_cache fastapi_micro;
+        proxy_cache_key $scheme$host$request_uri;
+        # One request per key goes to the app on a miss; the rest wait for it
+        proxy_cache_lock on;
+        proxy_cache_lock_timeout 5s;
+        # Serve the expired copy while one request refreshes it in the background,
+        # and while the app is failing or shedding load
+        proxy_cache_use_stale updating error timeout http_500 http_502 http_503 http_504;
+        proxy_cache_background_update on;
+        # Refresh with If-None-Match so unchanged responses come back as 304
+        proxy_cache_revalidate on;
+        
+        # Timeouts
+        proxy_connect_timeout 60s;
+        proxy_send_timeout 60s;
+        proxy_read_timeout 60s;
+    }}
+
+    # Uploads. Multipart-form bodies (/s3/upload) are read whole by the app, so
+    # nginx keeps spooling them and a slow client never holds an app worker
+    location /s3/upload {{
+        proxy_pass http://fastapi_backend;
+        proxy_http_version 1.1;
+        proxy_set_header Connection "";
+        proxy_set_header Host $host;
+        proxy_set_header X-Real-IP $remote_addr;
+        proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
+        proxy_set_header X-Forwarded-Proto $scheme;
+        proxy_set_header X-Request-ID $request_id;
+
+        # Idle time allowed between two reads or writes, not for the whole upload
+        client_body_timeout 300s;
+        proxy_connect_timeout 60s;
+        proxy_send_timeout 300s;
+        proxy_read_timeout 300s;
+
+        # Raw bodies stream through as they arrive and go to S3 part by part,
+        # so they are bound by neither nginx's disk nor app memory
+        location /s3/upload-stream/ {{
+            proxy_pass http://fastapi_backend;
+            proxy_request_buffering off;
+            client_max_body_size 5g;
+        }}
+
+        # Raw tar bodies are unpacked as they arrive, entry by entry
+        location /s3/upload-archive {{
+            proxy_pass http://fastapi_backend;
+            proxy_request_buffering off;
+            client_max_body_size 5g;
+        }}
+    }}
+
+    # Downloads handed over by the app with X-Accel-Redirect: nginx streams the
+    # object from the presigned URL in X-S3-Offload-URL, so no app worker is held
+    # for the transfer. The URL is used exactly as the app sent it (still
+    # percent-encoded), so keys with spaces, "%" or non-ASCII characters work
+    location = /_s3_offload {{
+        internal;
+        set $s3_url $upstream_http_x_s3_offload_url;
+        set $s3_cache_key $upstream_http_x_s3_offload_cache_key;
+        # The S3 host is only known per request, so it is resolved at runtime
+        # (169.254.169.253 is the VPC DNS resolver)
+        resolver 169.254.169.253 valid=60s ipv6=off;
+        resolver_timeout 5s;
+
+        # Host and SNI default to the URL's host
+        proxy_pass $s3_url;
+        proxy_http_version 1.1;
+        proxy_set_header Connection "";
+        # The presigned URL carries its own credentials; never forward the client's
+        proxy_set_header Authorization "";
+        proxy_set_header Cookie "";
+        proxy_ssl_server_name on;
+        proxy_hide_header x-amz-id-2;
+        proxy_hide_header x-amz-request-id;
+        proxy_hide_header Set-Cookie;
+
+        # Local cache of object bodies, keyed without the signature; an entry
+        # older than a minute is revalidated against S3 by ETag
+        proxy_cache s3_objects;
+        proxy_cache_key $s3_cache_key;
+        proxy_cache_valid 200 1m;
+        proxy_cache_revalidate on;
+        proxy_cache_lock on;
+        proxy_cache_use_stale updating;
+        # Uncached responses stream to the client instead of spooling to disk
+        proxy_max_temp_file_size 0;
+    }}
+
+    # Health check endpoint
+    location /health {{
+        proxy_pass http://fastapi_backend/health;
+        proxy_http_version 1.1;
+        proxy_set_header Connection "";
+        access_log off;
+    }}
+
+    location = /ready {{
+        proxy_pass http://fastapi_backend/ready;
+        proxy_http_version 1.1;
+        proxy_set_header Connection "";
+        access_log off;
+    }}
+}}
+NGINX_EOF
+
+# Test nginx configuration
+nginx -t || echo "Nginx config test failed, but continuing..."
+
+# (Re)start Nginx; on a golden AMI it is already running with the stock config
+systemctl restart nginx || true
+"""
+
+
+def deploy_script(
+    ecr_repo_url: str,
+    s3_bucket_name: str,
+    rds_endpoint: str,
+    stack_name: str,
+    rds_db_name: str,
+    app_workers: int = 0,
+    app_unix_socket: bool = False,
+    health_check_path: str = "/ready",
+    image: str = "stock",
+) -> str:
+    """On-instance deploy agent, installed as ``DEPLOY_COMMAND``.
+
+    ``fastapi-deploy [TAG] [--boot]`` pulls exactly TAG (default: the tag in
+    SSM ``/pulumi/<stack>/image_tag``) and swaps the container once it is
+    pulled. Runs are serialized, and a run for the image already serving is a
+    no-op, so overlapping rollout events are cheap.
+    """
+    if app_unix_socket:
+        socket_run_args = f"  -v {APP_SOCKET_DIR}:{APP_SOCKET_DIR} -e UNIX_SOCKET={APP_SOCKET_DIR}/gunicorn.sock \\\n"
+    else:
+        socket_run_args = ""
+    return f"""#!/bin/bash
+# Deploy the FastAPI container: fastapi-deploy [IMAGE_TAG] [--boot]
+exec 9>/run/fastapi-deploy.lock
+flock 9
+
+IMAGE_TAG="$1"
+STARTED=$(date +%s.%N)
+AWS_REGION=$(curl -s http://169.254.169.254/latest/meta-data/placement/region)
+
+put_metric() {{
+    aws cloudwatch put-metric-data --region $AWS_REGION --namespace {METRICS_NAMESPACE} \\
+      --metric-name "$1" --unit Seconds --value "$2" \\
+      --dimensions Stack={stack_name},Image={image} || true
+}}
+
+if [ -z "$IMAGE_TAG" ]; then
+    IMAGE_TAG=$(aws ssm get-parameter --name /pulumi/{stack_name}/image_tag --query 'Parameter.Value' --output text --region $AWS_REGION 2>/dev/null || echo "")
+fi
+if [ -z "$IMAGE_TAG" ] || [ "$IMAGE_TAG" = "None" ] || [ "$IMAGE_TAG" = "null" ]; then
+    echo "No image tag in /pulumi/{stack_name}/image_tag yet (normal before the first push)."
+    echo "Setting it rolls the image out to this instance."
+    exit 0
+fi
+IMAGE={ecr_repo_url}:$IMAGE_TAG
+
+# Login to ECR (retry up to 3 times)
+echo "Logging into ECR..."
+ECR_LOGIN_SUCCESS=false
+for i in $(seq 1 3); do
+    if aws ecr get-login-password --region $AWS_REGION 2>/dev/null | docker login --username AWS --password-stdin {ecr_repo_url} 2>/dev/null; then
+        echo "ECR login successful"
+        ECR_LOGIN_SUCCESS=true
+        break
+    fi
+    echo "ECR login attempt $i failed, retrying..."
+    sleep 5
+done
+if [ "$ECR_LOGIN_SUCCESS" = false ]; then
+    echo "ERROR: Failed to login to ECR after 3 attempts"
+    exit 1
+fi
+
+# Pull while the current container keeps serving
+echo "Pulling $IMAGE..."
+docker pull $IMAGE || exit 1
+if [ "$(docker inspect -f '{{{{.Image}}}}' fastapi-app 2>/dev/null)" = "$(docker image inspect -f '{{{{.Id}}}}' $IMAGE)" ]; then
+    echo "fastapi-app already runs $IMAGE"
+    exit 0
+fi
+
+# Get DB password from Parameter Store
+DB_PASSWORD=$(aws ssm get-parameter --name /pulumi/{stack_name}/db_password --with-decryption --query 'Parameter.Value' --output text --region $AWS_REGION 2>/dev/null || echo '')
+if [ -z "$DB_PASSWORD" ]; then
+    echo "WARNING: DB password not found in Parameter Store, container may fail to connect"
+fi
+
+echo "Starting FastAPI container with image tag: $IMAGE_TAG"
+docker stop fastapi-app 2>/dev/null || true
+docker rm fastapi-app 2>/dev/null || true
+mkdir -p {APP_SOCKET_DIR}
+docker run -d --name fastapi-app --restart unless-stopped -p 8000:8000 \\
+{socket_run_args}  -e AWS_REGION=$AWS_REGION \\
+  -e S3_BUCKET_NAME={s3_bucket_name} \\
+  -e DB_HOST={rds_endpoint} \\
+  -e DB_PORT=5432 \\
+  -e DB_NAME={rds_db_name} \\
+  -e DB_USER=dbadmin \\
+  -e DB_PASSWORD="$DB_PASSWORD" \\
+  -e IMAGE_TAG=$IMAGE_TAG \\
+  -e IMAGE_URI=$IMAGE \\
+  -e SERVER_MODE=gunicorn \\
+  -e DOWNLOAD_OFFLOAD_ENABLED=true \\
+  -e WEB_WORKERS={app_workers} \\
+  $IMAGE || exit 1
+
+# Wait until nginx serves the health check, then report how long it took
+HEALTHY=false
+for i in $(seq 1 {HEALTH_WAIT_SECONDS * 2}); do
+    if curl -sf -o /dev/null http://127.0.0.1{health_check_path}; then
+        HEALTHY=true
+        break
+    fi
+    sleep 0.5
+done
+if [ "$HEALTHY" = false ]; then
+    echo "❌ FastAPI container not healthy after {HEALTH_WAIT_SECONDS} seconds"
+    docker logs fastapi-app || true
+    exit 1
+fi
+DEPLOY_TO_HEALTHY=$(awk "BEGIN {{ print $(date +%s.%N) - $STARTED }}")
+echo "✅ FastAPI container healthy ($IMAGE_TAG) $DEPLOY_TO_HEALTHY seconds after the deploy started"
+docker logs fastapi-app | tail -20
+put_metric DeployToHealthySeconds $DEPLOY_TO_HEALTHY
+if [ "$2" = "--boot" ]; then
+    put_metric BootToHealthySeconds $(cut -d' ' -f1 /proc/uptime)
+fi
+# Drop image layers no container uses any more
+docker image prune -f >/dev/null || true
+"""
+
+
+def build_user_data(
+    ecr_repo_url: str,
+    s3_bucket_name: str,
+    rds_endpoint: str,
+    stack_name: str,
+    rds_db_name: str,
+    app_workers: int = 0,
+    app_unix_socket: bool = False,
+    health_check_path: str = "/ready",
+    golden_ami: bool = False,
+) -> str:
+    """Boot script: host setup (unless on a golden AMI), nginx, the deploy agent, then a first deploy."""
+    image = "golden" if golden_ami else "stock"
+    host_setup = "# Packages and services are baked into the golden AMI\n" if golden_ami else host_setup_script()
+    return f"""#!/bin/bash
+# Log everything to a file for debugging
+exec > >(tee /var/log/user-data.log|logger -t user-data -s 2>/dev/console) 2>&1
+set -x
+
+echo "=== Starting user data script ==="
+date
+
+{host_setup}
+# Start Docker
+systemctl start docker || exit 1
+
+# Wait for Docker to be ready
+echo "Waiting for Docker to be ready..."
+for i in $(seq 1 30); do
+    if docker info >/dev/null 2>&1; then
+        echo "Docker is ready"
+        break
+    fi
+    echo "Waiting for Docker... ($i/30)"
+    sleep 2
+done
+
+{nginx_setup_script(app_unix_socket)}
+# Install the deploy agent; image rollouts run it through SSM Run Command
+cat > {DEPLOY_COMMAND} << 'DEPLOY_EOF'
+{deploy_script(ecr_repo_url, s3_bucket_name, rds_endpoint, stack_name, rds_db_name, app_workers, app_unix_socket, health_check_path, image)}DEPLOY_EOF
+chmod 755 {DEPLOY_COMMAND}
+
+# Deploy the tag currently in SSM. Before the first push there is none; the
+# rollout rule deploys as soon as CI sets it, so nothing is polled here
+{DEPLOY_COMMAND} "" --boot || echo "Initial deploy failed; the next rollout retries it"
+
+echo "=== User data script completed ==="
+echo "Image updates are rolled out by EventBridge -> SSM Run Command ({DEPLOY_COMMAND})"
+date
+"""